@@ -16,8 +16,16 @@ from todo.parsers import re_urls
 from todo.config import ConfigBorg
 from todo.todoitem import TodoItem
 from todo.todolist import TodoList
+from todo.graph import DependencyGraph
+from todo.tid_allocator import extend_manifest
+from todo.archive_index import ArchiveIndex, ARCHIVE_INDEX_FILENAME
+from todo.search_index import get_literals
+from todo.archive_scan import scan, search_file, select_done
+from todo.files import get_file_stamp, COMPRESSED_SUFFIX
+from todo.linereader import open_reader
+from todo.rollups import Rollups, ROLLUP_FILENAME, get_day, new_rollup, merge_rollups
 
-import collections, datetime, re, os, glob
+import collections, datetime, re, os
 from itertools import groupby
 import webbrowser, codecs
 import logging
@@ -31,8 +39,45 @@ logger = logging.getLogger("todonext.actions")
 
 # regex for detecting priority argument in CLI
 re_prio = re.compile("[xA-Z+-]", re.UNICODE)
-# regex for replacing archive scheme variables with "*"
-re_replace_archive_vars = re.compile("%\D", re.UNICODE)
+# regex for finding tids in archived lines
+re_archived_tid = re.compile("(?:^|\s){id}:(\S+)".format(id = conf.ID), re.UNICODE)
+
+
+def get_archive_index(root_dir):
+    """returns the index of the archive files of the todo file
+    
+    :param root_dir: the directory of the todo file
+    :type root_dir: str
+    :returns: the archive index
+    :rtype: :class:`ArchiveIndex`
+    """
+    return ArchiveIndex(os.path.join(root_dir, ARCHIVE_INDEX_FILENAME), root_dir, 
+                        conf.archive_filename_scheme, conf.archive_unsorted_filename)
+
+
+def get_rollups(root_dir):
+    """returns the daily rollups of the archive files of the todo file
+    
+    :param root_dir: the directory of the todo file
+    :type root_dir: str
+    :returns: the rollups
+    :rtype: :class:`Rollups`
+    """
+    return Rollups(os.path.join(root_dir, ROLLUP_FILENAME), root_dir)
+
+
+def get_archive_files(root_dir):
+    """returns the file names of all existing archive files
+    
+    :param root_dir: the directory of the todo file
+    :type root_dir: str
+    :returns: the archive file names, the file for items without done date last
+    :rtype: list(str)
+    """
+    archive_index = get_archive_index(root_dir)
+    file_list = archive_index.get_files()
+    archive_index.save()
+    return file_list
 
 
 @doc_description("lists all items that match the given expression", 
@@ -111,14 +156,16 @@ def cmd_remove(tl, args):
             for item in item_list:
                 print(" ", cr.render(item))
             if confirm_action("Please confirm (y/N): "):
-                for item in item_list:
-                    tl.remove_item(item)
+                with tl.batch():
+                    for item in item_list:
+                        tl.remove_item(item)
             else:
                 print("Removing aborted")
                 return
         else:
-            for item in item_list:
-                tl.remove_item(item)
+            with tl.batch():
+                for item in item_list:
+                    tl.remove_item(item)
         msg = u"{nr} todo items ({item_ids}) have been removed.".format(nr = len(item_list), item_ids = ",".join([cr.wrap_id(item.tid, reset=True) for item in item_list]))
         suppress_if_quiet(msg, args)
         logger.info(msg)
@@ -131,26 +178,27 @@ def cmd_done(tl, args):
     with ColorRenderer() as cr:
         now = datetime.datetime.now()
         suppress_if_quiet(u"Marked following todo items as 'done':", args)
-        for item in tl.get_items_by_index_list(args.items):
-            tl.set_to_done(item)
-            # if started property is set, remove it and update duration property
-            if conf.STARTED in item.properties:
-                start_time = item.properties[conf.STARTED]
-                time_delta = now - start_time
-                duration = 0
-                try:
-                    # try to parse existing duration property
-                    duration = int(item.properties.get(conf.DURATION, 0))
-                except:
-                    pass
-                # add delta time in minutes
-                duration += int(time_delta.total_seconds() / 60) 
-                # remove started property
-                tl.replace_or_add_prop(item, conf.STARTED, None)
-                # update duration property
-                tl.replace_or_add_prop(item, conf.DURATION, duration)
+        with tl.batch():
+            for item in tl.get_items_by_index_list(args.items):
+                tl.set_to_done(item)
+                # if started property is set, remove it and update duration property
+                if conf.STARTED in item.properties:
+                    start_time = item.properties[conf.STARTED]
+                    time_delta = now - start_time
+                    duration = 0
+                    try:
+                        # try to parse existing duration property
+                        duration = int(item.properties.get(conf.DURATION, 0))
+                    except:
+                        pass
+                    # add delta time in minutes
+                    duration += int(time_delta.total_seconds() / 60) 
+                    # remove started property
+                    tl.replace_or_add_prop(item, conf.STARTED, None)
+                    # update duration property
+                    tl.replace_or_add_prop(item, conf.DURATION, duration)
 
-            suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
+                suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
 
 @doc_description("reopens one or more items marked as 'done'", None, 
     {"items": "the index numbers or IDs of the items to reopen"})
@@ -159,10 +207,10 @@ def cmd_reopen(tl, args):
     """
     with ColorRenderer() as cr:
         suppress_if_quiet(u"Set the following todo items to open again:", args)
-        for item in tl.get_items_by_index_list(args.items):
-            tl.reopen(item)
-            tl.reindex()
-            suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
+        with tl.batch():
+            for item in tl.get_items_by_index_list(args.items):
+                tl.reopen(item)
+                suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
 
 @doc_description("allows editing a given todo item", 
     "This action will open an editor. "
@@ -214,7 +262,7 @@ def cmd_delegated(tl, args):
         nr = 0
         for delegate in del_list:
             print("Delegated to {delegate}".format(delegate = cr.wrap_delegate(delegate, reset = True)))
-            for item in sorted(to_list[delegate], cmp=tl.default_sort):
+            for item in sorted(to_list[delegate], key=tl.default_sort_key):
                 nr += 1
                 print(" ", cr.render(item))
         suppress_if_quiet(u"{nr} todo items displayed.".format(nr = nr), args)
@@ -239,7 +287,7 @@ def cmd_tasked(tl, args):
         nr = 0
         for initiator in ini_list:
             print("Tasks from {delegate}".format(delegate = cr.wrap_delegate(initiator, reset = True)))
-            for item in sorted(from_list[initiator], cmp=tl.default_sort):
+            for item in sorted(from_list[initiator], key=tl.default_sort_key):
                 print(" ", cr.render(item))
                 nr += 1
         suppress_if_quiet(u"{nr} todo items displayed.".format(nr = nr), args)
@@ -261,7 +309,8 @@ def cmd_overdue(tl, args):
         "or date range. If no arguments are given, the items of the last 7 days are "
         "displayed.", 
     {"from_date": "either a date or a string like 'tomorrow' or '*'",
-    "to_date": "either a date or a string like 'tomorrow'"})
+    "to_date": "either a date or a string like 'tomorrow'",
+    "jobs": "the number of processes reading the archive files, default 1"})
 def cmd_report(tl, args):
     """shows a daily report of all done and report items
     """
@@ -308,42 +357,21 @@ def cmd_report(tl, args):
         # get list of done and report items from current todo list
         report_list = list(tl.list_items(lambda x: (x.done or x.is_report)))
         
-        # get list of done and report items from un-dated archive file
-        root_dir = os.path.dirname(conf.todo_file)
-        unsorted_fn = os.path.join(root_dir, conf.archive_unsorted_filename)
-        if os.path.exists(unsorted_fn):
-            res = TodoList(unsorted_fn)
-            report_list.extend(res.todolist)
-        
-        # get all archive file names in list
-        file_pattern = re_replace_archive_vars.sub("*", conf.archive_filename_scheme)
-        file_list = glob.glob(os.path.join(root_dir, file_pattern))
-
-        # regex for finding all replaced parts in archive filename scheme
-        re_find_date_str = re_replace_archive_vars.sub("(.+)", conf.archive_filename_scheme).replace("\\", "\\\\")
-        re_find_date = re.compile(re_find_date_str, re.UNICODE)
-        # loop through all files and see, whether they match the given date range
-        for fn in file_list:
-            # get all replaced values in filename
-            parts = re_find_date.findall(fn)[0]
-            # get the variables responsible for this substitution (e.archived_items. "%Y", "%m", ...)
-            tvars = re_replace_archive_vars.findall(conf.archive_filename_scheme)
-            # create mapping, removing duplicates
-            mapping = dict(zip(tvars, parts))
-            # create date from mapping
-            tdate = datetime.datetime.strptime(" ".join(mapping.values()), " ".join(mapping))
-            
-            # if filename matches date range
-            if args.from_date <= tdate <= args.to_date:
-                # load todo list
-                res = TodoList(fn)
-                # get items directly if they are done or report items
-                archived_items = [item for item in res.todolist if item.done or item.is_report]
-                for item in archived_items:
-                    # replace id with (A) to mark it as archived
-                    item.replace_or_add_prop(conf.ID, "(A)")
-                # append it to candidates
-                report_list.extend(archived_items)
+        # only the archive files with items done within the date range are read, the 
+        # archive index knows the done dates of each file (including the un-dated file)
+        archive_index = get_archive_index(os.path.dirname(conf.todo_file))
+        # archive files sorted by done date are only read from the end until the range starts
+        tasks = [(fn, args.from_date, args.to_date, na_date, archive_index.is_chronological(fn)) 
+                 for fn in archive_index.select_done(args.from_date, args.to_date)]
+        archive_index.save()
+        # get done and report items within the date range, only those are kept in memory
+        for texts in scan(select_done, tasks, args.jobs):
+            archived_items = sorted((TodoItem(text) for text in texts), key=TodoList.default_sort_key)
+            for item in archived_items:
+                # replace id with (A) to mark it as archived
+                item.replace_or_add_prop(conf.ID, "(A)")
+            # append it to candidates
+            report_list.extend(archived_items)
         
         # sort filtered list by "done" date 
         report_list.sort(key=lambda x: x.done_date or na_date)
@@ -431,40 +459,96 @@ def cmd_prio(tl, args):
         if not re_prio.match(new_prio):
             print(u"Priority '{prio}' can't be recognized (must be one of A to Z or +/-)".format(prio = new_prio))
             return
-        for item in prio_items:
-            old_prio = item.priority
-            if new_prio == "x":
-                # remove priority
-                suppress_if_quiet(u"  Removing priority:", args)
-                tl.set_priority(item, None)
-                suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
-            elif new_prio == "-":
-                if old_prio in ("Z", None):
-                    print(u"  Can't lower priority of following item:")
-                    print(u" ", cr.render(item))
-                else:
-                    temp_prio = chr(ord(old_prio)+1)
-                    suppress_if_quiet(u"  Lower priority from {old_prio} to {new_prio}:".format(old_prio = old_prio, new_prio = temp_prio), args)
-                    tl.set_priority(item, temp_prio)
+        with tl.batch():
+            for item in prio_items:
+                old_prio = item.priority
+                if new_prio == "x":
+                    # remove priority
+                    suppress_if_quiet(u"  Removing priority:", args)
+                    tl.set_priority(item, None)
                     suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
-            elif new_prio == "+":
-                if old_prio in ("A", None):
-                    print(u"  Can't raise priority of following item:")
-                    print(u" ", cr.render(item))
+                elif new_prio == "-":
+                    if old_prio in ("Z", None):
+                        print(u"  Can't lower priority of following item:")
+                        print(u" ", cr.render(item))
+                    else:
+                        temp_prio = chr(ord(old_prio)+1)
+                        suppress_if_quiet(u"  Lower priority from {old_prio} to {new_prio}:".format(old_prio = old_prio, new_prio = temp_prio), args)
+                        tl.set_priority(item, temp_prio)
+                        suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
+                elif new_prio == "+":
+                    if old_prio in ("A", None):
+                        print(u"  Can't raise priority of following item:")
+                        print(u" ", cr.render(item))
+                    else:
+                        temp_prio = chr(ord(old_prio)-1)
+                        suppress_if_quiet(u"  Raise priority from {old_prio} to {new_prio}:".format(old_prio = old_prio, new_prio = temp_prio), args)
+                        tl.set_priority(item, temp_prio)
+                        suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
                 else:
-                    temp_prio = chr(ord(old_prio)-1)
-                    suppress_if_quiet(u"  Raise priority from {old_prio} to {new_prio}:".format(old_prio = old_prio, new_prio = temp_prio), args)
-                    tl.set_priority(item, temp_prio)
+                    suppress_if_quiet(u"  Setting priority from {old_prio} to {new_prio}:".format(old_prio = old_prio, new_prio = new_prio), args)
+                    tl.set_priority(item, new_prio)
                     suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
-            else:
-                suppress_if_quiet(u"  Setting priority from {old_prio} to {new_prio}:".format(old_prio = old_prio, new_prio = new_prio), args)
-                tl.set_priority(item, new_prio)
-                suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
                 
-@doc_description("displays some simple statistics about your todo list")
-def cmd_stats(tl, args): #@UnusedVariable
+def print_rollups(tl, args):
+    """prints the done and report items per day or month of a date range, from the daily
+    rollups of the archive files and the items of the todo list
+    """
+    root_dir = os.path.dirname(conf.todo_file)
+    rollups = get_rollups(root_dir)
+    if args.rebuild or not rollups.exists():
+        rollups.clear()
+    rollups.refresh(get_archive_files(root_dir))
+    rollups.save()
+    if not args.range:
+        suppress_if_quiet(u"Successfully rebuilt the daily rollups.", args)
+        return
+    now = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if args.range[0] in ("*", "all"):
+        dates = [datetime.datetime(1900, 1, 1), now]
+    else:
+        dates = [to_date(date) for date in args.range[:2]]
+        if len(dates) == 1:
+            dates.append(now)
+    for date in dates:
+        if not isinstance(date, datetime.datetime):
+            # remove first character, as it is "?" with a non-parsable date
+            print(u"The given date could not be parsed: {date}".format(date = date[1:]))
+            return
+    first_day, last_day = sorted(dates)
+    days = rollups.get_days(first_day, last_day, tl.list_items())
+    # long ranges are shown per month
+    period_len = 10 if (last_day - first_day).days <= 62 else 7
+    periods = collections.OrderedDict()
+    total = new_rollup()
+    for day in sorted(days):
+        merge_rollups(periods.setdefault(day[:period_len], new_rollup()), days[day])
+        merge_rollups(total, days[day])
+    with ColorRenderer() as cr:
+        print(u"Done and report items from {from_date} to {to_date}:".format(
+            from_date = get_day(first_day), to_date = get_day(last_day)))
+        print(u"  {period:10}  {done:>6}  {report:>6}  {duration:>14}".format(period = u"Period", 
+            done = u"Done", report = u"Report", duration = u"Duration (min)"))
+        for period, rollup in periods.items() + [(u"Total", total)]:
+            print(u"  {period:10}  {done:6d}  {report:6d}  {duration:14d}".format(period = period, **rollup))
+        for key, wrap in (("projects", cr.wrap_project), ("contexts", cr.wrap_context)):
+            counts = sorted(total[key].items(), key = lambda x: (-x[1], x[0]))[:10]
+            if counts:
+                print(u"Most frequent {key}: {counts}".format(key = key, counts = u", ".join(
+                    u"{name} ({count})".format(name = wrap(name, reset=True), count = count) for name, count in counts)))
+
+@doc_description("displays some simple statistics about your todo list",
+    "With --range, the numbers of done and report items, their durations, projects and "
+    "contexts are shown per day (per month for ranges longer than two months). They are "
+    "taken from daily rollups of the archive files, which are stored next to the todo file.",
+    {"range": "the first and optionally the last day of the range (default today) or '*'",
+     "rebuild": "if given, the daily rollups are built from the archive files again"})
+def cmd_stats(tl, args):
     """displays some simple statistics about your todo list
     """
+    if args.range or args.rebuild:
+        print_rollups(tl, args)
+        return
     # write # open / # done / # prioritized / # overdue items
     counter = collections.defaultdict(int)
     delegates = set()
@@ -569,7 +653,7 @@ def cmd_project(tl, args):
         nr = 0
         for project in args_list:
             print(u"Project", cr.wrap_project(project, reset=True))
-            for item in sorted(project_dict[project], cmp=tl.default_sort):
+            for item in sorted(project_dict[project], key=tl.default_sort_key):
                 nr += 1
                 print(" ", cr.render(item))
         suppress_if_quiet(u"{nr} todo items displayed.".format(nr = nr), args)
@@ -604,7 +688,7 @@ def cmd_context(tl, args):
         nr = 0
         for context in args_list:
             print(u"Context", cr.wrap_context(context, reset=True))
-            for item in sorted(context_dict[context], cmp=tl.default_sort):
+            for item in sorted(context_dict[context], key=tl.default_sort_key):
                 print(u" ", cr.render(item))
                 nr += 1 
         suppress_if_quiet(u"{nr} todo items displayed.".format(nr = nr), args)
@@ -612,7 +696,7 @@ def cmd_context(tl, args):
 @doc_description("backups the current todo file to a timestamped file",
     None, 
     {"filename": "the name of the backup file [optional]",})
-def cmd_backup(tl, args): #@UnusedVariable
+def cmd_backup(tl, args):
     """backups the current todo file to a timestamped file
     """
     template = os.path.basename(conf.todo_file)
@@ -634,6 +718,8 @@ def cmd_backup(tl, args): #@UnusedVariable
             quit(0)
         else:
             print(u"  Overwriting {fn}...".format(fn = dst_fn))
+    # journaled changes are written to the todo file first
+    tl.compact()
     # copying the todo file to the destination
     with codecs.open(conf.todo_file, "r", "utf-8") as src:
         suppress_if_quiet(u"  Copying todo file to {fn}...".format(fn = dst_fn), args)
@@ -654,8 +740,9 @@ def cmd_archive(tl, args):
     report_list = list(tl.list_items(lambda x: x.done or x.is_report))
     # default date used when no done date is specified
     na_date = datetime.datetime(1970, 1, 1)
-    # sort filtered list by "done" date 
-    report_list.sort(key=lambda x: x.done_date or na_date, reverse=True)
+    # sort filtered list by "done" date, the archive files stay sorted if the items are 
+    # appended oldest first
+    report_list.sort(key=lambda x: x.done_date or na_date)
     
     # for mapping items to file names
     file_map = collections.defaultdict(list)
@@ -663,7 +750,7 @@ def cmd_archive(tl, args):
     for item in report_list:
         item_date = item.done_date or na_date
         if is_same_day(item_date, na_date):
-            dst_fn = conf.archive_unsorted_filename
+            dst_fn = os.path.join(base_dir, conf.archive_unsorted_filename)
         else:
             dst_fn = os.path.join(base_dir, item_date.strftime(conf.archive_filename_scheme))
         
@@ -673,17 +760,58 @@ def cmd_archive(tl, args):
         # add to file map
         file_map[dst_fn].append(item)
     
+    # the index has to know the archive files before the items are appended
+    archive_index = get_archive_index(base_dir)
+    archive_index.refresh()
+    # the rollups are only kept up to date once they have been built
+    rollups = get_rollups(base_dir)
+    if rollups.exists():
+        rollups.refresh(archive_index.get_files())
+    else:
+        rollups = None
+    
+    if conf.id_support and not os.path.exists(tl.tid_manifest):
+        # the manifest is started with the tids of all items archived before
+        archived_tids = set()
+        for arch_file in archive_index.get_files():
+            with open_reader(arch_file) as reader:
+                for _, text in reader.iter_lines():
+                    archived_tids.update(re_archived_tid.findall(text))
+        extend_manifest(tl.tid_manifest, sorted(archived_tids))
+    
+    search_index = getattr(conf, "search_index", None)
     nr_archived = 0
     # now we append the items to the right file
-    for dst_fn in file_map:
-        nr_archived += len(file_map[dst_fn])
-        # open files in append mode
-        with codecs.open(dst_fn, "a", "utf-8") as fp:
-            for item in file_map[dst_fn]:
-                # and write them
-                fp.write(item.text + "\n")
-                # and remove the item from todo list
-                tl.remove_item(item)
+    with tl.batch():
+        for dst_fn in file_map:
+            nr_archived += len(file_map[dst_fn])
+            old_stamp = get_file_stamp(dst_fn)
+            # open files in append mode
+            with codecs.open(dst_fn, "a", "utf-8") as fp:
+                for item in file_map[dst_fn]:
+                    # and write them
+                    fp.write(item.text + "\n")
+                    # and remove the item from todo list
+                    tl.remove_item(item)
+            archive_index.add_items(dst_fn, file_map[dst_fn])
+            if search_index is not None:
+                # only the appended lines are indexed
+                search_index.extend(dst_fn, old_stamp)
+            if rollups is not None:
+                rollups.add_items(dst_fn, file_map[dst_fn])
+    # cold and large archive files are compressed
+    for compressed_fn in archive_index.rotate(getattr(conf, "archive_compress_days", 0), getattr(conf, "archive_compress_size", 0)):
+        if rollups is not None:
+            rollups.move_file(compressed_fn[:-len(COMPRESSED_SUFFIX)], compressed_fn)
+        suppress_if_quiet(u"  Compressed archive file to {fn}".format(fn = compressed_fn), args)
+    archive_index.save()
+    if rollups is not None:
+        rollups.save()
+    if search_index is not None:
+        search_index.save()
+    if conf.id_support:
+        # archived tids are not used again
+        extend_manifest(tl.tid_manifest, [item.tid for item in report_list if item.tid])
     
     suppress_if_quiet(u"Successfully archived {nr} todo items.".format(nr = nr_archived), args)
 
@@ -727,7 +855,8 @@ def cmd_delay(tl, args):
     None,
     {"search_string": "a search string",
      "regex": "if given, the search string is interpreted as a regular expression",
-     "ci": "if given, the search string is interpreted as case insensitive"})
+     "ci": "if given, the search string is interpreted as case insensitive",
+     "jobs": "the number of processes searching the archive files, default 1"})
 def cmd_search(tl, args):
     """lists all current and archived todo items that match the search string
     """
@@ -746,40 +875,42 @@ def cmd_search(tl, args):
             re_search = re.compile(args.search_string, flags)
         else:
             re_search = re.compile(re.escape(args.search_string), flags)
+        # plain search strings are looked up in the archives without decoding every line
+        needle = None if args.regex or args.ci else args.search_string.encode("utf-8")
+        # only the lines containing the literal parts of the search string are read from the archives
+        archive_files = get_archive_files(os.path.dirname(conf.todo_file))
+        candidates = None
+        search_index = getattr(conf, "search_index", None)
+        if search_index is not None:
+            literals = get_literals(args.search_string, flags) if args.regex else [args.search_string]
+            candidates = search_index.find(archive_files, literals)
 
-        # store for all matching items
-        all_matches = []
         # first, look at current todo list
-        for item in tl.list_items():
-            if re_search.search(item.text):
-                all_matches.append((conf.todo_file, item))
+        current_items = [item for item in tl.list_items() if re_search.search(item.text)]
         
-        # get file list of all archive files by replacing all %x-variables with '*' and
-        # let glob do the hard work
-        file_pattern = re_replace_archive_vars.sub("*", conf.archive_filename_scheme)
-        root_dir = os.path.dirname(conf.todo_file)
-        file_list = glob.glob(os.path.join(root_dir, file_pattern))
-        # add the file for items without done timestamp
-        unsorted_file = os.path.join(root_dir, conf.archive_unsorted_filename)
-        if os.path.exists(unsorted_file):
-            file_list.append(unsorted_file)
-        
-        for arch_file in file_list:
-            # create a new todo list for each archive file
-            with TodoList(arch_file) as atl:
-                for item in atl.todolist:
-                    if re_search.search(item.text):
-                        item.replace_or_add_prop(conf.ID, "(A)")
-                        all_matches.append((arch_file, item))
+        def print_matches(filename, items):
+            if items:
+                print(u"File '{fn}':".format(fn = filename))
+                for item in items:
+                    print(" ", cr.render(item))
+            return len(items)
         
-        # sort by filename
-        all_matches.sort(key = lambda x:x[0])
-        # group by filename
-        for filename, items in groupby(all_matches, lambda x: x[0]):
-            print(u"File '{fn}':".format(fn = filename))
-            for item in items:
-                print(" ", cr.render(item[1]))
-        suppress_if_quiet(u"{nr} matching todo items found".format(nr = len(all_matches)), args)
+        # only the matching lines of the archive files are parsed, the files are printed 
+        # sorted by name as soon as they have been searched
+        tasks = [(fn, re_search.pattern, flags, needle, candidates[fn] if candidates is not None else None) 
+                 for fn in sorted(archive_files) if candidates is None or fn in candidates]
+        nr, pending = 0, True
+        for pos, texts in enumerate(scan(search_file, tasks, args.jobs)):
+            arch_file = tasks[pos][0]
+            if pending and conf.todo_file < arch_file:
+                nr, pending = nr + print_matches(conf.todo_file, current_items), False
+            archived_items = sorted((TodoItem(text) for text in texts), key = TodoList.default_sort_key)
+            for item in archived_items:
+                item.replace_or_add_prop(conf.ID, "(A)")
+            nr += print_matches(arch_file, archived_items)
+        if pending:
+            nr += print_matches(conf.todo_file, current_items)
+        suppress_if_quiet(u"{nr} matching todo items found".format(nr = nr), args)
         
 @doc_description("attaches a file to the given todo item",
     None,
@@ -798,9 +929,9 @@ def cmd_attach(tl, args):
             # we got an URL
             suppress_if_quiet(u"Attaching URL {url}".format(url = args.location), args)
             item.text += u" {url}".format(url = args.location)
-            item.urls.append(args.location.strip())
+            item.urls += (args.location.strip(),)
             tl.dirty = True
-            tl.reindex()
+            tl.reindex(item)
         else:
             # get path relative to todo file
             try:
@@ -815,7 +946,6 @@ def cmd_attach(tl, args):
             
             suppress_if_quiet(u"Attaching file {fn}".format(fn = path), args)
             tl.replace_or_add_prop(item, conf.FILE, path)
-            tl.reindex()
         suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
 
 @doc_description("detaches a file from a given todo item.",
@@ -856,6 +986,7 @@ def cmd_detach(tl, args):
             item = tl.replace_or_add_prop(item, conf.FILE, None, attmnt[1])
         else:
             item.text = u" ".join(item.text.replace(attmnt[1], "").split())
+            tl.reindex(item)
         suppress_if_quiet(u"  {item}".format(item = cr.render(item)), args)
         tl.dirty = True
 
@@ -891,6 +1022,7 @@ def cmd_repeat(tl, args):
         tl.replace_or_add_prop(new_item, conf.DUE, args.date, to_date(args.date))
         # set old item to done
         item.set_to_done()
+        tl.reindex(item)
         suppress_if_quiet(u"Marked todo item as 'done' and reinserted:\n  {item}".format(item = cr.render(new_item)), args)
         
 @doc_description("lists all todo items (current and done) matching the given expression, equivalent to 'list --all'",
@@ -928,7 +1060,7 @@ def cmd_mark(tl, args):
         nr = 0
         for marker in args_list:
             print(cr.wrap_marker(u"({marker})".format(marker = marker), reset=True))
-            for item in sorted(marker_dict[marker], cmp=tl.default_sort):
+            for item in sorted(marker_dict[marker], key=tl.default_sort_key):
                 print(u" ", cr.render(item))
                 nr += 1
         suppress_if_quiet(u"{nr} todo items displayed.".format(nr = nr), args)
@@ -1015,9 +1147,14 @@ def cmd_block(tl, args):
         if item.tid in blocked.properties.get(conf.BLOCKEDBY, []):
             print(u"Todo item '{item_id}' is already a pre-requisite of '{blocked_id}'.".format(item_id = item, blocked_id = blocked))
             return
+        cycle = DependencyGraph(tl).find_cycle(item.tid, blocked.tid)
+        if cycle:
+            print(u"Todo item '{item_id}' cannot block '{blocked_id}', this would create the cycle {cycle}.".format(
+                item_id = item.tid, blocked_id = blocked.tid, cycle = u" -> ".join(cycle)))
+            return
         tl.replace_or_add_prop(blocked, conf.BLOCKEDBY, item.tid)
-        tl.clean_dependencies()
-        tl.reindex()
+        # a done item does not block
+        tl.clean_dependencies(item)
         suppress_if_quiet(u"  {item}".format(item = cr.render(blocked)), args)
          
 
@@ -1041,11 +1178,61 @@ def cmd_unblock(tl, args):
                 item_id = item, blocked_id = blocked))
             return
         tl.remove_prop(blocked, conf.BLOCKEDBY, item.tid)
-        tl.clean_dependencies()
-        tl.reindex()
         suppress_if_quiet(u"  {item}".format(item = cr.render(blocked)), args)
 
 
+@doc_description("lists all open todo items that are not blocked by other items",
+    "The items are listed in the order of the todo list. With --critical, the items "
+        "that block the longest chains of other items come first. This command is only "
+        "usable with id support activated.",
+    {"critical": "if given, the items are sorted by the length of the chain of items they block"})
+def cmd_ready(tl, args):
+    """lists all open todo items that are not blocked by other items
+    """
+    with ColorRenderer() as cr:
+        if not conf.id_support:
+            print(u"ID support is deactivated. You cannot use this feature.")
+            return
+        graph = DependencyGraph(tl)
+        items = list(graph.ready_items())
+        if args.critical:
+            lengths = graph.critical_paths()
+            # sort is stable, items with equal lengths stay in list order
+            items.sort(key = lambda item: lengths.get(item.tid, 1), reverse = True)
+        for item in items:
+            print(" ", cr.render(item))
+        suppress_if_quiet(u"{nr} todo items displayed.".format(nr = len(items)), args)
+
+
+@doc_description("shows the dependencies between the open todo items",
+    "Lists all items that block or are blocked by other items, every item after the items "
+        "blocking it. Each item is prefixed with the length of the longest chain of items "
+        "it blocks. Items on a dependency cycle are listed separately. This command is only "
+        "usable with id support activated.",
+    None)
+def cmd_graph(tl, args): #@UnusedVariable
+    """shows the dependencies between the open todo items
+    """
+    with ColorRenderer() as cr:
+        if not conf.id_support:
+            print(u"ID support is deactivated. You cannot use this feature.")
+            return
+        graph = DependencyGraph(tl)
+        order, cyclic = graph.topological_order()
+        lengths = graph.critical_paths(order)
+        for tid in order:
+            print(u"  ({length:3d}) {item}".format(length = lengths[tid], item = cr.render(tl.get_item_by_index(tid))))
+            blockers = sorted(graph.blockers(tid))
+            if blockers:
+                print(u"        blocked by: {tids}".format(tids = u", ".join(cr.wrap_block(tid, reset = True) for tid in blockers)))
+        if cyclic:
+            print(u"Todo items on a dependency cycle:")
+            for tid in cyclic:
+                print(u"  {item}".format(item = cr.render(tl.get_item_by_index(tid))))
+                print(u"        blocked by: {tids}".format(tids = u", ".join(cr.wrap_block(tid, reset = True) for tid in sorted(graph.blockers(tid)))))
+        suppress_if_quiet(u"{nr} todo items displayed.".format(nr = len(order) + len(cyclic)), args)
+
+
 @doc_description("adding or editing a note to a todo item",
     "Opens a text file that contains further notes for a specific item.",
     {"item": "the id of the todo item that should be annotated",})
@@ -1096,4 +1283,12 @@ cmd_pr = cmd_project
 cmd_rep = cmd_report
 cmd_od = cmd_over = cmd_overdue
 cmd_ag = cmd_agenda
-cmd_x = cmd_done
\ No newline at end of file
+cmd_x = cmd_done
+
+# actions that work on single items, addressed by their ID: the todo list can be loaded lazily
+LAZY_ACTIONS = (cmd_attach, cmd_block, cmd_call, cmd_delay, cmd_detach, cmd_done, cmd_note, 
+                cmd_prio, cmd_remove, cmd_reopen, cmd_repeat, cmd_start, cmd_stop, cmd_unblock)
+# actions that only add items: the items can be appended without reading the todo list
+APPEND_ACTIONS = (cmd_add, )
+# actions that only read a single item: the item is looked up by its ID without loading the todo list
+LOOKUP_ACTIONS = (cmd_call, )
\ No newline at end of file
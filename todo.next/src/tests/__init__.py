@@ -0,0 +1,38 @@
+"""
+:mod:`tests`
+~~~~~~~~~~~~
+
+Provides the configuration shared by the tests, which do not read a configuration file.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from unittest2 import TestCase
+from todo.config import ConfigBorg
+
+# optional components, which are only used by the tests that set them up
+OPTIONAL_COMPONENTS = ("file_lock", "journal", "parse_cache", "search_index", "snapshot", "timings")
+
+
+def set_test_config():
+    """sets the configuration values the tests depend on and removes the optional components
+
+    :returns: the configuration
+    :rtype: :class:`ConfigBorg`
+    """
+    conf = ConfigBorg()
+    conf.date_formats = []
+    conf.id_support = True
+    conf.sort = True
+    for name in OPTIONAL_COMPONENTS:
+        if hasattr(conf, name):
+            delattr(conf, name)
+    return conf
+
+
+class ConfigTestCase(TestCase):
+    """test case that starts every test with the configuration of :func:`set_test_config`
+    """
+
+    def setUp(self):
+        set_test_config()
@@ -0,0 +1,688 @@
+"""
+:mod:`benchmarks`
+~~~~~~~~~~~~~~~~~
+
+Benchmarks for todo.next, run e.g. ``python -m tests.benchmarks memory 20000``
+from the source directory.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from __future__ import print_function
+
+from tests import set_test_config
+from todo.todoitem import TodoItem
+from todo.columns import TodoColumns
+from todo.todolist import TodoList
+from todo.parse_cache import ParseCache
+from todo.graph import DependencyGraph
+from todo.tid_allocator import TidAllocator
+from todo.tid_index import TidIndex
+from todo.appender import TodoAppender
+from todo.linereader import LineReader
+from todo.snapshot import Snapshot
+from todo.journal import Journal
+from todo.search_index import SearchIndex, get_literals
+from todo.archive_scan import scan, search_file, select_done
+from todo import date_trans
+
+import random, sys, os, tempfile, codecs, shutil, time, datetime, hashlib, re
+
+conf = set_test_config()
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+
+def create_lines(nr_of_lines, seed = 42):
+    """creates realistic todo lines (done and report items, priorities, projects, dates, ids)
+
+    :param nr_of_lines: number of lines to create
+    :type nr_of_lines: int
+    :param seed: seed for the randomizer
+    :type seed: int
+    :returns: list of lines
+    :rtype: list(str)
+    """
+    rnd = random.Random(seed)
+    lines = []
+    for nr in xrange(nr_of_lines):
+        parts = []
+        kind = rnd.random()
+        if kind < 0.3:
+            parts.append(u"x")
+        elif kind < 0.35:
+            parts.append(u"*")
+        if rnd.random() < 0.3:
+            parts.append(u"({prio})".format(prio = rnd.choice("ABCD")))
+        parts.append(u"{verb} item {nr} for the team".format(verb = rnd.choice([u"call", u"write", u"fix", u"Review"]), nr = nr))
+        if rnd.random() < 0.5:
+            parts.append(u"+project{nr}".format(nr = rnd.randint(0, 20)))
+        if rnd.random() < 0.5:
+            parts.append(u"@context{nr}".format(nr = rnd.randint(0, 10)))
+        if rnd.random() < 0.1:
+            parts.append(u"http://example.com/{nr}".format(nr = nr))
+        if rnd.random() < 0.3:
+            parts.append(u"due:2012-{m:02d}-{d:02d}".format(m = rnd.randint(1, 12), d = rnd.randint(1, 28)))
+        parts.append(u"created:2012-{m:02d}-{d:02d}".format(m = rnd.randint(1, 12), d = rnd.randint(1, 28)))
+        if kind < 0.35:
+            parts.append(u"done:2012-{m:02d}-{d:02d}_{h:02d}:{mi:02d}".format(
+                m = rnd.randint(1, 12), d = rnd.randint(1, 28), h = rnd.randint(0, 23), mi = rnd.randint(0, 59)))
+        parts.append(u"id:" + u"".join(rnd.choice(ALPHABET) for _ in xrange(4)))
+        lines.append(u" ".join(parts))
+    return lines
+
+
+def deep_size(obj, seen):
+    """returns the size of an object and all objects reachable from it that have not been seen yet
+
+    :param obj: the object
+    :type obj: object
+    :param seen: ids of already counted objects
+    :type seen: set(int)
+    :returns: size in bytes
+    :rtype: int
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.iteritems():
+            size += deep_size(key, seen) + deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for value in obj:
+            size += deep_size(value, seen)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(obj.__dict__, seen)
+    if hasattr(type(obj), "__slots__"):
+        for name in type(obj).__slots__:
+            if hasattr(obj, name):
+                size += deep_size(getattr(obj, name), seen)
+    return size
+
+
+def copy_string(string):
+    return string.encode("utf-8").decode("utf-8")
+
+
+class DictItem(object):
+    """the layout of todo items before :attr:`TodoItem.__slots__`: instance dictionary,
+    lists for every field and separate string instances
+    """
+    def __init__(self, item):
+        self.text = item.text
+        self.properties = dict((copy_string(key), value) for key, value in item.properties.items())
+        self.urls = list(item.urls)
+        self.markers = list(item.markers)
+        self.priority = item.priority
+        self.delegated_to, self.delegated_from = list(item.delegated_to), list(item.delegated_from)
+        self.projects = [copy_string(project) for project in item.projects]
+        self.contexts = [copy_string(context) for context in item.contexts]
+        self.done = item.done
+        self.is_report = item.is_report
+        self.nr = item.nr
+        self.dirty = item.dirty
+        self.line_nr = item.line_nr
+
+
+def bench_memory(nr_of_lines = 20000):
+    """prints the memory used per item for the different item representations
+    """
+    lines = create_lines(nr_of_lines)
+    items = [TodoItem(line) for line in lines]
+    # copies of strings are created explicitly, as the parser shares them now
+    dict_items = [DictItem(item) for item in items]
+    for name, objects in (("dict-based items", dict_items), ("slotted items", items)):
+        size = deep_size(objects, set()) - sys.getsizeof(objects)
+        print(u"{name:20}: {size:8.1f} bytes per item".format(name = name, size = float(size) / nr_of_lines))
+
+    fd, filename = tempfile.mkstemp(".txt", "todo.next.")
+    try:
+        with codecs.open(filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(lines))
+        columns = TodoColumns.from_file(filename)
+    finally:
+        os.close(fd)
+        os.unlink(filename)
+    size = sum(col.buffer_info()[1] * col.itemsize for col in
+               (columns.priorities, columns.flags, columns.due, columns.done, columns.created, columns.tids, columns.offsets))
+    size += deep_size(columns.other_tids, set())
+    print(u"{name:20}: {size:8.1f} bytes per item (without text)".format(name = "columnar store", size = float(size) / nr_of_lines))
+
+
+def bench_parse_cache(nr_of_lines = 20000):
+    """prints the time needed to create the items with an empty and with a filled parse cache
+    """
+    lines = create_lines(nr_of_lines)
+    dirname = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(dirname, "cache")
+        for name in ("empty cache", "filled cache"):
+            cache = ParseCache(filename)
+            start = time.time()
+            for line in lines:
+                cache.create_item(line)
+            duration = time.time() - start
+            cache.save()
+            print(u"{name:20}: {duration:8.3f} s ({hits} hits)".format(name = name, duration = duration, hits = cache.hits))
+    finally:
+        shutil.rmtree(dirname)
+
+
+def create_dates(nr_of_dates, seed = 42):
+    """creates date strings as found in todo files: mostly canonical dates and date times,
+    some custom formats and relative dates
+
+    :param nr_of_dates: number of date strings to create
+    :type nr_of_dates: int
+    :param seed: seed for the randomizer
+    :type seed: int
+    :returns: list of date strings
+    :rtype: list(str)
+    """
+    rnd = random.Random(seed)
+    dates = []
+    for _ in xrange(nr_of_dates):
+        kind = rnd.random()
+        month, day = rnd.randint(1, 12), rnd.randint(1, 28)
+        if kind < 0.6:
+            dates.append(u"2012-{m:02d}-{d:02d}".format(m = month, d = day))
+        elif kind < 0.95:
+            dates.append(u"2012-{m:02d}-{d:02d}_{h:02d}:{mi:02d}".format(m = month, d = day, h = rnd.randint(0, 23), mi = rnd.randint(0, 59)))
+        elif kind < 0.97:
+            dates.append(u"{d}.{m}.2012".format(m = month, d = day))
+        else:
+            dates.append(rnd.choice([u"today", u"tomorrow", u"+1d", u"m2w", u"friday"]))
+    return dates
+
+
+def bench_dates(nr_of_dates = 100000):
+    """prints the time needed for parsing a realistic corpus of date strings
+    """
+    dates = create_dates(nr_of_dates)
+    conf.date_formats = [u"%d.%m.", u"%e.%m.", u"%d.%m.%Y"]
+    if date_trans.USE_DATEUTIL:
+        today = datetime.datetime.today()
+        start = time.time()
+        for date in dates:
+            try:
+                date_trans.parse(date.replace("_", " "), default = today)
+            except ValueError:
+                pass
+        print(u"{name:20}: {duration:8.3f} s".format(name = "dateutil only", duration = time.time() - start))
+    for name in ("to_date (cold)", "to_date (warm)"):
+        start = time.time()
+        for date in dates:
+            date_trans.to_date(date)
+        print(u"{name:20}: {duration:8.3f} s".format(name = name, duration = time.time() - start))
+
+
+def cmp_sort(item1, item2):
+    """the comparison function :meth:`TodoList.default_sort` was before the sort keys
+    """
+    i1, i2 = (item1.is_report or item1.done), (item2.is_report or item2.done)
+    if i1 and not i2:
+        return 1
+    if not i1 and i2:
+        return -1
+    i1, i2 = (item1.priority or "ZZ"), (item2.priority or "ZZ")
+    if i1 > i2:
+        return 1
+    elif i1 < i2:
+        return -1
+    (i1, i2) = (item1.done_date if isinstance(item1.done_date, datetime.datetime) else datetime.datetime(1970, 1, 1), 
+                item2.done_date if isinstance(item2.done_date, datetime.datetime) else datetime.datetime(1970, 1, 1))
+    if i1 < i2:
+        return 1
+    if i1 > i2:
+        return -1
+    (i1, i2) = (item1.due_date if isinstance(item1.due_date, datetime.datetime) else datetime.datetime(1970, 1, 1), 
+                item2.due_date if isinstance(item2.due_date, datetime.datetime) else datetime.datetime(1970, 1, 1))
+    if i1 < i2:
+        return 1
+    if i1 > i2:
+        return -1
+    i1, i2 = item1.text.lower(), item2.text.lower()
+    if i1 > i2:
+        return 1
+    elif i1 < i2:
+        return -1
+    return 0
+
+
+def bench_sort(nr_of_lines = 100000):
+    """prints the time needed for sorting the items with the comparison function and the sort keys
+    """
+    items = [TodoItem(line) for line in create_lines(nr_of_lines)]
+    random.Random(42).shuffle(items)
+    start = time.time()
+    cmp_sorted = sorted(items, cmp = cmp_sort)
+    print(u"{name:20}: {duration:8.3f} s".format(name = "cmp function", duration = time.time() - start))
+    for name in ("sort keys (new)", "sort keys (cached)"):
+        start = time.time()
+        key_sorted = sorted(items, key = TodoList.default_sort_key)
+        print(u"{name:20}: {duration:8.3f} s".format(name = name, duration = time.time() - start))
+    assert [id(item) for item in cmp_sorted] == [id(item) for item in key_sorted]
+
+
+class RegexItem(TodoItem):
+    """todo item changing properties like :meth:`TodoItem.replace_or_add_prop` before the
+    property positions were kept: with a regular expression per call and string replacement
+    """
+    __slots__ = ()
+    
+    def replace_or_add_prop(self, property_name, new_property_value, real_property_value = None):
+        re_replace_prop = re.compile(r"\b({prop_key}:.+?)(?:$|\s)".format(prop_key = property_name), re.UNICODE)
+        matches = re_replace_prop.findall(self.text)
+        if property_name in conf.MULTI_PROPS:
+            self.properties.setdefault(property_name, []).append(real_property_value or new_property_value)
+        else:
+            self.properties[property_name] = real_property_value or new_property_value
+        new_prop = u"{prop_key}:{prop_val}".format(prop_key = property_name, prop_val = new_property_value)
+        if len(matches) > 0 and property_name not in conf.MULTI_PROPS:
+            self.text = self.text.replace(matches[0], new_prop, 1)
+            for match in matches[1:]:
+                self.text = self.text.replace(match, "")
+        else:
+            self.text = self.text.strip() + u" " + new_prop
+        self.dirty = True
+        return self
+
+
+def bench_edits(nr_of_lines = 20000, nr_of_edits = 10):
+    """prints the time needed for changing properties of many items (delaying, attaching and 
+    setting to done), once on the item text with regular expressions and once with the
+    property positions
+    """
+    lines = create_lines(nr_of_lines)
+    edits = [(conf.DUE, u"2013-01-{day:02d}".format(day = day + 1)) for day in xrange(nr_of_edits)]
+    edits.extend((conf.FILE, u"notes{nr}.txt".format(nr = nr)) for nr in xrange(nr_of_edits))
+    edits.append((conf.DONE, u"2013-02-01"))
+    texts = []
+    for name, item_class in (("regular expressions", RegexItem), ("property positions", TodoItem)):
+        items = [item_class(line) for line in lines]
+        start = time.time()
+        for prop_name, prop_value in edits:
+            for item in items:
+                item.replace_or_add_prop(prop_name, prop_value)
+        print(u"{name:20}: {duration:8.3f} s".format(name = name, duration = time.time() - start))
+        texts.append([item.text for item in items])
+    assert texts[0] == texts[1]
+
+
+def write_todo_file(lines):
+    """writes lines to a temporary todo file
+
+    :param lines: the lines
+    :type lines: list(str)
+    :returns: the file name
+    :rtype: str
+    """
+    fd, filename = tempfile.mkstemp(".txt", "todo.next.")
+    os.close(fd)
+    with codecs.open(filename, "w", "utf-8") as fp:
+        fp.write(u"\n".join(lines))
+    return filename
+
+
+def bench_changes(nr_of_lines = 20000, nr_of_changes = 200):
+    """prints the time needed for changing the priority of many items, once with the
+    sorted item list and once sorting the whole list after every change as before
+    """
+    filename = write_todo_file(create_lines(nr_of_lines))
+    try:
+        rnd = random.Random(42)
+        tl = TodoList(filename)
+        changes = [(rnd.randrange(nr_of_lines), rnd.choice([None, "A", "B", "C"])) for _ in xrange(nr_of_changes)]
+        start = time.time()
+        for nr, prio in changes:
+            tl.set_priority(tl.todolist[nr], prio)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "sorted item list", duration = time.time() - start))
+        order = [item.text for item in tl.todolist]
+
+        tl = TodoList(filename)
+        items = list(tl.todolist)
+        start = time.time()
+        for nr, prio in changes:
+            item = items[nr]
+            item.text = item.text[4:] if item.priority else item.text
+            if prio:
+                item.text = u"({prio}) {text}".format(prio = prio, text = item.text)
+            item.priority = prio
+            items.sort(key = TodoList.default_sort_key)
+            for pos, item in enumerate(items):
+                item.nr = pos
+        print(u"{name:20}: {duration:8.3f} s".format(name = "full sort", duration = time.time() - start))
+        assert order == [item.text for item in items]
+    finally:
+        os.unlink(filename)
+
+
+def bench_archive(nr_of_lines = 60000):
+    """prints the time needed for removing all done and report items (as archiving does),
+    without and with a batch
+    """
+    lines = create_lines(nr_of_lines)
+    rnd = random.Random(42)
+    # let some items depend on others
+    lines = [line + (u" blockedby:" + lines[rnd.randrange(nr_of_lines)].rsplit(":", 1)[1] if rnd.random() < 0.1 else u"")
+             for line in lines]
+    filename = write_todo_file(lines)
+    try:
+        for name in ("single changes", "batch"):
+            tl = TodoList(filename)
+            done_items = list(tl.list_items(lambda item: item.done or item.is_report))
+            start = time.time()
+            if name == "batch":
+                with tl.batch():
+                    for item in done_items:
+                        tl.remove_item(item)
+            else:
+                for item in done_items:
+                    tl.remove_item(item)
+            print(u"{name:20}: {duration:8.3f} s ({nr} items)".format(name = name, duration = time.time() - start, nr = len(done_items)))
+    finally:
+        os.unlink(filename)
+
+
+def bench_lookup(nr_of_lines = 100000, nr_of_lookups = 1000):
+    """prints the time needed for looking up items by tid and by index number, compared to
+    the linear search for the position of an item
+    """
+    filename = write_todo_file(create_lines(nr_of_lines))
+    try:
+        tl = TodoList(filename)
+        rnd = random.Random(42)
+        tids = rnd.sample(sorted(tl.tids), nr_of_lookups)
+        nrs = [str(rnd.randrange(nr_of_lines)) for _ in xrange(nr_of_lookups)]
+        start = time.time()
+        items = tl.get_items_by_index_list(tids + nrs)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "indexed lookup", duration = time.time() - start))
+        items, plain_list = items[:nr_of_lookups], list(tl.todolist)
+        start = time.time()
+        for item in items:
+            assert item.nr == plain_list.index(item)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "linear search", duration = time.time() - start))
+    finally:
+        os.unlink(filename)
+
+
+def bench_graph(nr_of_items = 5000, nr_of_blockers = 3):
+    """prints the time needed for the dependency graph operations on a list of open items,
+    each one blocked by several items before it
+    """
+    rnd = random.Random(42)
+    tids = [u"g{nr:06d}".format(nr = nr) for nr in xrange(nr_of_items)]
+    lines = []
+    for nr, tid in enumerate(tids):
+        blockers = rnd.sample(tids[max(0, nr - 50):nr], min(nr, nr_of_blockers))
+        lines.append(u"work on item {nr} id:{tid}".format(nr = nr, tid = tid) + 
+                     u"".join(u" blockedby:" + blocker for blocker in blockers))
+    filename = write_todo_file(lines)
+    try:
+        graph = DependencyGraph(TodoList(filename))
+        start = time.time()
+        nr_of_ready = len(list(graph.ready_items()))
+        print(u"{name:20}: {duration:8.3f} s ({nr} items)".format(name = "ready items", duration = time.time() - start, nr = nr_of_ready))
+        start = time.time()
+        order, cyclic = graph.topological_order()
+        assert len(order) == nr_of_items and not cyclic
+        print(u"{name:20}: {duration:8.3f} s".format(name = "topological order", duration = time.time() - start))
+        start = time.time()
+        lengths = graph.critical_paths(order)
+        print(u"{name:20}: {duration:8.3f} s (longest {nr})".format(name = "critical paths", duration = time.time() - start, nr = max(lengths.values())))
+        start = time.time()
+        for _ in xrange(100):
+            assert graph.find_cycle(tids[-1], tids[0])
+            assert not graph.find_cycle(tids[0], tids[-1])
+        print(u"{name:20}: {duration:8.3f} s".format(name = "100 cycle checks", duration = time.time() - start))
+    finally:
+        os.unlink(filename)
+
+
+def md5_tid(text, used_tids):
+    """the tid creation of :meth:`TodoList.create_tid` before the tid allocator: salted
+    MD5 hashes of the item text, giving up after 60 attempts
+    """
+    for _ in xrange(60):
+        text = random.choice(ALPHABET) + text
+        nr = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:4], 16) % 26 ** 3
+        tid = "".join(ALPHABET[nr // 26 ** pos % 26] for pos in (2, 1, 0))
+        if tid not in used_tids:
+            return tid
+    return "xxx"
+
+
+def bench_tids(nr_of_tids = 20000):
+    """prints the time needed for creating many tids with salted hashes and with the
+    tid allocator, and the number of failed attempts
+    """
+    used_tids, failed = set(), 0
+    start = time.time()
+    for nr in xrange(nr_of_tids):
+        tid = md5_tid(u"item {nr}".format(nr = nr), used_tids)
+        if tid in used_tids:
+            failed += 1
+        used_tids.add(tid)
+    print(u"{name:20}: {duration:8.3f} s ({nr} failed)".format(name = "salted hashes", 
+        duration = time.time() - start, nr = failed))
+    allocator = TidAllocator()
+    start = time.time()
+    tids = set(allocator.allocate() for _ in xrange(nr_of_tids))
+    print(u"{name:20}: {duration:8.3f} s ({nr} failed, {length} letters)".format(name = "tid allocator", 
+        duration = time.time() - start, nr = nr_of_tids - len(tids), length = allocator.length))
+
+
+def bench_add(nr_of_lines = 100000):
+    """prints the time needed for adding an item to todo files of different sizes, once by
+    loading and writing the todo list and once by appending with a tid index
+    """
+    for size in (1000, nr_of_lines):
+        filename = write_todo_file(create_lines(size))
+        index_filename = filename + ".index"
+        try:
+            start = time.time()
+            with TodoList(filename) as tl:
+                tl.add_item(u"Call Bob +phone blockedby:aaaa")
+            print(u"{name:20}: {duration:8.3f} s".format(name = "load ({size} items)".format(size = size), 
+                duration = time.time() - start))
+            tid_index = TidIndex(index_filename)
+            tid_index.rebuild(tl)
+            tid_index.save(filename)
+            # the written todo file should not be flushed to disk while appending
+            with open(filename, "rb+") as fp:
+                os.fsync(fp.fileno())
+            start = time.time()
+            tid_index = TidIndex(index_filename)
+            assert tid_index.is_current(filename)
+            with TodoAppender(filename, tid_index) as tl:
+                tl.add_item(u"Call Bob +phone blockedby:aaaa")
+            print(u"{name:20}: {duration:8.3f} s".format(name = "append ({size} items)".format(size = size), 
+                duration = time.time() - start))
+        finally:
+            os.unlink(filename)
+            if os.path.exists(index_filename):
+                os.unlink(index_filename)
+
+
+def bench_search(nr_of_lines = 200000):
+    """prints the time needed for searching an archive file by loading it as todo list (as
+    :func:`cmd_search` did before) and with the memory mapped reader
+    """
+    filename = write_todo_file(create_lines(nr_of_lines))
+    re_search = re.compile(u"Review", re.UNICODE)
+    try:
+        for name, search in [
+            ("todo list", lambda: [item for item in TodoList(filename).todolist if re_search.search(item.text)]),
+            ("reader (regex)", lambda: [TodoItem(text) for _, text in LineReader(filename).search(re_search)]),
+            ("reader (plain)", lambda: [TodoItem(text) for _, text in LineReader(filename).find("Review")]),
+            ]:
+            start = time.time()
+            matches = search()
+            print(u"{name:20}: {duration:8.3f} s ({nr} matches)".format(name = name, 
+                duration = time.time() - start, nr = len(matches)))
+    finally:
+        os.unlink(filename)
+
+
+def bench_search_index(nr_of_lines = 200000, nr_of_files = 1000):
+    """prints the time needed for searching archive files with the memory mapped reader and
+    through the trigram index
+    """
+    lines = create_lines(nr_of_lines)
+    per_file = nr_of_lines // nr_of_files
+    filenames = [write_todo_file(lines[nr:nr + per_file]) for nr in xrange(0, nr_of_lines, per_file)]
+    index_filename = write_todo_file([])
+    re_search = re.compile(u"item 4711 ", re.UNICODE)
+    index = SearchIndex(index_filename)
+    try:
+        start = time.time()
+        index.rebuild(filenames)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "build index", duration = time.time() - start))
+        def search_index():
+            candidates = SearchIndex(index_filename).find(filenames, get_literals(re_search.pattern))
+            matches = []
+            for filename in sorted(candidates):
+                with LineReader(filename) as reader:
+                    texts = (reader.get_text_at(offset) for offset in candidates[filename])
+                    matches.extend(TodoItem(text) for text in texts if re_search.search(text))
+            return matches
+        def search_reader():
+            matches = []
+            for filename in filenames:
+                with LineReader(filename) as reader:
+                    matches.extend(TodoItem(text) for _, text in reader.search(re_search))
+            return matches
+        for name, search in [("reader", search_reader), ("index", search_index)]:
+            start = time.time()
+            matches = search()
+            print(u"{name:20}: {duration:8.3f} s ({nr} matches)".format(name = name, 
+                duration = time.time() - start, nr = len(matches)))
+    finally:
+        index.close()
+        for filename in filenames + [index_filename, index_filename + ".delta"]:
+            if os.path.exists(filename):
+                os.unlink(filename)
+
+
+def bench_scan(nr_of_lines = 200000, nr_of_files = 1000, jobs = 4):
+    """prints the time needed for searching archive files and selecting their done items
+    in the calling process and in worker processes
+    """
+    lines = create_lines(nr_of_lines)
+    per_file = nr_of_lines // nr_of_files
+    filenames = [write_todo_file(lines[nr:nr + per_file]) for nr in xrange(0, nr_of_lines, per_file)]
+    try:
+        for name, func, tasks in [
+            ("search", search_file, [(fn, u"Review", re.UNICODE, None, None) for fn in filenames]),
+            ("select done", select_done, [(fn, datetime.datetime(2012, 3, 1), datetime.datetime(2012, 3, 31), 
+                                           datetime.datetime(1970, 1, 1), False) for fn in filenames]),
+            ]:
+            for nr_of_jobs in (1, jobs):
+                start = time.time()
+                matches = sum(len(texts) for texts in scan(func, tasks, nr_of_jobs))
+                print(u"{name:20}: {duration:8.3f} s ({nr} matches, {jobs} jobs)".format(name = name, 
+                    duration = time.time() - start, nr = matches, jobs = nr_of_jobs))
+    finally:
+        for filename in filenames:
+            os.unlink(filename)
+
+
+def bench_report(items_per_day = 20, nr_of_years = 10):
+    """prints the time needed for selecting the items of the last week from an archive file
+    sorted by done date, by reading the whole file and by reading it from the end, for one and
+    for ``nr_of_years`` years of archived items
+    """
+    end = datetime.datetime(2012, 12, 31)
+    for years in (1, nr_of_years):
+        lines = []
+        for day in xrange(365 * years, 0, -1):
+            date = end - datetime.timedelta(days = day - 1)
+            lines.extend(u"x write item {nr} for the team done:{date}".format(nr = nr, date = date.strftime("%Y-%m-%d"))
+                         for nr in xrange(items_per_day))
+        filename = write_todo_file(lines)
+        try:
+            for chronological in (False, True):
+                start = time.time()
+                texts = select_done((filename, end - datetime.timedelta(days = 6), end, datetime.datetime(1970, 1, 1), chronological))
+                print(u"{name:20}: {duration:8.3f} s ({nr} items, {years} years)".format(
+                    name = "from the end" if chronological else "whole file", duration = time.time() - start, 
+                    nr = len(texts), years = years))
+        finally:
+            os.unlink(filename)
+
+
+def bench_snapshot(nr_of_lines = 50000):
+    """prints the time needed for loading a todo list by parsing the file and from a snapshot
+    """
+    filename = write_todo_file(create_lines(nr_of_lines))
+    snapshot_filename = filename + ".snapshot"
+    try:
+        start = time.time()
+        TodoList(filename)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "parse", duration = time.time() - start))
+        conf.snapshot = Snapshot(snapshot_filename, filename)
+        start = time.time()
+        TodoList(filename)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "parse and save", duration = time.time() - start))
+        start = time.time()
+        TodoList(filename)
+        print(u"{name:20}: {duration:8.3f} s".format(name = "snapshot", duration = time.time() - start))
+    finally:
+        del conf.snapshot
+        os.unlink(filename)
+        if os.path.exists(snapshot_filename):
+            os.unlink(snapshot_filename)
+
+
+def bench_journal(nr_of_lines = 100000, nr_of_changes = 20):
+    """prints the time needed for writing single changes, once by rewriting the todo file 
+    and once by appending them to a journal
+    """
+    filename = write_todo_file(create_lines(nr_of_lines))
+    journal_filename = filename + ".journal"
+    try:
+        for name, journal in [("rewrite", None), ("journal", Journal(journal_filename, filename, nr_of_changes * 2))]:
+            conf.journal = journal
+            rnd = random.Random(42)
+            tl = TodoList(filename)
+            tl.write()
+            duration = 0.0
+            for _ in xrange(nr_of_changes):
+                tl.set_priority(tl.todolist[rnd.randrange(nr_of_lines)], rnd.choice(["A", "B", "C"]))
+                start = time.time()
+                tl.write()
+                duration += time.time() - start
+            print(u"{name:20}: {duration:8.3f} s per change".format(name = name, duration = duration / nr_of_changes))
+    finally:
+        del conf.journal
+        os.unlink(filename)
+        if os.path.exists(journal_filename):
+            os.unlink(journal_filename)
+
+
+BENCHMARKS = {
+    "add": bench_add,
+    "archive": bench_archive,
+    "changes": bench_changes,
+    "dates": bench_dates,
+    "edits": bench_edits,
+    "graph": bench_graph,
+    "journal": bench_journal,
+    "lookup": bench_lookup,
+    "memory": bench_memory,
+    "parse_cache": bench_parse_cache,
+    "scan": bench_scan,
+    "report": bench_report,
+    "search": bench_search,
+    "search_index": bench_search_index,
+    "snapshot": bench_snapshot,
+    "sort": bench_sort,
+    "tids": bench_tids,
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(u"usage: python -m tests.benchmarks {names} [nr_of_items]".format(names = "|".join(sorted(BENCHMARKS))))
+        sys.exit(-1)
+    BENCHMARKS[sys.argv[1]](*[int(arg) for arg in sys.argv[2:]])
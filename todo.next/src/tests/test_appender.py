@@ -0,0 +1,63 @@
+"""
+:mod:`test_appender`
+~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.tid_index import TidIndex
+from todo.appender import TodoAppender
+
+import codecs, os, shutil, tempfile, time
+
+conf = ConfigBorg()
+
+LINES = [
+    u"(B) Write report +work id:aaa",
+    u"x Buy milk done:2012-07-01 id:ccc",
+    ]
+
+
+class TestTodoAppender(ConfigTestCase):
+
+    def setUp(self):
+        super(TestTodoAppender, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        self.index_filename = os.path.join(self.dirname, "index")
+        # the last line is not terminated
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        tid_index = TidIndex(self.index_filename)
+        tid_index.rebuild(TodoList(self.filename))
+        tid_index.save(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_append(self):
+        tid_index = TidIndex(self.index_filename)
+        self.assertTrue(tid_index.is_current(self.filename))
+        with TodoAppender(self.filename, tid_index) as tl:
+            item = tl.add_item(u"Call Bob blockedby:aaa blockedby:ccc blockedby:zzz")
+            other = tl.add_item(u"Call Alice id:ddd blockedby:" + item.tid)
+        self.assertNotIn(item.tid, (u"aaa", u"ccc", u"ddd"))
+        # only open items can block
+        self.assertEqual(item.properties[conf.BLOCKEDBY], [u"aaa"])
+        self.assertEqual(other.properties[conf.BLOCKEDBY], [item.tid])
+        self.assertIn(conf.CREATED, item.properties)
+        self.assertTrue(TidIndex(self.index_filename).is_current(self.filename))
+        tl = TodoList(self.filename)
+        self.assertEqual(len(tl.todolist), 4)
+        self.assertEqual(tl.get_item_by_index(item.tid).text, item.text)
+        self.assertEqual(tl.dependencies[u"ddd"], set([item.tid]))
+
+    def test_changed_file(self):
+        # the modification time may have a resolution of seconds
+        time.sleep(1)
+        with TodoList(self.filename) as tl:
+            tl.set_priority(tl.get_item_by_index("aaa"), "A")
+        self.assertFalse(TidIndex(self.index_filename).is_current(self.filename))
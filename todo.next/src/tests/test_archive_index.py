@@ -0,0 +1,116 @@
+"""
+:mod:`test_archive_index`
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.todoitem import TodoItem
+from todo.archive_index import ArchiveIndex, get_scheme_date
+
+import codecs, datetime, os, shutil, tempfile, time
+
+
+SCHEME = os.path.join("archive", "%Y-%m", "%Y-%m-%d_report.txt")
+UNSORTED = "unsorted.txt"
+
+
+class TestArchiveIndex(ConfigTestCase):
+
+    def setUp(self):
+        super(TestArchiveIndex, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.write_archive("archive/2026-09/2026-09-30_report.txt", [u"x Write report done:2026-09-30"])
+        self.write_archive("archive/2026-10/2026-10-02_report.txt", [u"x Call Bob done:2026-10-02", u"Review slides"])
+        self.write_archive(UNSORTED, [u"x Buy milk"])
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def write_archive(self, name, lines, mode = "w"):
+        filename = os.path.join(self.dirname, name)
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with codecs.open(filename, mode, "utf-8") as fp:
+            fp.write(u"".join(line + u"\n" for line in lines))
+        return filename
+
+    def get_index(self):
+        return ArchiveIndex(os.path.join(self.dirname, "index"), self.dirname, SCHEME, UNSORTED)
+
+    def get_names(self, filenames):
+        return [os.path.relpath(fn, self.dirname).replace(os.sep, "/") for fn in filenames]
+
+    def test_scheme_date(self):
+        self.assertEqual(get_scheme_date("%Y-%m/%Y-%m-%d.txt", "2026-10/2026-10-02.txt"), datetime.datetime(2026, 10, 2))
+        self.assertIsNone(get_scheme_date("%Y-%m/%Y-%m-%d.txt", "unsorted.txt"))
+
+    def test_select(self):
+        index = self.get_index()
+        self.assertEqual(self.get_names(index.get_files()), ["archive/2026-09/2026-09-30_report.txt",
+            "archive/2026-10/2026-10-02_report.txt", UNSORTED])
+        self.assertEqual(self.get_names(index.select_done(datetime.datetime(2026, 10, 1), datetime.datetime(2026, 10, 2))),
+            ["archive/2026-10/2026-10-02_report.txt"])
+        # items without done date are done on 1970-01-01
+        self.assertEqual(self.get_names(index.select_done(datetime.datetime(1970, 1, 1), datetime.datetime(2000, 1, 1))),
+            [UNSORTED])
+        index.save()
+        # the saved index is used without reading the archive files again
+        index = self.get_index()
+        self.assertFalse(index.changed)
+        index.refresh()
+        self.assertFalse(index.changed)
+
+    def test_changes(self):
+        index = self.get_index()
+        index.refresh()
+        # appended items are added to the index
+        filename = self.write_archive("archive/2026-10/2026-10-02_report.txt", [u"x Call Alice done:2026-10-05"], "a")
+        index.add_items(filename, [TodoItem(u"x Call Alice done:2026-10-05")])
+        filename = self.write_archive("archive/2026-11/2026-11-01_report.txt", [u"x Buy milk done:2026-11-01"])
+        index.add_items(filename, [TodoItem(u"x Buy milk done:2026-11-01")])
+        self.assertEqual(index.files["archive/2026-10/2026-10-02_report.txt".replace("/", os.sep)]["count"], 3)
+        self.assertEqual(index.get_done_range(filename), (datetime.datetime(2026, 11, 1), datetime.datetime(2026, 11, 1)))
+        self.assertTrue(index.is_chronological(filename))
+        # an item done before the last archived item
+        self.write_archive("archive/2026-11/2026-11-01_report.txt", [u"x Call Bob done:2026-10-30"], "a")
+        index.add_items(filename, [TodoItem(u"x Call Bob done:2026-10-30")])
+        self.assertFalse(index.is_chronological(filename))
+        index.save()
+        # files changed otherwise are read again, removed files are dropped
+        index = self.get_index()
+        self.write_archive(UNSORTED, [u"x Call Carl done:2026-10-05"], "a")
+        os.remove(os.path.join(self.dirname, "archive/2026-09/2026-09-30_report.txt"))
+        self.assertEqual(self.get_names(index.select_done(datetime.datetime(2026, 10, 5), datetime.datetime(2026, 10, 5))),
+            ["archive/2026-10/2026-10-02_report.txt", UNSORTED])
+        self.assertEqual(len(index.get_files()), 3)
+        self.assertTrue(index.changed)
+
+    def test_rotate(self):
+        index = self.get_index()
+        index.refresh()
+        self.assertEqual(index.rotate(), [])
+        # files that have not been written for a day are compressed
+        old_filename = os.path.join(self.dirname, "archive/2026-09/2026-09-30_report.txt")
+        os.utime(old_filename, (time.time() - 2 * 86400, ) * 2)
+        index.refresh()
+        self.assertEqual(index.rotate(max_age = 1), [old_filename + ".gz"])
+        self.assertFalse(os.path.exists(old_filename))
+        # items archived later are appended to the compressed file by the next rotation
+        self.write_archive("archive/2026-09/2026-09-30_report.txt", [u"x Call Bob done:2026-09-30"])
+        index.refresh()
+        self.assertEqual(len(index.rotate(max_size = 1)), 3)
+        self.assertEqual(self.get_names(index.get_files()), ["archive/2026-09/2026-09-30_report.txt.gz",
+            "archive/2026-10/2026-10-02_report.txt.gz", UNSORTED + ".gz"])
+        self.assertEqual(self.get_names(index.select_done(datetime.datetime(2026, 9, 30), datetime.datetime(2026, 9, 30))),
+            ["archive/2026-09/2026-09-30_report.txt.gz"])
+        entry = dict(index.files["archive/2026-09/2026-09-30_report.txt.gz".replace("/", os.sep)])
+        self.assertEqual(entry["count"], 2)
+        self.assertTrue(entry["sorted"])
+        # the entries of the compressed files are those of a newly built index
+        index.save()
+        os.remove(os.path.join(self.dirname, "index"))
+        index = self.get_index()
+        index.refresh()
+        self.assertEqual(index.files["archive/2026-09/2026-09-30_report.txt.gz".replace("/", os.sep)], entry)
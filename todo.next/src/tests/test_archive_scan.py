@@ -0,0 +1,64 @@
+"""
+:mod:`test_archive_scan`
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.archive_scan import scan, search_file, select_done
+from todo.files import compress_file
+from todo.parse_cache import ParseCache
+from todo.config import ConfigBorg
+
+import codecs, datetime, os, re, shutil, tempfile
+
+
+class TestArchiveScan(ConfigTestCase):
+
+    def setUp(self):
+        super(TestArchiveScan, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filenames = []
+        for nr in xrange(6):
+            filename = os.path.join(self.dirname, "archive{nr}.txt".format(nr = nr))
+            with codecs.open(filename, "w", "utf-8") as fp:
+                fp.write(u"x Call Bob {nr} done:2012-07-0{day}\n".format(nr = nr, day = nr + 1))
+                fp.write(u"x Write report {nr} done:2012-08-01\n".format(nr = nr))
+            self.filenames.append(filename)
+        # the archive files are only read
+        self.stamps = [os.stat(fn).st_mtime for fn in self.filenames]
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_search(self):
+        tasks = [(fn, u"call", re.UNICODE | re.IGNORECASE, None, None) for fn in self.filenames]
+        results = list(scan(search_file, tasks, 3))
+        self.assertEqual(results, list(scan(search_file, tasks)))
+        self.assertEqual(results[4], [u"x Call Bob 4 done:2012-07-05"])
+        # only the candidate lines are searched
+        self.assertEqual(list(scan(search_file, [(self.filenames[0], u"report", re.UNICODE, "report", [0])])), [[]])
+        self.assertEqual(self.stamps, [os.stat(fn).st_mtime for fn in self.filenames])
+
+    def test_select_done(self):
+        tasks = [(fn, datetime.datetime(2012, 7, 2), datetime.datetime(2012, 7, 3), datetime.datetime(1970, 1, 1), False)
+                 for fn in self.filenames]
+        results = list(scan(select_done, tasks, 2))
+        # the archive lines are not added to the parse cache of the todo file
+        conf = ConfigBorg()
+        conf.parse_cache = ParseCache(os.path.join(self.dirname, "cache"))
+        self.assertEqual(list(scan(select_done, tasks)), results)
+        self.assertFalse(conf.parse_cache.dirty)
+        self.assertEqual(results, list(scan(select_done, tasks)))
+        self.assertEqual([len(texts) for texts in results], [0, 1, 1, 0, 0, 0])
+        # the files are sorted by done date, they are read from the end
+        tasks = [task[:-1] + (True, ) for task in tasks]
+        self.assertEqual(list(scan(select_done, tasks)), results)
+        task = (self.filenames[0], datetime.datetime(2012, 7, 1), datetime.datetime(2012, 8, 1), datetime.datetime(1970, 1, 1), True)
+        self.assertEqual(select_done(task), [u"x Call Bob 0 done:2012-07-01", u"x Write report 0 done:2012-08-01"])
+        # compressed files are read from the start
+        compress_file(self.filenames[0], self.filenames[0] + ".gz")
+        task = (self.filenames[0] + ".gz", datetime.datetime(2012, 7, 1), datetime.datetime(2012, 7, 1), datetime.datetime(1970, 1, 1), True)
+        self.assertEqual(select_done(task), [u"x Call Bob 0 done:2012-07-01"])
+        self.assertEqual(select_done(task[:-1] + (False, )), [u"x Call Bob 0 done:2012-07-01"])
@@ -0,0 +1,52 @@
+"""
+:mod:`test_date_trans`
+~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from unittest2 import TestCase
+from todo.config import ConfigBorg
+from todo import date_trans
+from todo.date_trans import to_date, from_date, parse_canonical_date
+
+import datetime
+
+conf = ConfigBorg()
+
+
+class TestToDate(TestCase):
+
+    def setUp(self):
+        self.date_formats = getattr(conf, "date_formats", None)
+        conf.date_formats = [u"%d.%m.", u"%d.%m.%Y"]
+
+    def tearDown(self):
+        conf.date_formats = self.date_formats
+
+    def test_canonical(self):
+        for date in (datetime.datetime(2012, 7, 2), datetime.datetime(2012, 7, 2, 17, 30)):
+            self.assertEqual(to_date(from_date(date)), date)
+            # memoized
+            self.assertEqual(to_date(from_date(date)), date)
+        self.assertEqual(to_date(u" 2012-07-02 "), datetime.datetime(2012, 7, 2))
+        for date_string in (u"2012-13-02", u"2012-02-30", u"2012-7-2", u"2012-07-02 17:30", u"20120-7-02", u"2012-07-02_1730x"):
+            self.assertIsNone(parse_canonical_date(date_string))
+        self.assertEqual(to_date(u"2012-13-02"), u"?2012-13-02")
+
+    def test_custom_formats(self):
+        self.assertEqual(to_date(u"21.12.2013"), datetime.datetime(2013, 12, 21))
+        # formats without year depend on the reference date
+        reference_date = datetime.datetime(2012, 1, 1)
+        self.assertEqual(to_date(u"21.12.", reference_date).year, 2012)
+        self.assertEqual(to_date(u"21.12.", reference_date.replace(year=2013)).year, 2013)
+        # memoized dates are dropped if the formats change
+        conf.date_formats = []
+        to_date(u"2012-01-01")
+        self.assertNotIn(u"21.12.2013", date_trans.absolute_dates.entries)
+
+    def test_relative(self):
+        reference_date = datetime.datetime(2012, 1, 1, 10, 0)
+        self.assertEqual(to_date(u"today", reference_date), reference_date)
+        self.assertEqual(to_date(u"+1d", reference_date), datetime.datetime(2012, 1, 2, 10, 0))
+        self.assertEqual(to_date(u"+1d", reference_date.replace(day=5)), datetime.datetime(2012, 1, 6, 10, 0))
@@ -0,0 +1,65 @@
+"""
+:mod:`test_graph`
+~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.graph import DependencyGraph
+
+import codecs, os, tempfile
+
+conf = ConfigBorg()
+
+LINES = [
+    u"(B) Write report +work id:aaa",
+    u"Call Bob @phone id:bbb blockedby:aaa",
+    u"x Buy milk done:2012-07-01 id:ccc",
+    u"(A) Prepare talk due:2012-08-01 id:ddd blockedby:bbb blockedby:eee",
+    u"Review slides id:eee",
+    u"Give talk id:ggg blockedby:ddd",
+    u"* Met Alice done:2012-07-02 id:fff",
+    ]
+
+
+class TestDependencyGraph(ConfigTestCase):
+
+    def setUp(self):
+        super(TestDependencyGraph, self).setUp()
+        fd, self.filename = tempfile.mkstemp(".txt", "todo.next.")
+        os.close(fd)
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        self.tl = TodoList(self.filename)
+        self.graph = DependencyGraph(self.tl)
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_ready(self):
+        self.assertEqual([item.tid for item in self.graph.ready_items()], [u"aaa", u"eee"])
+        self.tl.set_to_done(self.tl.get_item_by_index("aaa"))
+        self.assertEqual([item.tid for item in self.graph.ready_items()], [u"bbb", u"eee"])
+
+    def test_cycles(self):
+        self.assertEqual(self.graph.find_cycle(u"ggg", u"aaa"), [u"ggg", u"aaa", u"bbb", u"ddd", u"ggg"])
+        self.assertEqual(self.graph.find_cycle(u"aaa", u"aaa"), [u"aaa", u"aaa"])
+        self.assertIsNone(self.graph.find_cycle(u"aaa", u"ggg"))
+        self.assertIsNone(self.graph.find_cycle(u"eee", u"bbb"))
+        # done items are not part of the graph
+        self.assertIsNone(self.graph.find_cycle(u"ggg", u"ccc"))
+
+    def test_order(self):
+        order, cyclic = self.graph.topological_order()
+        self.assertEqual(order, [u"aaa", u"bbb", u"eee", u"ddd", u"ggg"])
+        self.assertEqual(cyclic, [])
+        self.assertEqual(self.graph.critical_paths(order),
+                         {u"aaa": 4, u"bbb": 3, u"eee": 3, u"ddd": 2, u"ggg": 1})
+        # a cycle created in the file is reported
+        self.tl.replace_or_add_prop(self.tl.get_item_by_index("aaa"), conf.BLOCKEDBY, u"ggg")
+        order, cyclic = self.graph.topological_order()
+        self.assertEqual(order, [u"eee"])
+        self.assertEqual(sorted(cyclic), [u"aaa", u"bbb", u"ddd", u"ggg"])
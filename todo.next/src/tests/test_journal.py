@@ -0,0 +1,128 @@
+"""
+:mod:`test_journal`
+~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.journal import Journal, apply_ops, ADD, REMOVE
+from todo.tid_index import TidIndex
+from todo.appender import TodoAppender
+
+import codecs, os, shutil, tempfile
+
+conf = ConfigBorg()
+
+LINES = [
+    u"(B) Write report +work id:aaa",
+    u"Call Bob @phone id:bbb blockedby:aaa",
+    u"Review slides",
+    ]
+
+
+class TestJournal(ConfigTestCase):
+
+    def setUp(self):
+        super(TestJournal, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        self.journal_filename = os.path.join(self.dirname, "journal")
+        conf.journal = Journal(self.journal_filename, self.filename, threshold = 6)
+
+    def tearDown(self):
+        del conf.journal
+        shutil.rmtree(self.dirname)
+
+    def read_file(self):
+        with codecs.open(self.filename, "r", "utf-8") as fp:
+            return fp.read()
+
+    def test_apply_ops(self):
+        ops = [(REMOVE, u"b"), (ADD, u"d"), (ADD, u"b"), (REMOVE, u"d")]
+        self.assertEqual(apply_ops([u"a", u"b", u"c", u"b"], ops), [u"a", u"c", u"b", u"b"])
+
+    def test_journal(self):
+        content = self.read_file()
+        with TodoList(self.filename) as tl:
+            tl.set_to_done(tl.get_item_by_index("aaa"))
+            tl.remove_item(tl.get_item_by_index("1"))
+        # the todo file is not written
+        self.assertEqual(self.read_file(), content)
+        self.assertEqual(len(conf.journal.read(tl.content_hash)[0]), 5)
+        tl = TodoList(self.filename)
+        self.assertTrue(tl.is_current())
+        self.assertTrue(tl.get_item_by_index("aaa").done)
+        self.assertEqual(len(tl.todolist), 2)
+        # the done item does not block anymore
+        self.assertNotIn(conf.BLOCKEDBY, tl.get_item_by_index("bbb").properties)
+        # unchanged lists do not write anything
+        self.assertEqual(tl.write(), 0)
+        # exceeding the threshold compacts the journal into the todo file
+        with TodoList(self.filename) as tl:
+            tl.add_items([u"Call Alice", u"Buy milk"])
+        self.assertFalse(os.path.exists(self.journal_filename))
+        self.assertEqual(len(self.read_file().splitlines()), 4)
+        self.assertEqual(sorted(TodoList(self.filename).tids), sorted(tl.tids))
+
+    def test_interrupted(self):
+        with TodoList(self.filename) as tl:
+            tl.set_priority(tl.get_item_by_index("bbb"), "A")
+        # an interrupted command is ignored and removed with the next command
+        with open(self.journal_filename, "ab") as fp:
+            fp.write("- (B) Write report +work id:aaa\n+ x (B) Wr")
+        self.assertEqual(len(TodoList(self.filename).todolist), 3)
+        with TodoList(self.filename) as tl:
+            tl.add_item(u"Call Alice")
+        self.assertEqual(len(TodoList(self.filename).todolist), 4)
+        with open(self.journal_filename, "rb") as fp:
+            data = fp.read()
+        tl = TodoList(self.filename)
+        tl.compact()
+        self.assertFalse(os.path.exists(self.journal_filename))
+        # an interrupted compaction, the journal has not been removed, is not applied again
+        with open(self.journal_filename, "wb") as fp:
+            fp.write(data + "= {hash}\n".format(hash = tl.content_hash))
+        self.assertEqual(len(TodoList(self.filename).todolist), 4)
+
+    def test_appender(self):
+        tid_index = TidIndex(os.path.join(self.dirname, "index"))
+        with TodoList(self.filename) as tl:
+            tl.set_priority(tl.get_item_by_index("bbb"), "A")
+        tid_index.rebuild(tl)
+        tid_index.save(self.filename)
+        content = self.read_file()
+        with TodoAppender(self.filename, tid_index) as appender:
+            appender.add_item(u"Call Alice id:ccc blockedby:bbb")
+        # the item is added after the journaled changes
+        self.assertEqual(self.read_file(), content)
+        self.assertTrue(tid_index.is_current(self.filename))
+        tl = TodoList(self.filename)
+        self.assertEqual(tl.get_item_by_index("bbb").priority, "A")
+        self.assertEqual(tl.dependencies["ccc"], set([u"bbb"]))
+
+    def test_add_only(self):
+        tid_index = TidIndex(os.path.join(self.dirname, "index"))
+        with TodoList(self.filename) as tl:
+            tl.set_priority(tl.get_item_by_index("bbb"), "A")
+        tid_index.rebuild(tl)
+        tid_index.save(self.filename)
+        content = self.read_file()
+        # items are appended to the journal until it is full
+        nr = 0
+        while not conf.journal.is_full():
+            with TodoAppender(self.filename, tid_index) as appender:
+                appender.add_item(u"Call Alice {nr}".format(nr = nr))
+            nr += 1
+        self.assertEqual(conf.journal.count_changes(), 6)
+        self.assertEqual(self.read_file(), content)
+        # the next item is added by the todo list, which compacts the journal
+        with TodoList(self.filename) as tl:
+            tl.add_item(u"Call Alice {nr}".format(nr = nr))
+        self.assertFalse(os.path.exists(self.journal_filename))
+        self.assertEqual(conf.journal.count_changes(), 0)
+        self.assertEqual(len(self.read_file().splitlines()), 3 + nr + 1)
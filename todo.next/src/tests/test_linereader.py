@@ -0,0 +1,108 @@
+"""
+:mod:`test_linereader`
+~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.linereader import LineReader, CompressedLineReader, open_reader
+from todo import linereader
+from todo.files import compress_file
+
+import os, re, shutil, tempfile
+
+
+# mixed line endings, an empty line and an unterminated last line
+CONTENT = u"(B) Write report +work id:aaa\r\n\nx Buy milk id:aa\n\u00c4pfel kaufen id:ccc"
+
+
+class TestLineReader(ConfigTestCase):
+
+    def setUp(self):
+        super(TestLineReader, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        with open(self.filename, "wb") as fp:
+            fp.write(CONTENT.encode("utf-8"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_lines(self):
+        with LineReader(self.filename) as reader:
+            self.assertEqual(len(reader), 4)
+            self.assertEqual(reader.get_line(0), u"(B) Write report +work id:aaa")
+            self.assertEqual(reader.get_line(1), u"")
+            self.assertEqual(reader.get_line(3), u"\u00c4pfel kaufen id:ccc")
+            self.assertRaises(IndexError, reader.get_line, 4)
+            self.assertEqual([text for _, text in reader.iter_lines()],
+                             [u"(B) Write report +work id:aaa", u"x Buy milk id:aa", u"\u00c4pfel kaufen id:ccc"])
+            for offset, text in reader.iter_lines():
+                self.assertEqual(reader.get_text_at(offset), text)
+            self.assertEqual(list(reader.iter_lines_reversed()), list(reversed(list(reader.iter_lines()))))
+            item = reader.get_item(2)
+            self.assertTrue(item.done)
+            self.assertEqual(item.line_nr, 2)
+            self.assertIsNone(reader.get_item(1))
+
+    def test_search(self):
+        with LineReader(self.filename) as reader:
+            self.assertEqual([text for _, text in reader.find(u"\u00c4pfel".encode("utf-8"))], [u"\u00c4pfel kaufen id:ccc"])
+            self.assertEqual([text for _, text in reader.find("id:aa")],
+                             [u"(B) Write report +work id:aaa", u"x Buy milk id:aa"])
+            self.assertEqual(len(list(reader.search(re.compile(u"^x ", re.UNICODE)))), 1)
+            # the tid has to match completely
+            self.assertEqual(reader.line_nr_at(reader.find_tid(u"aa")), 2)
+            self.assertEqual(reader.line_nr_at(reader.find_tid(u"ccc")), 3)
+            self.assertIsNone(reader.find_tid(u"a"))
+
+    def test_index(self):
+        index_filename = os.path.join(self.dirname, "index")
+        with LineReader(self.filename, index_filename) as reader:
+            offsets = reader.get_offsets()
+        self.assertTrue(os.path.exists(index_filename))
+        with LineReader(self.filename, index_filename) as reader:
+            self.assertEqual(reader.load_index(), offsets)
+        # an index of another file content is not used
+        with open(self.filename, "ab") as fp:
+            fp.write("\nCall Bob")
+        with LineReader(self.filename, index_filename) as reader:
+            self.assertIsNone(reader.load_index())
+            self.assertEqual(reader.get_line(4), u"Call Bob")
+        with LineReader(self.filename, index_filename) as reader:
+            self.assertEqual(len(reader.load_index()), 5)
+
+    def test_empty(self):
+        open(self.filename, "wb").close()
+        with LineReader(self.filename) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader.iter_lines()), [])
+            self.assertEqual(list(reader.iter_lines_reversed()), [])
+            self.assertEqual(list(reader.find("a")), [])
+
+    def test_compressed(self):
+        compressed_filename = self.filename + ".gz"
+        compress_file(self.filename, compressed_filename)
+        # a second gzip member
+        other_filename = os.path.join(self.dirname, "other.txt")
+        with open(other_filename, "wb") as fp:
+            fp.write("x Call Bob id:ddd\n")
+        compress_file(other_filename, compressed_filename)
+        with LineReader(self.filename) as reader:
+            lines = list(reader.iter_lines())
+        # lines spanning several decompressed blocks
+        chunk_size, linereader.CHUNK_SIZE = linereader.CHUNK_SIZE, 7
+        try:
+            with open_reader(compressed_filename) as reader:
+                self.assertIsInstance(reader, CompressedLineReader)
+                self.assertEqual(list(reader.iter_lines())[:-1], lines)
+                offset, text = list(reader.iter_lines())[-1]
+                self.assertEqual(text, u"x Call Bob id:ddd")
+                self.assertEqual(reader.get_texts_at([offset, lines[1][0]]), [text, u"x Buy milk id:aa"])
+                self.assertEqual(list(reader.iter_lines(offset)), [(offset, text)])
+                self.assertEqual([text for _, text in reader.find("id:aa")],
+                                 [u"(B) Write report +work id:aaa", u"x Buy milk id:aa"])
+                self.assertEqual(len(list(reader.search(re.compile(u"^x ", re.UNICODE)))), 2)
+        finally:
+            linereader.CHUNK_SIZE = chunk_size
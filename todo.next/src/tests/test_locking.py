@@ -0,0 +1,98 @@
+"""
+:mod:`test_locking`
+~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.locking import FileLock
+from todo.timing import Timings
+
+import codecs, os, shutil, tempfile
+
+conf = ConfigBorg()
+
+LINES = [
+    u"(B) Write report +work id:aaa",
+    u"Call Bob @phone id:bbb blockedby:aaa",
+    u"Review slides id:eee",
+    ]
+
+
+class TestLocking(ConfigTestCase):
+
+    def setUp(self):
+        super(TestLocking, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        self.lock_filename = os.path.join(self.dirname, "lock")
+
+    def tearDown(self):
+        if hasattr(conf, "file_lock"):
+            del conf.file_lock
+        if hasattr(conf, "timings"):
+            del conf.timings
+        shutil.rmtree(self.dirname)
+
+    def other_lock(self):
+        return FileLock(self.lock_filename, self.filename, timeout = 0.1)
+
+    def test_lock(self):
+        conf.file_lock = FileLock(self.lock_filename, self.filename, timeout = 0.1)
+        conf.timings = Timings()
+        with TodoList(self.filename) as tl:
+            self.assertTrue(conf.file_lock.locked)
+            self.assertRaises(IOError, self.other_lock().acquire)
+            tl.set_priority(tl.get_item_by_index("eee"), "A")
+        self.assertFalse(conf.file_lock.locked)
+        self.assertIn("lock wait", conf.timings.durations)
+        with self.other_lock() as lock:
+            # the lock is reentrant
+            with lock:
+                pass
+            self.assertTrue(lock.locked)
+            self.assertRaises(IOError, conf.file_lock.acquire)
+        self.assertFalse(lock.locked)
+
+    def test_optimistic(self):
+        conf.file_lock = FileLock(self.lock_filename, self.filename, optimistic = True)
+        tl = TodoList(self.filename)
+        self.assertFalse(conf.file_lock.locked)
+        with TodoList(self.filename) as other:
+            other.set_priority(other.get_item_by_index("bbb"), "C")
+            other.add_item(u"Call Alice id:ccc")
+        tl.set_priority(tl.get_item_by_index("eee"), "A")
+        tl.add_item(u"Buy milk id:ddd")
+        tl.write()
+        self.assertTrue(tl.merged)
+        texts = [item.text for item in TodoList(self.filename).todolist]
+        self.assertIn(u"(C) Call Bob @phone id:bbb blockedby:aaa", texts)
+        self.assertIn(u"(A) Review slides id:eee", texts)
+        self.assertEqual(len(texts), 5)
+        # after writing, only later changes are replayed
+        tl.remove_item(tl.get_item_by_index("ddd"))
+        tl.write()
+        self.assertEqual(len(TodoList(self.filename).todolist), 4)
+
+    def test_conflict(self):
+        conf.file_lock = FileLock(self.lock_filename, self.filename, optimistic = True)
+        tl = TodoList(self.filename)
+        with TodoList(self.filename) as other:
+            other.set_priority(other.get_item_by_index("eee"), "C")
+            other.add_item(u"Call Alice id:ccc")
+        tl.set_priority(tl.get_item_by_index("eee"), "A")
+        self.assertRaises(IOError, tl.write)
+        tl = TodoList(self.filename)
+        with TodoList(self.filename) as other:
+            other.add_item(u"Call Carl id:fff")
+        tl.add_item(u"Buy milk id:fff")
+        self.assertRaises(IOError, tl.write)
+        with TodoList(self.filename) as other:
+            other.set_priority(other.get_item_by_index("bbb"), "B")
+        # the current file has not been overwritten
+        self.assertEqual(len(TodoList(self.filename).todolist), 5)
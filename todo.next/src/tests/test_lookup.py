@@ -0,0 +1,66 @@
+"""
+:mod:`test_lookup`
+~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.journal import Journal
+from todo.lookup import TodoLookup, is_tid_lookup
+
+import codecs, os, shutil, tempfile
+
+conf = ConfigBorg()
+
+LINES = [
+    u"(B) Write report +work id:aaa",
+    u"",
+    u"Call Bob @phone http://example.com id:bbb blockedby:aaa",
+    u"Review slides id:bb",
+    ]
+
+
+class TestTodoLookup(ConfigTestCase):
+
+    def setUp(self):
+        super(TestTodoLookup, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        self.index_filename = os.path.join(self.dirname, "lines")
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_is_tid_lookup(self):
+        self.assertTrue(is_tid_lookup(["aaa", "bb"]))
+        self.assertFalse(is_tid_lookup(["aaa", "-1"]))
+        self.assertFalse(is_tid_lookup([]))
+        conf.id_support = False
+        self.assertFalse(is_tid_lookup(["aaa"]))
+
+    def test_lookup(self):
+        lookup = TodoLookup(self.filename, self.index_filename)
+        item = lookup.get_item_by_index("bbb")
+        self.assertEqual(item.text, LINES[2])
+        self.assertEqual(list(item.urls), [u"http://example.com"])
+        # the line number is taken from the stored line-offset index
+        self.assertEqual(item.line_nr, 2)
+        self.assertTrue(os.path.exists(self.index_filename))
+        self.assertEqual(lookup.get_item_by_index("bb").line_nr, 3)
+        self.assertIsNone(lookup.get_item_by_index("b"))
+        self.assertEqual(lookup.get_item_by_index("aaa").text, TodoList(self.filename).get_item_by_index("aaa").text)
+
+    def test_journal(self):
+        conf.journal = Journal(os.path.join(self.dirname, "journal"), self.filename)
+        with TodoList(self.filename) as tl:
+            tl.set_priority(tl.get_item_by_index("bbb"), "A")
+            tl.remove_item(tl.get_item_by_index("bb"))
+        lookup = TodoLookup(self.filename, self.index_filename)
+        self.assertEqual(lookup.get_item_by_index("bbb").priority, "A")
+        self.assertIsNone(lookup.get_item_by_index("bb"))
+        self.assertEqual(lookup.get_item_by_index("aaa").text, LINES[0])
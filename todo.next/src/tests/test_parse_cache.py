@@ -0,0 +1,91 @@
+"""
+:mod:`test_parse_cache`
+~~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.parse_cache import ParseCache
+
+import os, shutil, tempfile
+
+
+LINES = [
+    u"(A) Call Mom +Family @phone http://example.com >>Bob id:abc",
+    u"x Write report +Work @office done:2012-07-01_17:30 blockedby:de blockedby:fg file:notes.txt",
+    u"* (!) Had a meeting with <<Alice +project:sub",
+    ]
+
+
+class TestParseCache(ConfigTestCase):
+
+    def setUp(self):
+        super(TestParseCache, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_roundtrip(self):
+        cache = ParseCache(self.filename)
+        states = [cache.create_item(line).get_state() for line in LINES]
+        cache.save()
+        cache = ParseCache(self.filename)
+        items = [cache.create_item(line) for line in LINES]
+        self.assertEqual(cache.hits, len(LINES))
+        self.assertEqual([item.get_state() for item in items], states)
+        self.assertEqual([item.text for item in items], LINES)
+        # cached multi-value properties are not shared between items
+        item = cache.create_item(LINES[1])
+        item.properties["blockedby"].append(u"hi")
+        self.assertEqual(cache.create_item(LINES[1]).properties["blockedby"], [u"de", u"fg"])
+
+    def test_rewritten_lines(self):
+        cache = ParseCache(self.filename)
+        cache.create_item(u"Call Bob due:tomorrow")
+        self.assertFalse(cache.entries)
+
+    def test_unparsable_dates(self):
+        cache = ParseCache(self.filename)
+        state = cache.create_item(u"Call Bob due:?nonsense").get_state()
+        cache.save()
+        cache = ParseCache(self.filename)
+        item = cache.create_item(u"Call Bob due:?nonsense")
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(item.get_state(), state)
+        self.assertEqual(item.due_date, u"?nonsense")
+
+    def test_eviction(self):
+        cache = ParseCache(self.filename, 2)
+        for line in LINES:
+            cache.create_item(line)
+        cache.save()
+        cache = ParseCache(self.filename, 2)
+        self.assertEqual(len(cache.entries), 2)
+        cache.create_item(LINES[0])
+        cache.create_item(u"new line")
+        cache.save()
+        cache = ParseCache(self.filename, 2)
+        cache.create_item(LINES[0])
+        cache.create_item(u"new line")
+        self.assertEqual(cache.hits, 2)
+
+    def test_recency(self):
+        for line in LINES[:2]:
+            cache = ParseCache(self.filename, 2)
+            cache.create_item(line)
+            cache.save()
+        # a run that only uses cached lines saves their recency
+        cache = ParseCache(self.filename, 2)
+        cache.create_item(LINES[0])
+        self.assertTrue(cache.dirty)
+        cache.save()
+        cache = ParseCache(self.filename, 2)
+        cache.create_item(LINES[2])
+        cache.save()
+        cache = ParseCache(self.filename, 2)
+        cache.create_item(LINES[0])
+        cache.create_item(LINES[1])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
@@ -0,0 +1,77 @@
+"""
+:mod:`test_parsers`
+~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from unittest2 import TestCase
+from todo import parsers
+import random
+
+FIELDS = ("priority", "markers", "urls", "delegated_to", "delegated_from",
+          "projects", "contexts", "properties", "done", "is_report")
+
+# golden corpus, containing typical lines as well as the corner cases of the regular expressions
+CORPUS = [
+    u"(A) Call Mom +Family @phone due:2012-07-02",
+    u"x 2012-07-01 (B) Write report +Work @office done:2012-07-01_17:30 id:abc",
+    u"* Had a meeting with >>Bob and <<Alice +Project:sub @work",
+    u"Check http://example.com:8080/path?x=1 and https://example.org/ file:notes.txt file:other.txt",
+    u"(!) (i) (a) (A) (1) (() ( ) markers everywhere",
+    u"blockedby:abc blockedby:def id:ghi mailto:someone@example.com",
+    u"DUE:2012-01-01 Due:2013-01-01 key:val:ue a:b:c ::x +:y foo-bar:baz foo_bar:qux",
+    u"url http://x //not:a:prop x://y ftp://host ftps://host ftpx://host",
+    u"lone @ sign and + sign and http: scheme",
+    u"@ctx +proj@ctx @ctx+proj x<< <<<a >>>b a>>b<<c <<",
+    u"tabs\tand  double  spaces\t+proj\t@ctx key:value",
+    u"non-breaking\xa0space +proj\xa0@ctx key:va\xa0lue",
+    u"line\nbreak +proj key:value",
+    u"umlaute \xe4\xf6\xfc:wert +\xdcbung @B\xfcro",
+    u"(Z)no space after priority",
+    u"(a) lowercase priority is a marker",
+    u"x",
+    u"* ",
+    u"",
+    ]
+
+TOKENS = [u"a", u"word", u"+p", u"@c", u"+", u"@", u"http:", u"http://h.de", u"https://h.de:80/x",
+          u"due:2012-01-01", u"id:abc", u"blockedby:x", u"k:", u":v", u"a:b:c", u"x://y", u">>d",
+          u"<<d", u"x>>", u"(!)", u"(B)", u"(", u")", u"x", u"*", u"\xe4:\xfc", u"mailto:a@b"]
+SEPARATORS = [u"", u" ", u" ", u" ", u"  ", u"\t", u"\xa0", u"\n"]
+
+
+class Fields(object):
+    """a plain container for the fields filled in by the parsers
+    """
+    def __init__(self, text):
+        self.text = text
+        self.properties = {}
+        self.urls, self.markers = (), ()
+        self.priority = None
+        self.delegated_to, self.delegated_from = (), ()
+        self.projects, self.contexts = (), ()
+        self.done = self.is_report = None
+
+
+class TestParsers(TestCase):
+
+    def assert_same_result(self, text):
+        expected = parsers.parse_with_registry(Fields(text))
+        result = parsers.parse(Fields(text))
+        for field in FIELDS:
+            self.assertEqual(getattr(expected, field), getattr(result, field),
+                u"field {0} differs for {1!r}".format(field, text))
+
+    def test_golden_corpus(self):
+        for text in CORPUS:
+            self.assert_same_result(text)
+
+    def test_generated_corpus(self):
+        rnd = random.Random(4711)
+        for _ in xrange(5000):
+            parts = [rnd.choice(TOKENS)]
+            for _ in xrange(rnd.randint(0, 8)):
+                parts.append(rnd.choice(SEPARATORS))
+                parts.append(rnd.choice(TOKENS))
+            self.assert_same_result(u"".join(parts))
@@ -0,0 +1,66 @@
+"""
+:mod:`test_rollups`
+~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.todoitem import TodoItem
+from todo.rollups import Rollups
+
+import codecs, datetime, os, shutil, tempfile
+
+
+class TestRollups(ConfigTestCase):
+
+    def setUp(self):
+        super(TestRollups, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = self.write_archive([u"x Write report +work @office done:2012-07-01 duration:30",
+                                            u"* Meeting +work done:2012-07-01",
+                                            u"x Buy milk done:2012-07-03", u"x Call Bob"])
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def write_archive(self, lines, mode = "w"):
+        filename = os.path.join(self.dirname, "archive.txt")
+        with codecs.open(filename, mode, "utf-8") as fp:
+            fp.write(u"".join(line + u"\n" for line in lines))
+        return filename
+
+    def get_rollups(self):
+        return Rollups(os.path.join(self.dirname, "rollups"), self.dirname)
+
+    def test_rollups(self):
+        rollups = self.get_rollups()
+        self.assertFalse(rollups.exists())
+        rollups.refresh([self.filename])
+        rollups.save()
+        days = self.get_rollups().get_days(datetime.datetime(2012, 7, 1), datetime.datetime(2012, 7, 2))
+        self.assertEqual(days.keys(), ["2012-07-01"])
+        self.assertEqual(days["2012-07-01"], {"done": 1, "report": 1, "duration": 30,
+                                              "projects": {u"+work": 2}, "contexts": {u"@office": 1}})
+        # the items of the todo list are added
+        days = rollups.get_days(datetime.datetime(2012, 7, 1), datetime.datetime(2012, 7, 3),
+                                [TodoItem(u"x Call Alice +work done:2012-07-03"), TodoItem(u"Call Carl")])
+        self.assertEqual(days["2012-07-03"]["done"], 2)
+        self.assertEqual(days["2012-07-03"]["projects"], {u"+work": 1})
+
+    def test_changes(self):
+        rollups = self.get_rollups()
+        rollups.refresh([self.filename])
+        # appended items are rolled up incrementally
+        self.write_archive([u"x Call Alice done:2012-07-03 duration:15"], "a")
+        rollups.add_items(self.filename, [TodoItem(u"x Call Alice done:2012-07-03 duration:15")])
+        rollups.save()
+        days = rollups.get_days(datetime.datetime(2012, 7, 3), datetime.datetime(2012, 7, 3))
+        self.assertEqual((days["2012-07-03"]["done"], days["2012-07-03"]["duration"]), (2, 15))
+        # files changed otherwise are read again
+        rollups = self.get_rollups()
+        self.write_archive([u"x Call Alice done:2012-07-04"])
+        rollups.refresh([self.filename])
+        self.assertEqual(rollups.get_days(datetime.datetime(2012, 7, 1), datetime.datetime(2012, 7, 4)).keys(), ["2012-07-04"])
+        rollups.refresh([])
+        self.assertEqual(rollups.files, {})
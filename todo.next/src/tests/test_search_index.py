@@ -0,0 +1,78 @@
+"""
+:mod:`test_search_index`
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from unittest2 import TestCase
+from todo.search_index import SearchIndex, get_literals
+from todo.linereader import LineReader
+from todo.files import get_file_stamp
+
+import codecs, os, re, shutil, tempfile
+
+
+class TestSearchIndex(TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.first = self.write_archive("first.txt", [u"x Write report +work", u"x Call Bob @phone"])
+        self.second = self.write_archive("second.txt", [u"x Call Alice @phone", u"x Buy milk for M\u00fcller"])
+        self.filenames = [self.first, self.second]
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def write_archive(self, name, lines, mode = "w"):
+        filename = os.path.join(self.dirname, name)
+        with codecs.open(filename, mode, "utf-8") as fp:
+            fp.write(u"".join(line + u"\n" for line in lines))
+        return filename
+
+    def get_index(self):
+        return SearchIndex(os.path.join(self.dirname, "index"))
+
+    def get_texts(self, candidates):
+        texts = []
+        for filename in sorted(candidates):
+            with LineReader(filename) as reader:
+                texts.extend(reader.get_text_at(offset) for offset in candidates[filename])
+        return texts
+
+    def test_literals(self):
+        self.assertEqual(get_literals(u"call (bob|alice) @pho+ne"), [u"call ", u" @ph", u"o", u"ne"])
+        self.assertEqual(get_literals(u"(?:report)?x"), [u"x"])
+        self.assertEqual(get_literals(u"[unbalanced"), [])
+
+    def test_find(self):
+        index = self.get_index()
+        self.assertIsNone(index.find(self.filenames, [u"ca"]))
+        self.assertEqual(self.get_texts(index.find(self.filenames, [u"@PHONE"])), [u"x Call Bob @phone", u"x Call Alice @phone"])
+        self.assertEqual(self.get_texts(index.find(self.filenames, [u"M\u00fcl"])), [u"x Buy milk for M\u00fcller"])
+        self.assertEqual(index.find(self.filenames, [u"call", u"milk"]), {})
+        self.assertTrue(index.exists())
+
+    def test_delta(self):
+        self.get_index().find(self.filenames, [u"call"])
+        # appended lines are indexed into the delta
+        index = self.get_index()
+        old_stamp = get_file_stamp(self.first)
+        self.write_archive("first.txt", [u"x Call Carl @phone"], "a")
+        index.extend(self.first, old_stamp)
+        index.save()
+        # new and changed files are indexed on searching
+        third = self.write_archive("third.txt", [u"x Call Dave @phone"])
+        self.write_archive("second.txt", [u"x Write letter"])
+        index = self.get_index()
+        candidates = index.find(self.filenames + [third], [u"call"])
+        self.assertEqual(self.get_texts(candidates), [u"x Call Bob @phone", u"x Call Carl @phone", u"x Call Dave @phone"])
+        self.assertTrue(os.path.exists(index.delta_filename))
+        # rebuilding the main index removes the delta
+        index.rebuild(self.filenames + [third])
+        self.assertFalse(os.path.exists(index.delta_filename))
+        self.assertEqual(index.find(self.filenames + [third], [u"call"]), candidates)
+        re_search = re.compile(u"call\s+(bob|carl)", re.UNICODE | re.IGNORECASE)
+        candidates = index.find(self.filenames, get_literals(re_search.pattern, re_search.flags))
+        self.assertEqual([text for text in self.get_texts(candidates) if re_search.search(text)],
+                         [u"x Call Bob @phone", u"x Call Carl @phone"])
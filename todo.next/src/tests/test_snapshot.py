@@ -0,0 +1,91 @@
+"""
+:mod:`test_snapshot`
+~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.snapshot import Snapshot
+
+import codecs, os, shutil, tempfile, time
+
+conf = ConfigBorg()
+
+LINES = [
+    u"Call Bob @phone id:bbb blockedby:aaa",
+    u"(B) Write report +work id:aaa",
+    u"x Buy milk done:2012-07-01 id:ccc",
+    u"",
+    u"(A) Prepare talk due:2012-08-01 id:ddd blockedby:aaa blockedby:eee",
+    u"Review slides due:tomorrow id:eee",
+    u"* Met Alice done:2012-07-02 id:fff",
+    ]
+
+
+class TestSnapshot(ConfigTestCase):
+
+    def setUp(self):
+        super(TestSnapshot, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        self.snapshot_filename = os.path.join(self.dirname, "snapshot")
+        conf.snapshot = Snapshot(self.snapshot_filename, self.filename)
+
+    def tearDown(self):
+        del conf.snapshot
+        shutil.rmtree(self.dirname)
+
+    def assert_same(self, tl1, tl2, loaded = True):
+        self.assertEqual([item.text for item in tl1.todolist], [item.text for item in tl2.todolist])
+        if loaded:
+            # line numbers and dates of a written list differ from the file
+            self.assertEqual([item.line_nr for item in tl1.todolist], [item.line_nr for item in tl2.todolist])
+            # the due date of the item with a relative date is parsed with the current time
+            self.assertEqual([item.get_sort_key() for item in tl1.todolist if item.tid != u"eee"], 
+                             [item.get_sort_key() for item in tl2.todolist if item.tid != u"eee"])
+        self.assertEqual(sorted(tl1.tids), sorted(tl2.tids))
+        self.assertEqual(tl1.dependencies, tl2.dependencies)
+        self.assertEqual(tl1.blocking, tl2.blocking)
+
+    def test_load(self):
+        tl = TodoList(self.filename)
+        self.assertTrue(os.path.exists(self.snapshot_filename))
+        restored = conf.snapshot.load(tl.content_hash)
+        self.assertIsNotNone(restored)
+        # only the item with a relative date is parsed
+        self.assertEqual([item._parsed for item in restored[0]].count(True), 1)
+        self.assert_same(TodoList(self.filename), tl)
+        self.assertEqual(TodoList(self.filename).get_item_by_index("ddd").properties[conf.BLOCKEDBY], [u"aaa", u"eee"])
+        # the item with a relative date is stored as read
+        self.assertIn(u"due:tomorrow", [text for text in LINES if u"id:eee" in text][0])
+        self.assertNotEqual(TodoList(self.filename).get_item_by_index("eee").text, LINES[5])
+
+    def test_write(self):
+        tl = TodoList(self.filename)
+        tl.set_to_done(tl.get_item_by_index("aaa"))
+        tl.write()
+        restored = conf.snapshot.load(tl.content_hash)
+        self.assertIsNotNone(restored)
+        self.assertEqual([item.line_nr for item in restored[0]], range(len(tl.todolist)))
+        conf.snapshot = None
+        self.assert_same(TodoList(self.filename), tl, loaded = False)
+
+    def test_outdated(self):
+        tl = TodoList(self.filename)
+        # the modification time may have a resolution of seconds
+        time.sleep(1)
+        with codecs.open(self.filename, "a", "utf-8") as fp:
+            fp.write(u"\nCall Alice")
+        self.assertIsNone(conf.snapshot.load(tl.content_hash))
+        self.assertEqual(len(TodoList(self.filename).todolist), len(tl.todolist) + 1)
+        # other todo files are not stored
+        other_filename = os.path.join(self.dirname, "other.txt")
+        shutil.copy(self.filename, other_filename)
+        os.unlink(self.snapshot_filename)
+        TodoList(other_filename)
+        self.assertFalse(os.path.exists(self.snapshot_filename))
@@ -0,0 +1,69 @@
+"""
+:mod:`test_sortedlist`
+~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from unittest2 import TestCase
+from todo import sortedlist
+from todo.sortedlist import SortedItemList
+
+import random
+
+
+class Entry(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class TestSortedItemList(TestCase):
+
+    def setUp(self):
+        self.block_size = sortedlist.BLOCK_SIZE
+        # small blocks, so that splitting and removing blocks is covered
+        sortedlist.BLOCK_SIZE = 4
+
+    def tearDown(self):
+        sortedlist.BLOCK_SIZE = self.block_size
+
+    def check(self, slist, entries):
+        self.assertEqual([id(entry) for entry in slist], [id(entry) for entry in entries])
+        self.assertEqual(len(slist), len(entries))
+        for nr, entry in enumerate(entries):
+            self.assertIs(slist[nr], entry)
+            self.assertEqual(slist.index(entry), nr)
+
+    def insert(self, entries, entry):
+        # new and changed entries are placed behind the entries with equal values
+        pos = len([other for other in entries if other.value <= entry.value])
+        entries.insert(pos, entry)
+
+    def test_random_operations(self):
+        rnd = random.Random(42)
+        entries = [Entry(rnd.randint(0, 20)) for _ in xrange(30)]
+        slist = SortedItemList(entries, key = lambda entry: entry.value)
+        entries.sort(key = lambda entry: entry.value)
+        self.check(slist, entries)
+        for _ in xrange(300):
+            operation = rnd.random()
+            if operation < 0.3 or not entries:
+                entry = Entry(rnd.randint(0, 20))
+                self.insert(entries, entry)
+                slist.add(entry)
+            elif operation < 0.5:
+                entry = entries.pop(rnd.randrange(len(entries)))
+                slist.remove(entry)
+                self.assertNotIn(entry, slist)
+            else:
+                entry = rnd.choice(entries)
+                new_value = rnd.randint(0, 20)
+                if new_value != entry.value:
+                    entries.remove(entry)
+                    entry.value = new_value
+                    self.insert(entries, entry)
+                slist.update(entry)
+            self.check(slist, entries)
+        self.assertIs(slist[-1], entries[-1])
+        self.assertRaises(IndexError, slist.__getitem__, len(entries))
+        self.assertRaises(ValueError, slist.remove, Entry(0))
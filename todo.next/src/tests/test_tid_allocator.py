@@ -0,0 +1,83 @@
+"""
+:mod:`test_tid_allocator`
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.todolist import TodoList
+from todo.tid_allocator import TidAllocator, TidSet, tid_to_nr, nr_to_tid, extend_manifest, BASE
+
+import codecs, os, shutil, tempfile
+
+
+class TestTidAllocator(ConfigTestCase):
+
+    def test_conversion(self):
+        self.assertEqual(tid_to_nr("aaa"), 0)
+        self.assertEqual(tid_to_nr("aba"), BASE)
+        for nr in (0, 1, 4711, BASE ** 3 - 1):
+            self.assertEqual(tid_to_nr(nr_to_tid(nr, 3)), nr)
+
+    def test_allocation(self):
+        allocator = TidAllocator(["abc", "ab1", "ABC", "abcdefgh"], 0.5)
+        self.assertTrue(allocator.is_used("abc"))
+        self.assertFalse(allocator.is_used("abd"))
+        tids = allocator.allocate_many(BASE ** 3 // 2 - 1)
+        self.assertEqual(len(set(tids)), len(tids))
+        self.assertNotIn("abc", tids)
+        self.assertEqual(set(len(tid) for tid in tids), set([3]))
+        # the occupancy is reached, new tids get longer
+        self.assertEqual(len(allocator.allocate()), 4)
+        allocator.release(tids[0])
+        self.assertFalse(allocator.is_used(tids[0]))
+
+    def test_set(self):
+        tids = TidSet(["abc", "ab1", "abcdefgh", "zzzzz"])
+        tids.discard("zzzzz")
+        copy = TidSet()
+        copy.set_state(tids.get_state())
+        for tid in ("abc", "ab1", "abcdefgh"):
+            self.assertIn(tid, copy)
+        self.assertNotIn("zzzzz", copy)
+        self.assertNotIn("abd", copy)
+
+    def test_crowded(self):
+        allocator = TidAllocator(occupancy = 1.0)
+        allocator.length = 2
+        tids = allocator.allocate_many(BASE ** 2)
+        # the last free tids are found by scanning the bitmap
+        self.assertEqual(len(set(tids)), BASE ** 2)
+        self.assertEqual(len(allocator.allocate()), 3)
+
+
+class TestTodoListTids(ConfigTestCase):
+
+    def setUp(self):
+        super(TestTodoListTids, self).setUp()
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "todo.txt")
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"Call Bob id:aaa\nWrite report id:aab\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_archived_tids(self):
+        tl = TodoList(self.filename)
+        extend_manifest(tl.tid_manifest, ["aac"])
+        allocator = tl.get_tid_allocator()
+        self.assertTrue(allocator.is_used("aab"))
+        self.assertTrue(allocator.is_used("aac"))
+        item = tl.add_item(u"Review slides id:aad")
+        self.assertTrue(allocator.is_used("aad"))
+        self.assertNotIn(tl.create_tid(item), ("aaa", "aab", "aac", "aad"))
+
+    def test_add_items(self):
+        tl = TodoList(self.filename)
+        items = tl.add_items([u"Buy milk", u"Plan trip id:zzz", u"Read book"])
+        tids = [item.tid for item in items]
+        self.assertEqual(tids[1], u"zzz")
+        self.assertEqual(len(set(tids)), 3)
+        self.assertEqual(tl.get_tid_allocator().counts[3], 5)
@@ -0,0 +1,59 @@
+"""
+:mod:`test_todoitem`
+~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todoitem import TodoItem
+
+import datetime
+
+conf = ConfigBorg()
+
+
+class TestPropertyEditing(ConfigTestCase):
+
+    def assert_consistent(self, item):
+        # the text of an edited item parses to the same properties
+        self.assertEqual(TodoItem(item.text).properties, item.properties)
+
+    def test_replace(self):
+        item = TodoItem(u"Call Bob due:2012-07-02 +family due:2012-07-03 id:abc")
+        item.replace_or_add_prop(conf.DUE, u"2012-08-01", datetime.datetime(2012, 8, 1))
+        self.assertEqual(item.text, u"Call Bob due:2012-08-01 +family id:abc")
+        item.replace_or_add_prop(conf.ID, u"abcd")
+        item.replace_or_add_prop(conf.FILE, u"notes.txt")
+        self.assertEqual(item.text, u"Call Bob due:2012-08-01 +family id:abcd file:notes.txt")
+        self.assert_consistent(item)
+
+    def test_remove(self):
+        item = TodoItem(u"id:abc Call foo-due:2012-07-02 Bob blockedby:aab blockedby:aa")
+        # only the property itself is removed, not other occurrences of the string
+        item.remove_prop(conf.BLOCKEDBY, u"aa")
+        self.assertEqual(item.text, u"id:abc Call foo-due:2012-07-02 Bob blockedby:aab")
+        item.remove_prop(conf.ID)
+        item.remove_prop(conf.DUE)
+        self.assertEqual(item.text, u"Call foo- Bob blockedby:aab")
+        self.assert_consistent(item)
+
+    def test_done(self):
+        item = TodoItem(u"(A) Write report blockedby:abc")
+        item.set_to_done()
+        self.assertTrue(item.text.startswith(u"x (A) Write report blockedby:abc done:"))
+        item.remove_prop(conf.BLOCKEDBY, u"abc")
+        item.reopen()
+        self.assertEqual(item.text, u"(A) Write report")
+        self.assertEqual(item.properties, {})
+
+
+    def test_done_lazy(self):
+        # parsing a lazy item must not reset the changed flag
+        item = TodoItem(u"(A) Write report id:abc", lazy = True)
+        item.set_to_done()
+        self.assertTrue(item.done)
+        item = TodoItem(item.text, lazy = True)
+        item.reopen()
+        self.assertFalse(item.done)
@@ -0,0 +1,126 @@
+"""
+:mod:`test_todolist_changes`
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tests import ConfigTestCase
+from todo.config import ConfigBorg
+from todo.todolist import TodoList
+from todo.todoitem import TodoItem
+from todo.timing import Timings
+
+import codecs, os, tempfile
+
+conf = ConfigBorg()
+
+LINES = [
+    u"(B) Write report +work id:aaa",
+    u"Call Bob @phone id:bbb blockedby:aaa",
+    u"x Buy milk done:2012-07-01 id:ccc",
+    u"(A) Prepare talk due:2012-08-01 id:ddd blockedby:aaa blockedby:eee",
+    u"Review slides id:eee",
+    u"* Met Alice done:2012-07-02 id:fff",
+    ]
+
+
+class TestTodoListChanges(ConfigTestCase):
+
+    def setUp(self):
+        super(TestTodoListChanges, self).setUp()
+        fd, self.filename = tempfile.mkstemp(".txt", "todo.next.")
+        os.close(fd)
+        with codecs.open(self.filename, "w", "utf-8") as fp:
+            fp.write(u"\n".join(LINES))
+        self.tl = TodoList(self.filename)
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def assert_ordered(self):
+        items = list(self.tl.todolist)
+        self.assertEqual(items, sorted(items, key = TodoList.default_sort_key))
+        for nr, item in enumerate(self.tl.list_items()):
+            self.assertIs(self.tl.get_item_by_index(str(nr)), item)
+
+    def test_batch(self):
+        with self.tl.batch():
+            for tid in ("aaa", "eee"):
+                self.tl.set_to_done(self.tl.get_item_by_index(tid))
+            self.tl.set_priority(self.tl.get_item_by_index("bbb"), "A")
+            self.tl.remove_item(self.tl.get_item_by_index("fff"))
+            # dependencies are cleaned when the batch ends
+            self.assertEqual(self.tl.get_item_by_index("ddd").properties[conf.BLOCKEDBY], [u"aaa", u"eee"])
+        self.assertTrue(self.tl.dirty)
+        self.assertNotIn(conf.BLOCKEDBY, self.tl.get_item_by_index("bbb").properties)
+        self.assertNotIn(conf.BLOCKEDBY, self.tl.get_item_by_index("ddd").properties)
+        self.assertIsNone(self.tl.get_item_by_index("fff"))
+        self.assertEqual(len(self.tl.todolist), len(LINES) - 1)
+        self.assert_ordered()
+
+    def test_batch_remove(self):
+        list(self.tl.list_items())
+        todolist = self.tl.todolist
+        # removing items does not sort the list again
+        with self.tl.batch():
+            for tid in ("ccc", "fff"):
+                self.tl.remove_item(self.tl.get_item_by_index(tid))
+        self.assertIs(self.tl.todolist, todolist)
+        self.assertEqual(len(self.tl.todolist), len(LINES) - 2)
+        self.assert_ordered()
+
+    def test_dependencies(self):
+        tl = self.tl
+        self.assertEqual(tl.blocking, {u"aaa": set([u"bbb", u"ddd"]), u"eee": set([u"ddd"])})
+        tl.replace_or_add_prop(tl.get_item_by_index("bbb"), conf.BLOCKEDBY, u"eee")
+        self.assertEqual(tl.blocking[u"eee"], set([u"bbb", u"ddd"]))
+        tl.remove_prop(tl.get_item_by_index("ddd"), conf.BLOCKEDBY, u"aaa")
+        self.assertEqual(tl.dependencies[u"ddd"], set([u"eee"]))
+        self.assertEqual(tl.blocking[u"aaa"], set([u"bbb"]))
+        tl.remove_item(tl.get_item_by_index("eee"))
+        self.assertNotIn(u"eee", tl.blocking)
+        self.assertNotIn(conf.BLOCKEDBY, tl.get_item_by_index("ddd").properties)
+        self.assertNotIn(u"blockedby:eee", tl.get_item_by_index("bbb").text)
+        tl.set_to_done(tl.get_item_by_index("aaa"))
+        self.assertEqual((tl.blocking, tl.dependencies), ({}, {}))
+        self.assertEqual(tl.get_item_by_index("bbb").text, u"Call Bob @phone id:bbb")
+
+    def test_lookup(self):
+        self.assert_ordered()
+        item = self.tl.get_item_by_index("-1")
+        self.assertEqual(item.nr, len(LINES) - 1)
+        self.assertIsNone(self.tl.get_item_by_index("zzz"))
+        self.assertIsNone(self.tl.get_item_by_index(str(len(LINES))))
+        # tids given in the text of new and replaced items are indexed
+        item = self.tl.add_item(u"New item id:ggg")
+        self.assertIs(self.tl.get_item_by_index("ggg"), item)
+        new_item = self.tl.replace_item(item, TodoItem(u"(A) Changed item id:hhh"))
+        self.assertIsNone(self.tl.get_item_by_index("ggg"))
+        self.assertIs(self.tl.get_item_by_index("hhh"), new_item)
+        # behind "(A) Prepare talk", which has a due date
+        self.assertEqual(new_item.nr, 1)
+        self.assert_ordered()
+
+    def test_write(self):
+        self.assertGreater(self.tl.write(), 0)
+        # the sorted list is not written again
+        tl = TodoList(self.filename)
+        tl.dirty = True
+        with tl:
+            pass
+        self.assertEqual((tl.bytes_written, tl.dirty), (0, False))
+        tl.set_priority(tl.get_item_by_index("eee"), "C")
+        # the written bytes are reported with the timings
+        conf.timings = Timings()
+        try:
+            written = tl.write()
+            self.assertEqual(conf.timings.bytes_written, written)
+            self.assertEqual(conf.timings.report()[-1], u"written     : {nr:8d} bytes".format(nr = written))
+        finally:
+            del conf.timings
+        with open(self.filename, "rb") as fp:
+            content = fp.read()
+        self.assertEqual(written, len(content))
+        self.assertIn("(C) Review slides id:eee\n", content)
+        self.assertEqual(tl.write(), 0)
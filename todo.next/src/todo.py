@@ -16,6 +16,16 @@ from __future__ import print_function
 from actions import actions
 from todo.config import ConfigBorg
 from todo.todolist import TodoList
+from todo.parse_cache import ParseCache, CACHE_FILENAME, DEFAULT_SIZE
+from todo.tid_allocator import DEFAULT_OCCUPANCY
+from todo.tid_index import TidIndex, INDEX_FILENAME
+from todo.appender import TodoAppender
+from todo.lookup import TodoLookup, LINE_INDEX_FILENAME, is_tid_lookup
+from todo.snapshot import Snapshot, SNAPSHOT_FILENAME
+from todo.locking import FileLock, LOCK_FILENAME, LOCK_MODES
+from todo.journal import Journal, JOURNAL_FILENAME, DEFAULT_THRESHOLD
+from todo.search_index import SearchIndex, SEARCH_INDEX_FILENAME
+from todo.timing import Timings, measure
 from misc.cli_helpers import get_colors, confirm_action
 from version import program_version
 
@@ -172,6 +182,46 @@ if __name__ == '__main__':
         cconf.backup_dir = config.get("archive", "backup_dir")
         cconf.archive_unsorted_filename = config.get("archive", "archive_unsorted_filename")
         cconf.archive_filename_scheme = config.get("archive", "archive_filename_scheme")
+        # rotation of archive files into compressed files, not available in older configuration files
+        cconf.archive_compress_days = 0
+        if config.has_option("archive", "compress_after_days"):
+            cconf.archive_compress_days = config.getint("archive", "compress_after_days")
+        cconf.archive_compress_size = 0
+        if config.has_option("archive", "compress_size"):
+            cconf.archive_compress_size = config.getint("archive", "compress_size") * 1024
+        # size of the parse cache, not available in older configuration files
+        cache_size = DEFAULT_SIZE
+        if config.has_option("extensions", "parse_cache_size"):
+            cache_size = config.getint("extensions", "parse_cache_size")
+        # appending new items without reading the todo file, not available in older configuration files
+        cconf.append_add = True
+        if config.has_option("extensions", "append_add"):
+            cconf.append_add = config.getboolean("extensions", "append_add")
+        # binary snapshot of the loaded todo list, not available in older configuration files
+        use_snapshot = True
+        if config.has_option("extensions", "snapshot"):
+            use_snapshot = config.getboolean("extensions", "snapshot")
+        # locking of the todo file against concurrent changes, not available in older configuration files
+        lock_mode = "lock"
+        if config.has_option("extensions", "locking"):
+            lock_mode = config.get("extensions", "locking").lower()
+            if lock_mode not in LOCK_MODES:
+                raise ConfigParser.Error("locking must be one of {modes}".format(modes = ", ".join(LOCK_MODES)))
+        # journal of changes instead of rewriting the todo file, not available in older configuration files
+        use_journal = False
+        if config.has_option("extensions", "journal"):
+            use_journal = config.getboolean("extensions", "journal")
+        journal_threshold = DEFAULT_THRESHOLD
+        if config.has_option("extensions", "journal_threshold"):
+            journal_threshold = config.getint("extensions", "journal_threshold")
+        # trigram index of the archive files for searching, not available in older configuration files
+        use_search_index = True
+        if config.has_option("extensions", "search_index"):
+            use_search_index = config.getboolean("extensions", "search_index")
+        # fraction of used tids above which tids get longer, not available in older configuration files
+        cconf.tid_occupancy = DEFAULT_OCCUPANCY
+        if config.has_option("extensions", "tid_occupancy"):
+            cconf.tid_occupancy = config.getfloat("extensions", "tid_occupancy")
     except ConfigParser.Error, ex:
         print("Your configuration file seems to be incorrect. Please check '{fn}'.".format(fn = config_file))
         print(ex)
@@ -185,6 +235,7 @@ if __name__ == '__main__':
     
     parser.add_argument("-n", "--no-colors", action="store_true", help="suppress colored output")
     parser.add_argument("-q", "--quiet", action="store_true", help="quiet flag")
+    parser.add_argument("--timing", action="store_true", help="print the time spent in loading, writing and waiting for the lock")
     parser.add_argument("-v", "--version", action="version", version="todo.next v. {version}".format(version = program_version))
     
     # -------------------------------------------------
@@ -213,6 +264,11 @@ if __name__ == '__main__':
         parse_unblock.add_argument("item", type=to_unicode)
         parse_unblock.add_argument("blocked", type=to_unicode)
 
+        parse_ready = subparser.add_parser("ready")
+        parse_ready.add_argument("-c", "--critical", action="store_true")
+
+        parse_graph = subparser.add_parser("graph")
+
     parse_call = subparser.add_parser("call")
     parse_call.add_argument("item", type=to_unicode)
         
@@ -296,13 +352,17 @@ if __name__ == '__main__':
     parse_report = subparser.add_parser("report", aliases=("rep", ))
     parse_report.add_argument("from_date", type=to_unicode, nargs="?")
     parse_report.add_argument("to_date", type=to_unicode, nargs="?")
+    parse_report.add_argument("-j", "--jobs", type=int, default=1)
     
     parse_search = subparser.add_parser("search")
     parse_search.add_argument("search_string", type=to_unicode)
     parse_search.add_argument("-r", "--regex", action="store_true")
     parse_search.add_argument("-c", "--ci", action="store_true")
+    parse_search.add_argument("-j", "--jobs", type=int, default=1)
 
     parse_stats = subparser.add_parser("stats")
+    parse_stats.add_argument("-r", "--range", type=to_unicode, nargs="+", metavar="DATE")
+    parse_stats.add_argument("-b", "--rebuild", action="store_true")
 
     # -------------------------------------------------
     # Maintenance functionality
@@ -342,9 +402,76 @@ if __name__ == '__main__':
                 to_col = ""
         setattr(cconf, color, to_col)
         
-    with TodoList(todo_filename) as tl:
+    action_func = getattr(actions, "cmd_" + args.command)
+    # single item commands only parse the items they touch
+    lazy = cconf.id_support and action_func in actions.LAZY_ACTIONS
+    # the tid index is needed for appending items with id support
+    tid_index = None
+    if cconf.append_add and cconf.id_support:
+        tid_index = TidIndex(os.path.join(os.path.dirname(todo_filename), INDEX_FILENAME), cconf.tid_occupancy)
+    if args.timing:
+        cconf.timings = Timings()
+    if use_journal:
+        cconf.journal = Journal(os.path.join(os.path.dirname(todo_filename), JOURNAL_FILENAME), todo_filename, 
+                                journal_threshold)
+    if use_search_index:
+        cconf.search_index = SearchIndex(os.path.join(os.path.dirname(todo_filename), SEARCH_INDEX_FILENAME))
+    file_lock = None
+    if lock_mode != "none":
+        file_lock = cconf.file_lock = FileLock(os.path.join(os.path.dirname(todo_filename), LOCK_FILENAME), 
+                                               todo_filename, lock_mode == "optimistic")
+    # whether the command has been run without loading the todo list
+    handled = False
+    # without ids, added items are shown with their index, which is only known after sorting
+    # them into the list
+    if cconf.append_add and cconf.id_support and action_func in actions.APPEND_ACTIONS:
+        # the todo file must not be changed between checking the index and appending
+        if file_lock is not None:
+            file_lock.acquire()
         try:
-            # call the respective command
-            getattr(actions, "cmd_" + args.command)(tl, args)
-        except:
-            raise
\ No newline at end of file
+            # a full journal is compacted by writing the todo list
+            journal = getattr(cconf, "journal", None)
+            if tid_index.is_current(todo_filename) and (journal is None or not journal.is_full()):
+                # new items are appended without reading the todo file
+                with TodoAppender(todo_filename, tid_index) as tl:
+                    with measure("command"):
+                        action_func(tl, args)
+                handled = True
+        finally:
+            if file_lock is not None:
+                file_lock.release()
+    if not handled and action_func in actions.LOOKUP_ACTIONS and is_tid_lookup([args.item]):
+        # the item is read from its line, the todo file is only read, so no lock is needed
+        with TodoLookup(todo_filename, os.path.join(os.path.dirname(todo_filename), LINE_INDEX_FILENAME)) as tl:
+            with measure("command"):
+                action_func(tl, args)
+        handled = True
+    if not handled:
+        if cache_size > 0:
+            cconf.parse_cache = ParseCache(os.path.join(os.path.dirname(todo_filename), CACHE_FILENAME), cache_size)
+        if use_snapshot:
+            cconf.snapshot = Snapshot(os.path.join(os.path.dirname(todo_filename), SNAPSHOT_FILENAME), todo_filename)
+        with TodoList(todo_filename, lazy) as tl:
+            try:
+                # call the respective command
+                with measure("command"):
+                    action_func(tl, args)
+            except:
+                raise
+        if cache_size > 0:
+            cconf.parse_cache.save()
+        if tid_index is not None and not tl.merged and not tid_index.is_current(todo_filename):
+            # the todo file has been changed, the next added item needs a current index, 
+            # which can only be built from the list if it contains the file's items
+            if file_lock is not None:
+                file_lock.acquire()
+            try:
+                if tl.is_current():
+                    tid_index.rebuild(tl)
+                    tid_index.save(todo_filename)
+            finally:
+                if file_lock is not None:
+                    file_lock.release()
+    if args.timing:
+        for line in cconf.timings.report():
+            print(line, file = sys.stderr)
\ No newline at end of file
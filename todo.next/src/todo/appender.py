@@ -0,0 +1,121 @@
+"""
+:mod:`appender`
+~~~~~~~~~~~~~~~
+
+Provides adding items to a todo file by appending lines, without reading the file.
+
+The appended items are sorted into the list the next time the todo file is written
+by a :class:`TodoList`. While there is a journal of changes of the todo file, the items
+are added to the journal instead, after the changes journaled before. Once the journal is
+full (see :meth:`Journal.is_full`), items are added by a :class:`TodoList`, which compacts
+the journal into the todo file.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from todoitem import TodoItem
+from journal import ADD
+from config import ConfigBorg
+from timing import count_written
+
+import os, logging
+
+conf = ConfigBorg()
+logger = logging.getLogger("todonext.appender")
+
+
+class TodoAppender(object):
+    """replacement of a :class:`TodoList` for commands that only add items
+    
+    Tids of new items are checked and allocated with a current :class:`TidIndex`.
+    """
+    
+    def __init__(self, todofile, tid_index = None):
+        """constructor
+        
+        :param todofile: the filename of the ``todo.next`` file
+        :type todofile: str
+        :param tid_index: the index of the todo file, required with id support
+        :type tid_index: :class:`TidIndex`
+        """
+        self.todofile = todofile
+        self.tid_index = tid_index
+        self.lines = []
+        self.dirty = False
+        self.bytes_written = 0
+    
+    
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb): #@UnusedVariable
+        """context manager: on closing, appends the new items to the todo file, if no
+        exception occurred
+        """
+        if self.dirty and not exc_type:
+            self.write()
+        return False
+    
+    
+    def add_item(self, item_str):
+        """adds a new todo item, like :meth:`TodoList.add_item`
+        
+        ``blockedby`` properties referring to items that are done or do not exist are 
+        removed, as loading the todo list would do.
+        
+        :param item_str: the string representation of a :class:`TodoItem`
+        :type item_str: str
+        :returns: the parsed todo item
+        :rtype: :class:`TodoItem` 
+        """
+        item = TodoItem(item_str)
+        item.set_creation_date()
+        if conf.id_support:
+            tid_index = self.tid_index
+            if not item.tid:
+                item.replace_or_add_prop(conf.ID, tid_index.used.allocate())
+            elif tid_index.used.is_used(item.tid):
+                # used in the todo file or in the archives
+                logger.warning(u"Duplicate ID '{item_id}'".format(item_id = item.tid))
+            if not (item.done or item.is_report):
+                for tid in list(item.properties.get(conf.BLOCKEDBY, ())):
+                    if tid not in tid_index.open:
+                        item.remove_prop(conf.BLOCKEDBY, tid)
+            tid_index.add(item)
+        self.lines.append(item.text)
+        self.dirty = True
+        return item
+    
+    
+    def write(self):
+        """appends the new items to the todo file
+        
+        :returns: the number of bytes written
+        :rtype: int
+        """
+        journal = getattr(conf, "journal", None)
+        if journal is not None and journal.todofile == self.todofile and journal.get_size():
+            # the todo file must not change while the journal is applied to it
+            self.bytes_written = journal.append([(ADD, line) for line in self.lines])
+            logger.info(u"Journaled {nr} items of {fn}".format(nr = len(self.lines), fn = self.todofile))
+        else:
+            content = u"".join(line + u"\n" for line in self.lines).encode("utf-8")
+            with open(self.todofile, "ab+") as fp:
+                fp.seek(0, os.SEEK_END)
+                if fp.tell() > 0:
+                    fp.seek(-1, os.SEEK_END)
+                    if fp.read(1) not in ("\n", "\r"):
+                        # the last line has not been terminated
+                        content = "\n" + content
+                fp.write(content)
+                fp.flush()
+                os.fsync(fp.fileno())
+            self.bytes_written = len(content)
+            logger.info(u"Appended {nr} bytes to {fn}".format(nr = len(content), fn = self.todofile))
+        if self.tid_index is not None:
+            self.tid_index.save(self.todofile)
+        self.lines = []
+        self.dirty = False
+        count_written(self.bytes_written)
+        return self.bytes_written
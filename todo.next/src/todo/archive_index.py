@@ -0,0 +1,323 @@
+"""
+:mod:`archive_index`
+~~~~~~~~~~~~~~~~~~~~
+
+Provides an index of the archive files of a todo file, which is stored next to the todo file.
+
+For each archive file, the index records the date encoded in its file name, the number of
+items, the range of the done dates of its done and report items and the size and
+modification time of the file. Reports only open the archive files whose done dates overlap
+the reported days.
+
+The index also records whether the done dates of a file are in chronological order, which
+they are as long as :func:`cmd_archive` appends newer items than before. Such files can be
+read from the end until the first item done before the reported days.
+
+The index is kept up to date by :func:`cmd_archive`. Archive files that have been changed
+otherwise are detected by their size and modification time and are read again.
+
+Archive files that have not been written for some time or have grown large can be moved to
+gzip compressed files by :meth:`ArchiveIndex.rotate`. The compressed file of an archive file
+is named like it with :data:`COMPRESSED_SUFFIX` appended, archive files that are written again
+after their rotation are appended to their compressed file by the next rotation.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from columns import TodoColumns, date_to_stamp, stamp_to_date
+from files import write_atomically, get_file_stamp, is_compressed, compress_file, COMPRESSED_SUFFIX
+
+import datetime, glob, json, logging, math, os, re, time
+
+logger = logging.getLogger("todonext.archive_index")
+
+# needs to be increased whenever the format of the index changes
+INDEX_VERSION = 2
+# file name of the index, located next to the todo file
+ARCHIVE_INDEX_FILENAME = ".todonext.archives"
+# done date of items without done date, as in reports
+NO_DONE_DATE = datetime.datetime(1970, 1, 1)
+
+# regex for the variables of the archive file name scheme
+re_scheme_vars = re.compile("%\D", re.UNICODE)
+
+
+def get_scheme_date(scheme, filename):
+    """returns the date encoded in the name of an archive file
+
+    :param scheme: the archive file name scheme, e.g. ``archive/%Y-%m/%Y-%m-%d.txt``
+    :type scheme: str
+    :param filename: the name of the archive file, relative to the todo file's directory
+    :type filename: str
+    :returns: the date or ``None``, if the file name does not match the scheme
+    :rtype: :class:`datetime.datetime`
+    """
+    if is_compressed(filename):
+        filename = filename[:-len(COMPRESSED_SUFFIX)]
+    parts = re.split("(%\D)", scheme)
+    pattern = "".join("(.+)" if nr % 2 else re.escape(part) for nr, part in enumerate(parts))
+    match = re.match(pattern + "$", filename, re.UNICODE)
+    if match is None:
+        return None
+    # a variable may be used more than once
+    mapping = dict(zip(parts[1::2], match.groups()))
+    try:
+        return datetime.datetime.strptime(" ".join(mapping.values()), " ".join(mapping))
+    except ValueError:
+        return None
+
+
+class ArchiveIndex(object):
+    """index of the archive files of a todo file
+    """
+
+    def __init__(self, filename, root_dir, scheme, unsorted_filename):
+        """constructor, reads the index file, if existing and valid
+
+        :param filename: the name of the index file
+        :type filename: str
+        :param root_dir: the directory of the todo file, which the archive file names are
+            relative to
+        :type root_dir: str
+        :param scheme: the archive file name scheme
+        :type scheme: str
+        :param unsorted_filename: the name of the archive file for items without done date
+        :type unsorted_filename: str
+        """
+        self.filename = filename
+        self.root_dir = root_dir
+        self.scheme = scheme
+        self.unsorted_filename = unsorted_filename
+        # entries of the archive files, by relative file name
+        self.files = {}
+        self.changed = False
+        self.load()
+
+
+    def load(self):
+        """reads the index file, if it exists and belongs to the current archive configuration
+        """
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "rb") as fp:
+                data = json.load(fp)
+        except (IOError, ValueError), ex:
+            logger.warning(u"Could not read archive index {fn}: {ex}".format(fn = self.filename, ex = ex))
+            return
+        if data.get("version") != INDEX_VERSION or data.get("scheme") != self.scheme or \
+                data.get("unsorted") != self.unsorted_filename:
+            return
+        self.files = data["files"]
+
+
+    def save(self):
+        """writes the index file, if the index has been changed
+        """
+        if not self.changed:
+            return
+        data = {"version": INDEX_VERSION, "scheme": self.scheme, "unsorted": self.unsorted_filename,
+                "files": self.files}
+        try:
+            write_atomically(self.filename, json.dumps(data, separators = (",", ":")), sync = False)
+            self.changed = False
+        except (IOError, OSError), ex:
+            logger.warning(u"Could not write archive index {fn}: {ex}".format(fn = self.filename, ex = ex))
+
+
+    def _get_path(self, name):
+        return os.path.join(self.root_dir, name)
+
+
+    def _find_files(self):
+        """returns the relative names of all existing archive files
+
+        :rtype: list(str)
+        """
+        # replace all %x-variables with '*' and let glob do the hard work
+        pattern = self._get_path(re_scheme_vars.sub("*", self.scheme))
+        names = [os.path.relpath(fn, self.root_dir) for fn in glob.glob(pattern) + glob.glob(pattern + COMPRESSED_SUFFIX)]
+        for name in (self.unsorted_filename, self.unsorted_filename + COMPRESSED_SUFFIX):
+            if os.path.exists(self._get_path(name)) and name not in names:
+                names.append(name)
+        return names
+
+
+    def _scan(self, name):
+        """reads an archive file and creates its entry
+
+        :param name: the relative name of the archive file
+        :type name: str
+        """
+        path = self._get_path(name)
+        columns = TodoColumns.from_file(path)
+        no_done = date_to_stamp(NO_DONE_DATE)
+        done = [no_done if math.isnan(stamp) else stamp for pos, stamp in enumerate(columns.done) if columns.flags[pos]]
+        date = get_scheme_date(self.scheme, name)
+        self.files[name] = {"stamp": get_file_stamp(path), "count": len(columns),
+                            "date": date_to_stamp(date) if date is not None else None,
+                            "done": [min(done), max(done)] if done else None,
+                            "last": done[-1] if done else None,
+                            "sorted": all(stamp <= done[pos + 1] for pos, stamp in enumerate(done[:-1]))}
+        self.changed = True
+
+
+    def refresh(self):
+        """brings the index up to date with the archive files
+
+        Only new archive files and archive files that have been changed otherwise than by
+        :meth:`add_items` are read.
+        """
+        names = self._find_files()
+        for name in set(self.files).difference(names):
+            del self.files[name]
+            self.changed = True
+        for name in names:
+            entry = self.files.get(name, None)
+            if entry is None:
+                self._scan(name)
+            elif get_file_stamp(self._get_path(name)) != entry["stamp"]:
+                logger.info(u"Archive file {fn} has been changed".format(fn = name))
+                self._scan(name)
+
+
+    def get_files(self):
+        """returns the names of all archive files
+
+        :returns: the file names, each compressed file before its uncompressed file and the
+            files for items without done date last
+        :rtype: list(str)
+        """
+        self.refresh()
+        def get_key(name):
+            compressed = is_compressed(name)
+            if compressed:
+                name = name[:-len(COMPRESSED_SUFFIX)]
+            return name == self.unsorted_filename, name, not compressed
+        return [self._get_path(name) for name in sorted(self.files, key = get_key)]
+
+
+    def select_done(self, from_date, to_date):
+        """returns the names of the archive files that contain done or report items that
+        have been done on one of the days from ``from_date`` to ``to_date``
+
+        Items without done date are assumed to have been done on :data:`NO_DONE_DATE`.
+
+        :param from_date: the first day of the range
+        :type from_date: :class:`datetime.datetime`
+        :param to_date: the last day of the range
+        :type to_date: :class:`datetime.datetime`
+        :returns: the file names, the file for items without done date last
+        :rtype: list(str)
+        """
+        from_stamp = date_to_stamp(from_date.replace(hour=0, minute=0, second=0, microsecond=0))
+        to_stamp = date_to_stamp(to_date.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1))
+        selected = []
+        for filename in self.get_files():
+            done = self.files[os.path.relpath(filename, self.root_dir)]["done"]
+            if done is not None and done[0] < to_stamp and done[1] >= from_stamp:
+                selected.append(filename)
+        return selected
+
+
+    def add_items(self, filename, items):
+        """updates the entry of an archive file after items have been appended to it
+
+        The index has to be refreshed before the items are appended.
+
+        :param filename: the name of the archive file
+        :type filename: str
+        :param items: the appended items, in the order of the file
+        :type items: list(:class:`TodoItem`)
+        """
+        name = os.path.relpath(filename, self.root_dir)
+        entry = self.files.get(name, None)
+        if entry is None:
+            self._scan(name)
+            return
+        done = [date_to_stamp(item.done_date or NO_DONE_DATE) for item in items if item.done or item.is_report]
+        if done:
+            if entry["last"] is not None:
+                done.insert(0, entry["last"])
+            entry["sorted"] = entry["sorted"] and all(stamp <= done[pos + 1] for pos, stamp in enumerate(done[:-1]))
+            entry["last"] = done[-1]
+        if entry["done"] is not None:
+            done.extend(entry["done"])
+        entry["done"] = [min(done), max(done)] if done else None
+        entry["count"] += len(items)
+        entry["stamp"] = get_file_stamp(self._get_path(name))
+        self.changed = True
+
+
+    def is_chronological(self, filename):
+        """returns whether the done and report items of an archive file are sorted by their
+        done dates, the oldest first
+
+        :param filename: the name of the archive file
+        :type filename: str
+        :rtype: bool
+        """
+        return self.files[os.path.relpath(filename, self.root_dir)]["sorted"]
+
+
+    def get_done_range(self, filename):
+        """returns the first and last done date of the done and report items of an archive file
+
+        :param filename: the name of the archive file
+        :type filename: str
+        :returns: the dates or ``None``, if the file contains neither done nor report items
+        :rtype: tuple(:class:`datetime.datetime`)
+        """
+        done = self.files[os.path.relpath(filename, self.root_dir)]["done"]
+        if done is None:
+            return None
+        return stamp_to_date(done[0]), stamp_to_date(done[1])
+
+
+    def rotate(self, max_age = 0, max_size = 0):
+        """compresses the uncompressed archive files that have not been written for
+        ``max_age`` days or are larger than ``max_size`` bytes
+
+        Each file is appended to its compressed file (see :func:`compress_file`) and removed
+        afterwards. The entries of the compressed files are updated without reading them.
+        The index has to be refreshed before.
+
+        :param max_age: the age in days, 0 for no limit
+        :type max_age: int
+        :param max_size: the size in bytes, 0 for no limit
+        :type max_size: int
+        :returns: the names of the compressed files
+        :rtype: list(str)
+        """
+        rotated = []
+        if not max_age and not max_size:
+            return rotated
+        now = time.time()
+        for name in sorted(self.files):
+            entry = self.files[name]
+            if is_compressed(name):
+                continue
+            size, mtime = entry["stamp"]
+            if not (max_age and now - mtime > max_age * 86400 or max_size and size > max_size):
+                continue
+            path = self._get_path(name)
+            compressed_name = name + COMPRESSED_SUFFIX
+            logger.info(u"Compressing archive file {fn}".format(fn = name))
+            compress_file(path, self._get_path(compressed_name))
+            os.remove(path)
+            del self.files[name]
+            compressed = self.files.get(compressed_name, None)
+            if compressed is not None:
+                # the compressed items precede the items of the uncompressed file
+                if entry["done"] is not None:
+                    if compressed["done"] is not None:
+                        entry["sorted"] = compressed["sorted"] and entry["sorted"] and compressed["last"] <= entry["done"][0]
+                        entry["done"] = [min(entry["done"][0], compressed["done"][0]), max(entry["done"][1], compressed["done"][1])]
+                else:
+                    entry.update(done = compressed["done"], last = compressed["last"], sorted = compressed["sorted"])
+                entry["count"] += compressed["count"]
+            entry["stamp"] = get_file_stamp(self._get_path(compressed_name))
+            self.files[compressed_name] = entry
+            self.changed = True
+            rotated.append(self._get_path(compressed_name))
+        return rotated
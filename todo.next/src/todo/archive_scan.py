@@ -0,0 +1,133 @@
+"""
+:mod:`archive_scan`
+~~~~~~~~~~~~~~~~~~~
+
+Provides scans of the archive files, which can be distributed to worker processes.
+
+Each archive file is scanned as a whole by one worker. The worker reads the file through a
+reader of :func:`open_reader`, which streams plain and compressed files alike, or through
+:class:`TodoColumns`, filters the lines without parsing them where possible and returns the
+texts of the matching lines, which are parsed again by the caller.
+Archive files are only read, neither the workers nor the caller write them.
+
+The results are returned in the order of the files, each as soon as it and the results of
+all files before it are available, so that the output does not depend on the number of
+workers.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from config import ConfigBorg
+from linereader import open_reader
+from columns import TodoColumns, date_to_stamp
+from todoitem import TodoItem
+from files import is_compressed
+
+import datetime, math, multiprocessing, re
+
+conf = ConfigBorg()
+
+# types of the configuration values that are passed to the worker processes, other values
+# (e.g. locks and caches) are only used by the main process
+CONF_TYPES = (basestring, bool, int, long, float, list, tuple)
+
+
+def _init_worker(state):
+    """sets the configuration of a worker process, which is empty if it is not forked
+
+    :param state: the configuration values
+    :type state: dict
+    """
+    for key, value in state.iteritems():
+        if not hasattr(conf, key):
+            setattr(conf, key, value)
+
+
+def search_file(task):
+    """returns the lines of an archive file matching a regular expression
+
+    :param task: the file name, the pattern and flags of the regular expression, the UTF-8
+        encoded search string for plain searches or ``None`` and the offsets of the candidate
+        lines (see :meth:`SearchIndex.find`) or ``None`` for all lines
+    :type task: tuple
+    :returns: the texts of the matching lines
+    :rtype: list(str)
+    """
+    filename, pattern, flags, needle, offsets = task
+    re_search = re.compile(pattern, flags)
+    with open_reader(filename) as reader:
+        if offsets is not None:
+            texts = reader.get_texts_at(offsets)
+            return [text for text in texts if re_search.search(text)]
+        lines = reader.find(needle) if needle else reader.search(re_search)
+        return [text for _, text in lines]
+
+
+def select_done(task):
+    """returns the done and report items of an archive file that have been done within a
+    date range (see :meth:`TodoColumns.select_done`)
+
+    Files whose items are sorted by done date are read from the end, until the first item
+    that has been done before the range. Compressed files cannot be read backwards, they are
+    read from the start until the first item that has been done after the range.
+
+    :param task: the file name, the first and last day of the range, the date assumed for
+        items without done date and whether the items are sorted by done date
+    :type task: tuple
+    :returns: the texts of the items, in the order of the file
+    :rtype: list(str)
+    """
+    filename, from_date, to_date, na_date, chronological = task
+    if not chronological:
+        columns = TodoColumns.from_file(filename)
+        return [item.text for item in columns.get_items(columns.select_done(from_date, to_date, na_date))]
+    from_stamp = date_to_stamp(from_date.replace(hour=0, minute=0, second=0, microsecond=0))
+    to_stamp = date_to_stamp(to_date.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1))
+    na_stamp = date_to_stamp(na_date)
+    forward = is_compressed(filename)
+    texts = []
+    with open_reader(filename) as reader:
+        lines = reader.iter_lines() if forward else reader.iter_lines_reversed()
+        for _, text in lines:
+            item = TodoItem(text)
+            if not (item.done or item.is_report):
+                continue
+            stamp = date_to_stamp(item.done_date)
+            if math.isnan(stamp):
+                stamp = na_stamp
+            if (stamp >= to_stamp) if forward else (stamp < from_stamp):
+                break
+            if from_stamp <= stamp < to_stamp:
+                texts.append(text)
+    if not forward:
+        texts.reverse()
+    return texts
+
+
+def scan(func, tasks, jobs = 1):
+    """applies a scan function to archive files
+
+    :param func: the scan function, e.g. :func:`search_file`
+    :type func: function
+    :param tasks: the arguments of the scan function, one per archive file
+    :type tasks: list(tuple)
+    :param jobs: the number of worker processes, the files are scanned by the calling
+        process if it is 1 or less
+    :type jobs: int
+    :returns: the results of the scan function, in the order of the tasks
+    :rtype: generator
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+    state = dict((key, value) for key, value in conf.__dict__.iteritems() if isinstance(value, CONF_TYPES))
+    pool = multiprocessing.Pool(min(jobs, len(tasks)), _init_worker, (state, ))
+    try:
+        # several small files are handed to a worker at once
+        for result in pool.imap(func, tasks, max(1, len(tasks) // (4 * jobs))):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
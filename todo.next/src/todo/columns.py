@@ -0,0 +1,225 @@
+"""
+:mod:`columns`
+~~~~~~~~~~~~~~
+
+Provides a columnar store for the sortable and filterable fields of many todo items.
+
+Instead of keeping a :class:`TodoItem` per line, priorities, flags, timestamps, tids
+and the byte offsets of the lines are kept in arrays that are indexed by position.
+The full item is only read from the file again if it is needed.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from todoitem import TodoItem
+from linereader import open_reader
+from config import ConfigBorg
+
+import array, calendar, datetime, math
+
+conf = ConfigBorg()
+
+# flags of an item
+FLAG_DONE = 1
+FLAG_REPORT = 2
+# timestamp of a missing or unparsable date
+NO_DATE = float("nan")
+# tids consisting of up to that many lowercase letters are stored as numbers
+MAX_TID_LEN = 10
+# marker for tids that cannot be stored as numbers
+NO_TID, OTHER_TID = -1.0, -2.0
+
+def date_to_stamp(date):
+    """converts a date to a float (seconds since epoch, ignoring time zones)
+
+    :param date: the date
+    :type date: :class:`datetime.datetime` or str
+    :returns: the timestamp, :data:`NO_DATE` if not a date
+    :rtype: float
+    """
+    if not isinstance(date, datetime.datetime):
+        return NO_DATE
+    return calendar.timegm(date.timetuple()) + date.microsecond / 1e6
+
+
+def stamp_to_date(stamp):
+    """converts a timestamp created by :func:`date_to_stamp` back to a date
+
+    :param stamp: the timestamp
+    :type stamp: float
+    :returns: the date or ``None``
+    :rtype: :class:`datetime.datetime`
+    """
+    if math.isnan(stamp):
+        return None
+    return datetime.datetime.utcfromtimestamp(stamp)
+
+
+def encode_tid(tid):
+    """encodes a tid consisting of lowercase letters as base-26 number
+
+    The length is encoded in the lowest 4 bits, so that e.g. ``aab`` and ``ab`` differ.
+
+    :param tid: the tid
+    :type tid: str
+    :returns: the encoded tid, :data:`NO_TID` or :data:`OTHER_TID`
+    :rtype: float
+    """
+    if not tid:
+        return NO_TID
+    if len(tid) > MAX_TID_LEN:
+        return OTHER_TID
+    nr = 0
+    for char in tid:
+        if not u"a" <= char <= u"z":
+            return OTHER_TID
+        nr = nr * 26 + ord(char) - 97
+    return float(nr * 16 + len(tid))
+
+
+def decode_tid(code):
+    """decodes a tid encoded by :func:`encode_tid`
+
+    :param code: the encoded tid
+    :type code: float
+    :returns: the tid
+    :rtype: str
+    """
+    code = int(code)
+    nr, length = code // 16, code % 16
+    chars = []
+    for _ in xrange(length):
+        nr, rest = divmod(nr, 26)
+        chars.append(unichr(97 + rest))
+    return u"".join(reversed(chars))
+
+
+class TodoColumns(object):
+    """columnar store of the fields of many todo items, indexed by position
+    """
+
+    def __init__(self, filename = None):
+        """constructor, creates an empty store
+
+        :param filename: the file the byte offsets refer to
+        :type filename: str
+        """
+        self.filename = filename
+        self.priorities = array.array("B")
+        self.flags = array.array("B")
+        self.due = array.array("d")
+        self.done = array.array("d")
+        self.created = array.array("d")
+        self.tids = array.array("d")
+        self.offsets = array.array("d")
+        # tids that cannot be encoded, by position
+        self.other_tids = {}
+
+
+    @classmethod
+    def from_file(cls, filename):
+        """reads all items of a todo file into a new store
+
+        :param filename: the name of the todo file
+        :type filename: str
+        :returns: the filled store
+        :rtype: :class:`TodoColumns`
+        """
+        columns = cls(filename)
+        with open_reader(filename) as reader:
+            for offset, text in reader.iter_lines():
+                columns.append(TodoItem(text), offset)
+        return columns
+
+
+    def __len__(self):
+        return len(self.flags)
+
+
+    def append(self, item, offset = -1):
+        """appends the fields of a todo item
+
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        :param offset: byte offset of the item's line in :attr:`filename`
+        :type offset: int
+        """
+        self.priorities.append(ord(item.priority) if item.priority else 0)
+        self.flags.append((FLAG_DONE if item.done else 0) | (FLAG_REPORT if item.is_report else 0))
+        self.due.append(date_to_stamp(item.due_date))
+        self.done.append(date_to_stamp(item.done_date))
+        self.created.append(date_to_stamp(item.created_date))
+        code = encode_tid(item.tid)
+        if code == OTHER_TID:
+            self.other_tids[len(self.tids)] = item.tid
+        self.tids.append(code)
+        self.offsets.append(offset)
+
+
+    def get_priority(self, pos):
+        return unichr(self.priorities[pos]) if self.priorities[pos] else None
+
+    def is_done(self, pos):
+        return bool(self.flags[pos] & FLAG_DONE)
+
+    def is_report(self, pos):
+        return bool(self.flags[pos] & FLAG_REPORT)
+
+    def get_due_date(self, pos):
+        return stamp_to_date(self.due[pos])
+
+    def get_done_date(self, pos):
+        return stamp_to_date(self.done[pos])
+
+    def get_created_date(self, pos):
+        return stamp_to_date(self.created[pos])
+
+    def get_tid(self, pos):
+        code = self.tids[pos]
+        if code == NO_TID:
+            return None
+        elif code == OTHER_TID:
+            return self.other_tids[pos]
+        return decode_tid(code)
+
+
+    def select_done(self, from_date, to_date, na_date = None):
+        """returns the positions of all done and report items that have been done 
+        on one of the days from ``from_date`` to ``to_date``
+
+        :param from_date: the first day of the range
+        :type from_date: :class:`datetime.datetime`
+        :param to_date: the last day of the range
+        :type to_date: :class:`datetime.datetime`
+        :param na_date: the date assumed for items without done date, if any
+        :type na_date: :class:`datetime.datetime`
+        :returns: list of positions
+        :rtype: list(int)
+        """
+        from_stamp = date_to_stamp(from_date.replace(hour=0, minute=0, second=0, microsecond=0))
+        to_stamp = date_to_stamp(to_date.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1))
+        na_stamp = date_to_stamp(na_date)
+        done, flags = self.done, self.flags
+        positions = []
+        for pos in xrange(len(flags)):
+            if not flags[pos]:
+                continue
+            stamp = done[pos]
+            if math.isnan(stamp):
+                stamp = na_stamp
+            if from_stamp <= stamp < to_stamp:
+                positions.append(pos)
+        return positions
+
+
+    def get_items(self, positions):
+        """reads the todo items at the given positions from :attr:`filename`
+
+        :param positions: the positions of the items
+        :type positions: iterable(int)
+        :returns: the todo items
+        :rtype: list(:class:`TodoItem`)
+        """
+        with open_reader(self.filename) as reader:
+            texts = reader.get_texts_at([int(self.offsets[pos]) for pos in positions])
+        return [TodoItem(text) for text in texts]
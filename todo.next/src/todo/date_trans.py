@@ -11,7 +11,7 @@ from __future__ import print_function
 
 from config import ConfigBorg
 
-import datetime, re, calendar
+import datetime, re, calendar, collections
 
 # if dateutil is installed, this makes everything a lot easier
 USE_DATEUTIL = False
@@ -29,6 +29,68 @@ re_rel_date = re.compile("^([+-pm]?)(\d{1,2}y)?(\d{1,2}m)?(\d{1,2}w)?(\d{1,3}d)?
 
 conf = ConfigBorg()
 
+# maximal number of memoized absolute date strings
+DATE_MEMO_SIZE = 4096
+
+
+class LRUMemo(object):
+    """memo with a bounded number of entries, the least recently used entries are dropped first
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        # the configuration the memoized values depend on
+        self.tag = None
+    
+    def get(self, key):
+        value = self.entries.pop(key, None)
+        if value is not None:
+            self.entries[key] = value
+        return value
+    
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last = False)
+    
+    def validate(self, tag):
+        """drops all entries if the configuration the values depend on has changed
+        """
+        if tag != self.tag:
+            self.entries.clear()
+            self.tag = list(tag)
+
+# absolute date strings that have been parsed already
+absolute_dates = LRUMemo(DATE_MEMO_SIZE)
+
+
+def parse_canonical_date(date_string):
+    """parses dates in the canonical forms written by :func:`from_date`, i.e.
+    ``%Y-%m-%d`` and ``%Y-%m-%d_%H:%M``
+    
+    :param date_string: the normalized date string
+    :type date_string: str
+    :return: the date, or ``None`` if the string is not in canonical form
+    :rtype: :class:`datetime.datetime`
+    """
+    length = len(date_string)
+    if length == 10:
+        digits = date_string[0:4] + date_string[5:7] + date_string[8:10]
+    elif length == 16 and date_string[10] == "_" and date_string[13] == ":":
+        digits = date_string[0:4] + date_string[5:7] + date_string[8:10] + date_string[11:13] + date_string[14:16]
+    else:
+        return None
+    if date_string[4] != "-" or date_string[7] != "-" or not digits.isdigit():
+        return None
+    try:
+        if length == 10:
+            return datetime.datetime(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]))
+        return datetime.datetime(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]), int(digits[8:10]), int(digits[10:12]))
+    except ValueError:
+        # e.g. month 13
+        return None
+
+
 def add_years(date, nr_of_years):
     """adds years to the given date
     
@@ -170,12 +232,25 @@ def to_date(date_string, reference_date = None, prospective = False):
     """
     if not date_string:
         return None
+    # normalize date string
+    date_string = date_string.strip().lower()
+    
+    # absolute dates do not depend on the reference date and are memoized
+    absolute_dates.validate(getattr(conf, "date_formats", ()))
+    result = absolute_dates.get(date_string)
+    if result is not None:
+        return result
+    # fast path for the canonical forms, which are most of the dates in a todo file
+    result = parse_canonical_date(date_string)
+    if result is not None:
+        absolute_dates.put(date_string, result)
+        return result
+    
+    # relative dates and dates with missing parts depend on the reference date and are not memoized
     now = datetime.datetime.now().replace(second=0, microsecond=0)
     if not reference_date:
         # reference date is today (without hours / min)
         reference_date = datetime.datetime.today()
-    # normalize date string
-    date_string = date_string.strip().lower()
     date_part = time_part = None
     parts = date_string.split("_", 1)
     if len(parts) == 1:
@@ -234,6 +309,7 @@ def to_date(date_string, reference_date = None, prospective = False):
         return spec_date
     
     # clean underscores
+    original_string = date_string
     if "_" in date_string:
         date_string = date_string.replace("_", " ")
 
@@ -247,6 +323,8 @@ def to_date(date_string, reference_date = None, prospective = False):
                 if pdate.year == 1900:
                     # no year given, the default year is taken
                     pdate = reference_date.replace(month=pdate.month, day=pdate.day, hour=pdate.hour, minute=pdate.minute) 
+                else:
+                    absolute_dates.put(original_string, pdate)
                 return pdate
             except ValueError:
                 pass
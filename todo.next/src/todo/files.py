@@ -0,0 +1,107 @@
+"""
+:mod:`files`
+~~~~~~~~~~~~
+
+Provides helpers for writing the todo file and the files next to it.
+
+Archive files can be compressed with gzip (see :func:`compress_file`), the compressed
+file is named like the archive file with :data:`COMPRESSED_SUFFIX` appended.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+import gzip, os, shutil, tempfile
+
+# suffix of compressed archive files
+COMPRESSED_SUFFIX = ".gz"
+# size of the blocks in which files are compressed and decompressed
+CHUNK_SIZE = 1 << 16
+
+
+def write_atomically(filename, content, sync = True):
+    """replaces the content of a file, so that readers never see a partially written file
+
+    The content is written to a temporary file in the same directory, which then replaces 
+    the file. The permissions of an existing file are kept.
+
+    :param filename: the name of the file
+    :type filename: str
+    :param content: the new content
+    :type content: str
+    :param sync: whether the content is flushed to disk before the file is replaced
+    :type sync: bool
+    """
+    fd, tmp_filename = tempfile.mkstemp(".tmp", "todonext.", os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(content)
+            if sync:
+                fp.flush()
+                os.fsync(fp.fileno())
+        if os.path.exists(filename):
+            shutil.copymode(filename, tmp_filename)
+            if os.name == "nt":
+                os.remove(filename)
+        os.rename(tmp_filename, filename)
+    except:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+def get_file_stamp(filename):
+    """returns size and modification time of a file, which change whenever the file is written
+
+    :param filename: the name of the file
+    :type filename: str
+    :returns: the stamp, ``None`` if the file does not exist
+    :rtype: list
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime]
+
+
+def is_compressed(filename):
+    """returns whether a file is compressed, judging by its name
+
+    :param filename: the name of the file
+    :type filename: str
+    :rtype: bool
+    """
+    return filename.endswith(COMPRESSED_SUFFIX)
+
+
+def compress_file(filename, compressed_filename):
+    """appends the content of a file to a gzip compressed file as a new gzip member
+
+    The file is compressed block by block, its content is never held in memory as a whole.
+    A compressed file consisting of several members is a valid gzip file, already compressed
+    content is not rewritten. A line break is added if the file does not end with one.
+
+    :param filename: the name of the uncompressed file
+    :type filename: str
+    :param compressed_filename: the name of the compressed file, which is created if it 
+        does not exist
+    :type compressed_filename: str
+    """
+    with open(filename, "rb") as src:
+        with open(compressed_filename, "ab") as fp:
+            # the position of a file opened for appending is undefined before writing
+            size = os.path.getsize(compressed_filename)
+            try:
+                with gzip.GzipFile(os.path.basename(filename), "wb", fileobj = fp) as dst:
+                    last = ""
+                    for data in iter(lambda: src.read(CHUNK_SIZE), ""):
+                        dst.write(data)
+                        last = data
+                    if last and not last.endswith("\n"):
+                        dst.write("\n")
+                fp.flush()
+                os.fsync(fp.fileno())
+            except:
+                # a partially written member would make the whole file unreadable
+                fp.truncate(size)
+                raise
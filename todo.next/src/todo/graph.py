@@ -0,0 +1,169 @@
+"""
+:mod:`graph`
+~~~~~~~~~~~~
+
+Provides a view of the ``blockedby`` dependencies of a :class:`TodoList` as a graph.
+
+The edges are taken from :attr:`TodoList.dependencies` and :attr:`TodoList.blocking`,
+which are kept up to date while the list changes. The graph itself does not store
+anything, so it never has to be rebuilt.
+
+There is no stored set of ready items either: :meth:`DependencyGraph.ready_items` checks
+every item of the list on each call, which costs a pass over the list like listing it,
+while only the blockers of blocked items are looked up. Keeping a ready set would require
+updating it on every change of an item's state (done, reopened, removed, replaced).
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+import heapq
+
+
+class DependencyGraph(object):
+    """dependency graph of the open items of a todo list
+
+    An edge leads from a blocking item to the items it blocks. Only open items that
+    have a tid take part in the graph.
+    """
+
+    def __init__(self, todolist):
+        """constructor
+
+        :param todolist: the todo list
+        :type todolist: :class:`TodoList`
+        """
+        self.todolist = todolist
+
+
+    def _is_open(self, tid):
+        item = self.todolist.tids.get(tid, None)
+        return item is not None and not (item.done or item.is_report)
+
+
+    def blockers(self, tid):
+        """returns the tids of the open items blocking an item
+
+        :param tid: the tid of the blocked item
+        :type tid: str
+        :returns: the tids of the blocking items
+        :rtype: list(str)
+        """
+        return [blocker for blocker in self.todolist.dependencies.get(tid, ()) if self._is_open(blocker)]
+
+
+    def blocked(self, tid):
+        """returns the tids of the open items blocked by an item
+
+        :param tid: the tid of the blocking item
+        :type tid: str
+        :returns: the tids of the blocked items
+        :rtype: list(str)
+        """
+        return [blocked for blocked in self.todolist.blocking.get(tid, ()) if self._is_open(blocked)]
+
+
+    def is_ready(self, item):
+        """returns whether an item is open and not blocked by any open item
+
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        :rtype: bool
+        """
+        if item.done or item.is_report:
+            return False
+        if not item.tid or item.tid not in self.todolist.dependencies:
+            return True
+        return not self.blockers(item.tid)
+
+
+    def ready_items(self):
+        """returns all open items that are not blocked, in the order of the todo list
+
+        All items are checked on each call (see the module description).
+
+        :returns: the unblocked open items
+        :rtype: generator
+        """
+        return self.todolist.list_items(self.is_ready)
+
+
+    def find_cycle(self, blocker_tid, blocked_tid):
+        """checks whether blocking an item would create a cycle
+
+        This is the case if the blocking item already depends (directly or indirectly) on
+        the item it should block. Only the items depending on ``blocked_tid`` are visited.
+
+        :param blocker_tid: the tid of the item that should block
+        :type blocker_tid: str
+        :param blocked_tid: the tid of the item that should be blocked
+        :type blocked_tid: str
+        :returns: the tids on the cycle, beginning and ending with ``blocker_tid``, or
+            ``None`` if no cycle would be created
+        :rtype: list(str)
+        """
+        if blocker_tid == blocked_tid:
+            return [blocker_tid, blocked_tid]
+        # depth first search from the blocked item along the blocking edges
+        parents = {blocked_tid: None}
+        stack = [blocked_tid]
+        while stack:
+            tid = stack.pop()
+            for next_tid in self.blocked(tid):
+                if next_tid in parents:
+                    continue
+                parents[next_tid] = tid
+                if next_tid == blocker_tid:
+                    path = [blocker_tid]
+                    while tid is not None:
+                        path.append(tid)
+                        tid = parents[tid]
+                    path.reverse()
+                    return [blocker_tid] + path
+                stack.append(next_tid)
+        return None
+
+
+    def topological_order(self):
+        """sorts all items that take part in dependencies, blocking items first
+
+        Items without an order among each other are sorted like the todo list. Items on a
+        cycle cannot be ordered and are returned separately.
+
+        :returns: the ordered tids and the tids of the items on (or behind) a cycle
+        :rtype: tuple(list(str), list(str))
+        """
+        tids = set(tid for tid in self.todolist.dependencies if self._is_open(tid))
+        tids.update(tid for tid in self.todolist.blocking if self._is_open(tid))
+        in_degree = dict((tid, len(self.blockers(tid))) for tid in tids)
+        sort_key = lambda tid: (self.todolist.tids[tid].get_sort_key(), tid)
+        heap = [sort_key(tid) for tid, degree in in_degree.iteritems() if degree == 0]
+        heapq.heapify(heap)
+        order = []
+        while heap:
+            _, tid = heapq.heappop(heap)
+            order.append(tid)
+            for blocked_tid in self.blocked(tid):
+                in_degree[blocked_tid] -= 1
+                if in_degree[blocked_tid] == 0:
+                    heapq.heappush(heap, sort_key(blocked_tid))
+        cyclic = sorted((tid for tid, degree in in_degree.iteritems() if degree > 0), key = sort_key)
+        return order, cyclic
+
+
+    def critical_paths(self, order = None):
+        """returns the length of the longest chain of items that each item blocks
+
+        An item that does not block anything has a length of 1. Items on a cycle are
+        left out.
+
+        :param order: the topological order, as returned by :meth:`topological_order`
+        :type order: list(str)
+        :returns: the length per tid
+        :rtype: dict
+        """
+        if order is None:
+            order, _ = self.topological_order()
+        lengths = {}
+        for tid in reversed(order):
+            lengths[tid] = 1 + max([lengths.get(blocked_tid, 0) for blocked_tid in self.blocked(tid)] or [0])
+        return lengths
@@ -0,0 +1,269 @@
+"""
+:mod:`journal`
+~~~~~~~~~~~~~~
+
+Provides a write-ahead journal of the changes of a todo file.
+
+Instead of rewriting the whole todo file, a command appends the lines it has removed
+from and added to the todo list to the journal next to the todo file. A changed item
+is recorded as removal of its old line and addition of its new line. Removed lines
+are identified by their tid or, without tid, by their text. The journal is flushed to
+disk after each command, so that the time needed for a change does not depend on the
+size of the todo list.
+
+When a todo list is loaded, the journal is applied on top of the todo file. Once the
+journal contains more changes than its threshold, the todo list is written to the todo
+file and the journal is removed (compaction). The todo file stays a plain todo.txt file,
+it just lags behind until the next compaction.
+
+The journal is a UTF-8 text file::
+
+    @ <MD5 hash of the todo file the journal has been started on>
+    - <removed line>
+    + <added line>
+    .
+    = <MD5 hash of the compacted todo file>
+
+Every command ends with a ``.`` line, the changes of a command that has been interrupted
+while writing are ignored. Before the todo file is replaced by a compaction, its new hash
+is recorded, so that a journal left over by an interrupted compaction is not applied to
+the compacted file again.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from files import write_atomically
+
+import collections, hashlib, logging, os
+
+logger = logging.getLogger("todonext.journal")
+
+# file name of the journal, located next to the todo file
+JOURNAL_FILENAME = ".todonext.journal"
+# number of journaled changes after which the journal is compacted into the todo file
+DEFAULT_THRESHOLD = 100
+
+# operations
+ADD = "+"
+REMOVE = "-"
+# line markers
+HEADER = "@"
+COMMIT = "."
+COMPACTED = "="
+
+
+def split_lines(content):
+    """returns the non-empty lines of a todo file, as they are read into a todo list
+
+    :param content: the content of the todo file
+    :type content: str
+    :returns: the stripped lines
+    :rtype: list(str)
+    """
+    # splitlines breaks the lines like reading the file with codecs.open
+    return [line for line in (line.strip() for line in content.decode("utf-8").splitlines()) if line]
+
+
+def join_lines(lines):
+    """returns the content of a todo file with the given lines
+
+    :param lines: the lines
+    :type lines: list(str)
+    :returns: the UTF-8 encoded content
+    :rtype: str
+    """
+    return u"".join(u"{line}\n".format(line = line) for line in lines).encode("utf-8")
+
+
+def apply_ops(lines, ops):
+    """applies journaled changes to the lines of a todo file
+
+    Removed lines are taken from the lines, added lines are appended.
+
+    :param lines: the lines of the todo file
+    :type lines: list(str)
+    :param ops: the changes, tuples of operation and line
+    :type ops: list(tuple)
+    :returns: the changed lines
+    :rtype: list(str)
+    """
+    removed = collections.Counter()
+    added = []
+    for op, line in ops:
+        if op == ADD:
+            added.append(line)
+        elif line in added:
+            added.remove(line)
+        else:
+            removed[line] += 1
+    result = []
+    for line in lines:
+        if removed[line]:
+            removed[line] -= 1
+        else:
+            result.append(line)
+    result.extend(added)
+    return result
+
+
+class Journal(object):
+    """append-only journal of the changes of a todo file
+    """
+
+    def __init__(self, filename, todofile, threshold = DEFAULT_THRESHOLD):
+        """constructor
+
+        :param filename: the name of the journal file
+        :type filename: str
+        :param todofile: the name of the todo file, other todo lists (e.g. archive files)
+            are not journaled
+        :type todofile: str
+        :param threshold: the number of journaled changes after which the journal is
+            compacted into the todo file
+        :type threshold: int
+        """
+        self.filename = filename
+        self.todofile = todofile
+        self.threshold = threshold
+
+
+    def get_size(self):
+        """returns the size of the journal file, which grows with every command
+
+        :returns: the size in bytes, 0 if there is no journal
+        :rtype: int
+        """
+        try:
+            return os.path.getsize(self.filename)
+        except OSError:
+            return 0
+
+
+    def _read_data(self):
+        try:
+            with open(self.filename, "rb") as fp:
+                return fp.read()
+        except IOError:
+            return ""
+
+
+    def read(self, content_hash):
+        """reads the changes of all completely journaled commands
+
+        :param content_hash: the MD5 hash of the todo file content
+        :type content_hash: str
+        :returns: the changes as tuples of operation and line, and the size of the journal
+            file as read
+        :rtype: tuple(list(tuple), int)
+        """
+        data = self._read_data()
+        if not data:
+            return [], 0
+        lines = data.decode("utf-8", "replace").split(u"\n")
+        if not lines[0].startswith(HEADER + " "):
+            logger.warning(u"Journal {fn} is invalid and has been ignored".format(fn = self.filename))
+            return [], len(data)
+        ops, pending = [], []
+        # the last element is the unterminated rest after the last line break
+        for line in lines[1:-1]:
+            if line == COMMIT:
+                ops.extend(pending)
+                pending = []
+            elif line.startswith(COMPACTED + " "):
+                if line[2:] == content_hash:
+                    # the todo file has been compacted, but the journal has not been removed
+                    logger.info(u"Journal {fn} has already been compacted".format(fn = self.filename))
+                    return [], len(data)
+            elif line[:2] in (ADD + " ", REMOVE + " "):
+                pending.append((line[0], line[2:]))
+        if pending or lines[-1]:
+            logger.info(u"Journal {fn} ends with an incomplete command, which has been ignored".format(
+                fn = self.filename))
+        if ops and lines[0][2:] != content_hash:
+            logger.warning(u"Todo file {fn} has been changed since the journal has been started, "
+                           u"the journal is applied anyway".format(fn = self.todofile))
+        return ops, len(data)
+
+
+    def count_changes(self):
+        """returns the number of completely journaled changes, without applying them
+
+        :returns: the number of changes, 0 if the journal has already been compacted
+        :rtype: int
+        """
+        count = pending = 0
+        for line in self._read_data().split("\n")[1:]:
+            if line == COMMIT:
+                count += pending
+                pending = 0
+            elif line.startswith(COMPACTED + " "):
+                return 0
+            elif line[:2] in (ADD + " ", REMOVE + " "):
+                pending += 1
+        return count
+
+
+    def is_full(self):
+        """returns whether the next change exceeds the threshold, so that the journal has
+        to be compacted into the todo file
+
+        :rtype: bool
+        """
+        return self.get_size() > 0 and self.count_changes() >= self.threshold
+
+
+    def append(self, ops):
+        """appends the changes of a command and flushes them to disk
+
+        A new journal is started if there is none or if it has already been compacted
+        into the todo file. An incomplete command at the end of the journal is removed.
+
+        :param ops: the changes, tuples of operation and line
+        :type ops: list(tuple)
+        :returns: the number of bytes written
+        :rtype: int
+        """
+        block = u"".join(u"{op} {line}\n".format(op = op, line = line) for op, line in ops)
+        block = (block + COMMIT + "\n").encode("utf-8")
+        data = self._read_data()
+        content_hash = None
+        compacted = [line[2:] for line in data.split("\n") if line.startswith(COMPACTED + " ")]
+        if compacted or not data.startswith(HEADER + " "):
+            with open(self.todofile, "rb") as fp:
+                content_hash = hashlib.md5(fp.read()).hexdigest()
+        if not data.startswith(HEADER + " ") or content_hash in compacted:
+            data = "{header} {hash}\n".format(header = HEADER, hash = content_hash) + block
+            write_atomically(self.filename, data)
+            return len(data)
+        # keep the header and all completely journaled commands
+        end = data.rfind("\n" + COMMIT + "\n") + 3
+        if end < 3:
+            end = data.find("\n") + 1
+        with open(self.filename, "rb+") as fp:
+            fp.seek(end)
+            fp.truncate()
+            fp.write(block)
+            fp.flush()
+            os.fsync(fp.fileno())
+        return len(block)
+
+
+    def mark_compacted(self, content):
+        """records the hash of the compacted todo file before it is written
+
+        :param content: the content of the compacted todo file
+        :type content: str
+        """
+        if not self.get_size():
+            return
+        with open(self.filename, "ab") as fp:
+            fp.write("{marker} {hash}\n".format(marker = COMPACTED, hash = hashlib.md5(content).hexdigest()))
+            fp.flush()
+            os.fsync(fp.fileno())
+
+
+    def clear(self):
+        """removes the journal after it has been compacted into the todo file
+        """
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
@@ -0,0 +1,457 @@
+"""
+:mod:`linereader`
+~~~~~~~~~~~~~~~~~
+
+Provides read-only access to the lines of large todo and archive files.
+
+The file is memory mapped, so only the pages that are actually read are loaded, and a
+line is only decoded when it is needed. Scanning a file keeps no more than the current
+line in memory. The start offsets of the lines are collected on first positional access
+and can be stored in an index file, which is used as long as the file is not changed.
+
+Compressed archive files are read by :class:`CompressedLineReader`, which decompresses
+the file block by block while streaming its lines. :func:`open_reader` returns the right
+reader for a file.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from parse_cache import create_item
+from files import write_atomically, get_file_stamp, is_compressed, CHUNK_SIZE
+from config import ConfigBorg
+
+import array, bisect, mmap, re, struct, zlib
+
+conf = ConfigBorg()
+
+# header of an index file: magic, version, size of an offset, file size, file mtime, number of lines
+INDEX_HEADER = struct.Struct("<4sHHQdQ")
+INDEX_MAGIC = "TNLI"
+INDEX_VERSION = 1
+# window bits of zlib for decompressing gzip files
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def open_reader(filename):
+    """returns a reader of the lines of a plain or compressed file
+
+    :param filename: the name of the file
+    :type filename: str
+    :returns: the reader
+    :rtype: :class:`LineReader` or :class:`CompressedLineReader`
+    """
+    if is_compressed(filename):
+        return CompressedLineReader(filename)
+    return LineReader(filename)
+
+
+class LineReader(object):
+    """memory mapped reader of the lines of a file
+
+    Lines are separated by ``\\n``, leading and trailing whitespace (including ``\\r``) is
+    removed from the returned texts. Positions are given as byte offsets of the start of a
+    line, :meth:`line_nr_at` converts them to line numbers.
+    """
+
+    def __init__(self, filename, index_filename = None):
+        """constructor, maps the file
+
+        :param filename: the name of the file
+        :type filename: str
+        :param index_filename: the file in which the line offsets are stored, if given
+        :type index_filename: str
+        """
+        self.filename = filename
+        self.index_filename = index_filename
+        self.offsets = None
+        with open(filename, "rb") as fp:
+            try:
+                self.mm = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+            except ValueError:
+                # empty files cannot be mapped
+                self.mm = ""
+        self.size = len(self.mm)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb): #@UnusedVariable
+        self.close()
+        return False
+
+
+    def close(self):
+        """unmaps the file
+        """
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.mm = ""
+
+
+    def __len__(self):
+        return len(self.get_offsets())
+
+
+    def _get_text(self, start, end = None):
+        if end is None:
+            end = self.mm.find("\n", start)
+            if end == -1:
+                end = self.size
+        return self.mm[start:end].decode("utf-8").strip()
+
+
+    def get_offsets(self):
+        """returns the start offsets of all lines, reading or creating the index if necessary
+
+        :returns: the offsets
+        :rtype: :class:`array.array`
+        """
+        if self.offsets is None:
+            if self.index_filename:
+                self.offsets = self.load_index()
+            if self.offsets is None:
+                self.offsets = self._build_offsets()
+                if self.index_filename:
+                    self.save_index()
+        return self.offsets
+
+
+    def _build_offsets(self):
+        offsets = array.array("L")
+        find, size, pos = self.mm.find, self.size, 0
+        while pos < size:
+            offsets.append(pos)
+            pos = find("\n", pos) + 1
+            if not pos:
+                break
+        return offsets
+
+
+    def load_index(self):
+        """reads the line offsets from the index file, if it belongs to the current file
+
+        :returns: the offsets or ``None``
+        :rtype: :class:`array.array`
+        """
+        try:
+            with open(self.index_filename, "rb") as fp:
+                header = fp.read(INDEX_HEADER.size)
+                if len(header) != INDEX_HEADER.size:
+                    return None
+                magic, version, itemsize, size, mtime, count = INDEX_HEADER.unpack(header)
+                offsets = array.array("L")
+                if (magic, version, itemsize) != (INDEX_MAGIC, INDEX_VERSION, offsets.itemsize):
+                    return None
+                if [size, mtime] != get_file_stamp(self.filename) or size != self.size:
+                    return None
+                offsets.fromfile(fp, count)
+        except (IOError, EOFError):
+            return None
+        return offsets
+
+
+    def save_index(self):
+        """writes the line offsets to the index file
+        """
+        offsets = self.get_offsets()
+        size, mtime = get_file_stamp(self.filename)
+        header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, offsets.itemsize, size, mtime, len(offsets))
+        write_atomically(self.index_filename, header + offsets.tostring(), sync = False)
+
+
+    def get_line(self, line_nr):
+        """returns the text of a line
+
+        :param line_nr: the number of the line, starting with 0
+        :type line_nr: int
+        :returns: the stripped text
+        :rtype: str
+        :raises IndexError: if the file has less lines
+        """
+        offsets = self.get_offsets()
+        end = offsets[line_nr + 1] if line_nr + 1 < len(offsets) else self.size
+        return self._get_text(offsets[line_nr], end)
+
+
+    def get_text_at(self, offset):
+        """returns the text of the line beginning at a byte offset
+
+        :param offset: the offset
+        :type offset: int
+        :returns: the stripped text
+        :rtype: str
+        """
+        return self._get_text(offset)
+
+
+    def get_texts_at(self, offsets):
+        """returns the texts of the lines beginning at byte offsets
+
+        :param offsets: the offsets
+        :type offsets: list(int)
+        :returns: the stripped texts, in the order of the offsets
+        :rtype: list(str)
+        """
+        return [self._get_text(offset) for offset in offsets]
+
+
+    def get_item(self, line_nr):
+        """returns the todo item in a line
+
+        :param line_nr: the number of the line, starting with 0
+        :type line_nr: int
+        :returns: the todo item or ``None`` for an empty line
+        :rtype: :class:`TodoItem`
+        """
+        text = self.get_line(line_nr)
+        if not text:
+            return None
+        item = create_item(text)
+        item.line_nr = line_nr
+        return item
+
+
+    def line_nr_at(self, offset):
+        """returns the number of the line containing a byte offset
+
+        :param offset: the offset
+        :type offset: int
+        :returns: the line number
+        :rtype: int
+        """
+        return bisect.bisect_right(self.get_offsets(), offset) - 1
+
+
+    def iter_lines(self, start = 0):
+        """returns the non-empty lines of the file
+
+        :param start: the offset of the first line to return, e.g. the former size of a file
+            that has been appended to
+        :type start: int
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        find, size, pos = self.mm.find, self.size, start
+        while pos < size:
+            end = find("\n", pos)
+            if end == -1:
+                end = size
+            text = self._get_text(pos, end)
+            if text:
+                yield pos, text
+            pos = end + 1
+
+
+    def iter_lines_reversed(self):
+        """returns the non-empty lines of the file, beginning with the last line
+
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        rfind, end = self.mm.rfind, self.size
+        while end > 0:
+            start = rfind("\n", 0, end) + 1
+            text = self._get_text(start, end)
+            if text:
+                yield start, text
+            end = start - 1
+
+
+    def find(self, needle):
+        """returns the lines containing a byte string, without decoding the other lines
+
+        :param needle: the byte string, e.g. an UTF-8 encoded search string
+        :type needle: str
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        mm, size = self.mm, self.size
+        pos = mm.find(needle) if needle else -1
+        while pos != -1:
+            start = mm.rfind("\n", 0, pos) + 1
+            end = mm.find("\n", pos)
+            if end == -1:
+                end = size
+            yield start, self._get_text(start, end)
+            pos = mm.find(needle, end)
+
+
+    def search(self, re_search):
+        """returns the lines matching a regular expression
+
+        :param re_search: the compiled regular expression
+        :type re_search: :class:`re.RegexObject`
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        for offset, text in self.iter_lines():
+            if re_search.search(text):
+                yield offset, text
+
+
+    def find_tid(self, tid):
+        """returns the offset of the line of the item with a tid
+
+        :param tid: the tid
+        :type tid: str
+        :returns: the offset or ``None``
+        :rtype: int
+        """
+        prop = u"{id}:{tid}".format(id = conf.ID, tid = tid)
+        re_tid = re.compile(u"(?:^|\s){prop}(?:\s|$)".format(prop = re.escape(prop)), re.UNICODE)
+        for offset, text in self.find(prop.encode("utf-8")):
+            if re_tid.search(text):
+                return offset
+        return None
+
+
+class CompressedLineReader(object):
+    """streaming reader of the lines of a gzip compressed file
+
+    The file is decompressed block by block while its lines are read, it is never held in
+    memory as a whole. The file may consist of several gzip members (see
+    :func:`compress_file`). Positions are given as byte offsets of the start of a line in
+    the decompressed content, accessing lines by their offsets decompresses the file up to
+    the last requested line. The lines are stripped like by :class:`LineReader`.
+    """
+
+    def __init__(self, filename):
+        """constructor, opens the file
+
+        :param filename: the name of the file
+        :type filename: str
+        """
+        self.filename = filename
+        self.fp = open(filename, "rb")
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb): #@UnusedVariable
+        self.close()
+        return False
+
+
+    def close(self):
+        """closes the file
+        """
+        self.fp.close()
+
+
+    def _iter_chunks(self):
+        self.fp.seek(0)
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        for data in iter(lambda: self.fp.read(CHUNK_SIZE), ""):
+            while data:
+                chunk = decompressor.decompress(data)
+                if chunk:
+                    yield chunk
+                data = decompressor.unused_data
+                if data:
+                    # the data following the end of a member starts the next member
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+        chunk = decompressor.flush()
+        if chunk:
+            yield chunk
+
+
+    def _iter_raw_lines(self, start = 0):
+        """returns the undecoded lines of the file
+
+        :param start: the offset of the first line to return
+        :type start: int
+        :returns: pairs of offset and line without line break
+        :rtype: generator
+        """
+        offset, rest = 0, ""
+        for chunk in self._iter_chunks():
+            data = rest + chunk
+            find, pos = data.find, 0
+            end = find("\n")
+            while end != -1:
+                if offset + pos >= start:
+                    yield offset + pos, data[pos:end]
+                pos = end + 1
+                end = find("\n", pos)
+            offset += pos
+            rest = data[pos:]
+        if rest and offset >= start:
+            yield offset, rest
+
+
+    def iter_lines(self, start = 0):
+        """returns the non-empty lines of the file
+
+        :param start: the offset of the first line to return
+        :type start: int
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        for offset, line in self._iter_raw_lines(start):
+            text = line.decode("utf-8").strip()
+            if text:
+                yield offset, text
+
+
+    def get_texts_at(self, offsets):
+        """returns the texts of the lines beginning at byte offsets, decompressing the file
+        once up to the last offset
+
+        :param offsets: the offsets
+        :type offsets: list(int)
+        :returns: the stripped texts, in the order of the offsets
+        :rtype: list(str)
+        """
+        if not offsets:
+            return []
+        wanted, last = set(offsets), max(offsets)
+        texts = {}
+        for offset, line in self._iter_raw_lines(min(offsets)):
+            if offset in wanted:
+                texts[offset] = line.decode("utf-8").strip()
+            if offset >= last:
+                break
+        return [texts.get(offset, u"") for offset in offsets]
+
+
+    def get_text_at(self, offset):
+        """returns the text of the line beginning at a byte offset
+
+        :param offset: the offset
+        :type offset: int
+        :returns: the stripped text
+        :rtype: str
+        """
+        return self.get_texts_at([offset])[0]
+
+
+    def find(self, needle):
+        """returns the lines containing a byte string, without decoding the other lines
+
+        :param needle: the byte string, e.g. an UTF-8 encoded search string
+        :type needle: str
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        if not needle:
+            return
+        for offset, line in self._iter_raw_lines():
+            if needle in line:
+                yield offset, line.decode("utf-8").strip()
+
+
+    def search(self, re_search):
+        """returns the lines matching a regular expression
+
+        :param re_search: the compiled regular expression
+        :type re_search: :class:`re.RegexObject`
+        :returns: pairs of offset and stripped text
+        :rtype: generator
+        """
+        for offset, text in self.iter_lines():
+            if re_search.search(text):
+                yield offset, text
@@ -0,0 +1,156 @@
+"""
+:mod:`locking`
+~~~~~~~~~~~~~~
+
+Provides an advisory lock for the todo file, so that concurrent invocations of todo.next
+do not overwrite each other's changes.
+
+The lock is taken on a separate lock file next to the todo file, because the todo file
+itself is replaced whenever it is written. With ``fcntl`` (Linux, Mac OS) the lock is
+released by the operating system if the process ends, on Windows ``msvcrt`` is used.
+
+There are two modes:
+
+- ``lock``: the lock is held from reading the todo file until it has been written.
+- ``optimistic``: the lock is only held while writing. If the todo file has been
+  changed since it has been read, the changes are replayed onto the current file
+  (see :meth:`TodoList.write`).
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from timing import measure
+
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# file name of the lock file, located next to the todo file
+LOCK_FILENAME = ".todonext.lock"
+# available modes, "none" disables locking
+LOCK_MODES = ("none", "lock", "optimistic")
+# seconds after which waiting for the lock is given up
+DEFAULT_TIMEOUT = 30.0
+# seconds between two attempts to get the lock
+POLL_INTERVAL = 0.05
+
+
+def _try_lock(fp):
+    """tries to lock an open file exclusively without waiting
+
+    :returns: whether the lock has been acquired
+    :rtype: bool
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fp.seek(0)
+            msvcrt.locking(fp.fileno(), msvcrt.LK_NBLCK, 1)
+    except IOError:
+        return False
+    return True
+
+
+def _unlock(fp):
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+    else:
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock(object):
+    """exclusive advisory lock of a todo file
+
+    The lock is reentrant: it is released when :meth:`release` has been called as often
+    as :meth:`acquire`. It can be used as context manager.
+    """
+
+    def __init__(self, filename, todofile, optimistic = False, timeout = DEFAULT_TIMEOUT):
+        """constructor
+
+        :param filename: the name of the lock file
+        :type filename: str
+        :param todofile: the name of the locked todo file
+        :type todofile: str
+        :param optimistic: whether the lock is only taken for writing
+        :type optimistic: bool
+        :param timeout: seconds after which waiting for the lock is given up
+        :type timeout: float
+        """
+        self.filename = filename
+        self.todofile = todofile
+        self.optimistic = optimistic
+        self.timeout = timeout
+        # total seconds spent waiting for the lock
+        self.wait_time = 0.0
+        self._fp = None
+        self._depth = 0
+
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb): #@UnusedVariable
+        self.release()
+        return False
+
+
+    @property
+    def locked(self):
+        return self._depth > 0
+
+
+    def acquire(self):
+        """takes the lock, waiting until other processes have released it
+
+        :raises IOError: if the lock could not be taken within :attr:`timeout` seconds
+        """
+        if self._depth:
+            self._depth += 1
+            return
+        if fcntl is None and msvcrt is None:
+            # no locking available on this platform
+            self._depth = 1
+            return
+        fp = open(self.filename, "a+")
+        start = time.time()
+        try:
+            with measure("lock wait"):
+                while not _try_lock(fp):
+                    if time.time() - start > self.timeout:
+                        raise IOError(u"Could not lock {fn} within {timeout} s".format(fn = self.todofile,
+                                                                                       timeout = self.timeout))
+                    time.sleep(POLL_INTERVAL)
+        except:
+            fp.close()
+            raise
+        finally:
+            self.wait_time += time.time() - start
+        self._fp = fp
+        self._depth = 1
+
+
+    def release(self):
+        """releases the lock
+        """
+        if not self._depth:
+            return
+        self._depth -= 1
+        if self._depth or self._fp is None:
+            return
+        try:
+            _unlock(self._fp)
+        finally:
+            self._fp.close()
+            self._fp = None
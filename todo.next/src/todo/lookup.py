@@ -0,0 +1,111 @@
+"""
+:mod:`lookup`
+~~~~~~~~~~~~~
+
+Provides reading single items of a todo file by their tid, without loading the todo list.
+
+The line of an item is found by searching the memory mapped file for its tid, only this
+line is parsed. Its line number is taken from the line-offset index of the file (see
+:class:`LineReader`), which is stored next to the todo file and reused while the file is
+unchanged. Journaled changes of the item (see :class:`Journal`) are applied on top of the
+file.
+
+Items found this way are neither sorted into the list nor cleaned of dependencies on done
+items, so only commands that read a single item use them.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from linereader import LineReader
+from parse_cache import create_item
+from journal import ADD
+from config import ConfigBorg
+
+import hashlib, logging, re
+
+conf = ConfigBorg()
+logger = logging.getLogger("todonext.lookup")
+
+# file name of the line-offset index, located next to the todo file
+LINE_INDEX_FILENAME = ".todonext.lines"
+
+# regex for index numbers, which are positions in the sorted list
+re_index_nr = re.compile(r"-?\d+$")
+
+
+def is_tid_lookup(item_ids):
+    """returns whether items can be looked up without loading the todo list, which is the
+    case if all of them are addressed by tid
+
+    :param item_ids: the index numbers or tids of the items
+    :type item_ids: list(str)
+    :rtype: bool
+    """
+    return conf.id_support and bool(item_ids) and not any(re_index_nr.match(item_id) for item_id in item_ids)
+
+
+class TodoLookup(object):
+    """replacement of a :class:`TodoList` for commands that only read items by their tids
+    """
+
+    def __init__(self, todofile, index_filename = None):
+        """constructor
+
+        :param todofile: the filename of the ``todo.next`` file
+        :type todofile: str
+        :param index_filename: the file in which the line offsets are stored, if given
+        :type index_filename: str
+        """
+        self.todofile = todofile
+        self.index_filename = index_filename
+        self.dirty = False
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb): #@UnusedVariable
+        return False
+
+
+    def _get_journaled_line(self, reader, tid):
+        """returns the line of an item as changed by the journal
+
+        :param reader: the reader of the todo file
+        :type reader: :class:`LineReader`
+        :param tid: the tid of the item
+        :type tid: str
+        :returns: the changed line, ``None`` for a removed item and ``False`` if the journal
+            does not change the item
+        :rtype: str
+        """
+        journal = getattr(conf, "journal", None)
+        if journal is None or journal.todofile != self.todofile or not journal.get_size():
+            return False
+        ops, _ = journal.read(hashlib.md5(reader.mm).hexdigest())
+        prop = u"{id}:{tid}".format(id = conf.ID, tid = tid)
+        line = False
+        for op, text in ops:
+            if prop in text.split():
+                line = text if op == ADD else None
+        return line
+
+
+    def get_item_by_index(self, tid):
+        """returns the todo item with a tid, like :meth:`TodoList.get_item_by_index`
+
+        :param tid: the tid of the requested item
+        :type tid: str
+        :returns: the requested todo item (if existing)
+        :rtype: :class:`TodoItem`
+        """
+        with LineReader(self.todofile, self.index_filename) as reader:
+            line = self._get_journaled_line(reader, tid)
+            if line is not False:
+                return create_item(line) if line is not None else None
+            offset = reader.find_tid(tid)
+            if offset is None:
+                return None
+            logger.info(u"Found item {tid} at offset {offset}".format(tid = tid, offset = offset))
+            return reader.get_item(reader.line_nr_at(offset))
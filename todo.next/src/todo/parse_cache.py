@@ -0,0 +1,246 @@
+"""
+:mod:`parse_cache`
+~~~~~~~~~~~~~~~~~~
+
+Provides a persistent cache of parsed todo items.
+
+Most lines of the todo file do not change between two invocations. The cache maps a
+hash of the line to the parsed fields (including the resolved dates), so unchanged lines
+are not parsed again.
+
+Lines of the archive files are not cached: the archives soon outgrow the cache, so every
+report or search would evict and rewrite most entries, and loading the large cache would
+slow down the commands that only read the todo file. Reports and searches avoid parsing
+archive lines through the archive index, the rollups and the search index instead.
+
+Only lines that are not rewritten while loading are cached: relative or unparsable
+dates (e.g. ``due:tomorrow``) depend on the current date and are parsed every time.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from todoitem import TodoItem
+from parsers import intern_string
+from config import ConfigBorg
+from files import write_atomically
+
+import datetime, hashlib, json, logging, os
+
+conf = ConfigBorg()
+logger = logging.getLogger("todonext.parse_cache")
+
+# needs to be increased whenever the parsers or the item state change
+CACHE_VERSION = 3
+# file name of the cache, located next to the todo file
+CACHE_FILENAME = ".todonext.cache"
+# default maximal number of cached lines
+DEFAULT_SIZE = 100000
+
+
+def get_stamp():
+    """returns the version stamp of the cache
+
+    Cached entries are only valid for the same parser version and the same configuration
+    (date formats, special properties and prefixes).
+
+    :returns: the stamp
+    :rtype: str
+    """
+    parts = [str(CACHE_VERSION), conf.DONE_PREFIX, conf.REPORT_PREFIX]
+    parts.extend(getattr(conf, "date_formats", []))
+    parts.extend(conf.DATE_PROPS)
+    parts.extend(conf.MULTI_PROPS)
+    return hashlib.md5(u"|".join(parts).encode("utf-8")).hexdigest()
+
+
+def line_hash(line):
+    """returns the key of a line in the cache
+
+    :param line: the line
+    :type line: str
+    :returns: the hash of the line
+    :rtype: str
+    """
+    return hashlib.md5(line.encode("utf-8")).hexdigest()
+
+
+def encode_state(state):
+    """converts an item state (see :meth:`TodoItem.get_state`) to JSON compatible values
+
+    :param state: the item state
+    :type state: tuple
+    :returns: the encoded state
+    :rtype: list
+    """
+    properties = []
+    for prop_name, prop_value in state[9].iteritems():
+        if isinstance(prop_value, datetime.datetime):
+            prop_value = [prop_value.year, prop_value.month, prop_value.day, prop_value.hour,
+                          prop_value.minute, prop_value.second, prop_value.microsecond]
+        properties.append([prop_name, prop_value])
+    return list(state[:3]) + [list(field) for field in state[3:9]] + [properties]
+
+
+def decode_state(encoded):
+    """converts an encoded state back to an item state, creating new objects
+
+    :param encoded: the encoded state
+    :type encoded: list
+    :returns: the item state
+    :rtype: tuple
+    """
+    properties = {}
+    for prop_name, prop_value in encoded[9]:
+        if prop_name in conf.DATE_PROPS and isinstance(prop_value, list):
+            # unparsable dates are kept as strings
+            prop_value = datetime.datetime(*prop_value)
+        elif isinstance(prop_value, list):
+            prop_value = list(prop_value)
+        properties[intern_string(prop_name)] = prop_value
+    markers, urls, delegated_to, delegated_from, projects, contexts = encoded[3:9]
+    return (encoded[0], encoded[1], encoded[2], tuple(markers), tuple(urls), tuple(delegated_to),
+            tuple(delegated_from), tuple(intern_string(project) for project in projects),
+            tuple(intern_string(context) for context in contexts), properties)
+
+
+class ParseCache(object):
+    """persistent cache of parsed todo items
+
+    Every time the cache is written, the generation counter is increased. Each entry stores
+    the generation in which it has been used last, and if the cache grows beyond its maximal
+    size, the least recently used entries are evicted.
+    """
+
+    def __init__(self, filename, max_size = DEFAULT_SIZE):
+        """constructor, the cache file is read on first use
+
+        :param filename: the name of the cache file
+        :type filename: str
+        :param max_size: the maximal number of cached lines
+        :type max_size: int
+        """
+        self.filename = filename
+        self.max_size = max_size
+        self.stamp = get_stamp()
+        self._entries = None
+        self.generation = 0
+        self.dirty = False
+        self.hits = self.misses = 0
+
+
+    def get_entries(self):
+        if self._entries is None:
+            self.load()
+        return self._entries
+
+    # the cache file is only read when the first line is looked up
+    entries = property(fget = get_entries)
+
+
+    def load(self):
+        """reads the cache file, if it exists and has been written by the same parser version
+        """
+        self._entries = {}
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "rb") as fp:
+                data = json.load(fp)
+        except (IOError, ValueError), ex:
+            logger.warning(u"Could not read parse cache {fn}: {ex}".format(fn = self.filename, ex = ex))
+            return
+        if data.get("stamp") != self.stamp:
+            logger.info(u"Parse cache {fn} is outdated".format(fn = self.filename))
+            return
+        self.generation = data["generation"] + 1
+        self._entries = data["entries"]
+
+
+    def get(self, line):
+        """returns the cached state of a line
+
+        :param line: the line
+        :type line: str
+        :returns: the item state or ``None``
+        :rtype: tuple
+        """
+        entry = self.entries.get(line_hash(line), None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry[0] != self.generation:
+            # the recency of the entry is saved for the eviction
+            entry[0] = self.generation
+            self.dirty = True
+        return decode_state(entry[1])
+
+
+    def put(self, line, item):
+        """stores the state of an item that has been parsed from a line
+
+        :param line: the line
+        :type line: str
+        :param item: the todo item that has been parsed from ``line``
+        :type item: :class:`TodoItem`
+        """
+        entries = self.entries
+        entries[line_hash(line)] = [self.generation, encode_state(item.get_state())]
+        self.dirty = True
+
+
+    def create_item(self, line, lazy = False):
+        """creates a todo item from a line, taking the parsed fields from the cache if possible
+
+        Lines that are not rewritten while parsing are added to the cache.
+
+        :param line: the line
+        :type line: str
+        :param lazy: whether uncached items are parsed on first access
+        :type lazy: bool
+        :returns: the todo item
+        :rtype: :class:`TodoItem`
+        """
+        state = self.get(line)
+        if state is not None:
+            return TodoItem(line, state = state)
+        item = TodoItem(line, lazy)
+        if not lazy and item.text == line:
+            self.put(line, item)
+        return item
+
+
+    def save(self):
+        """writes the cache file, if entries have been added or used
+
+        If the maximal size is exceeded, the least recently used entries are evicted.
+        """
+        if not self.dirty:
+            return
+        if len(self.entries) > self.max_size:
+            keys = sorted(self.entries, key = lambda key: self.entries[key][0], reverse = True)
+            for key in keys[self.max_size:]:
+                del self.entries[key]
+        data = {"stamp": self.stamp, "generation": self.generation, "entries": self.entries}
+        try:
+            write_atomically(self.filename, json.dumps(data, separators = (",", ":")), sync = False)
+        except (IOError, OSError), ex:
+            logger.warning(u"Could not write parse cache {fn}: {ex}".format(fn = self.filename, ex = ex))
+            return
+        self.dirty = False
+
+
+def create_item(line, lazy = False):
+    """creates a todo item from a line, using the parse cache if it is enabled
+
+    :param line: the line
+    :type line: str
+    :param lazy: whether the item is parsed on first access
+    :type lazy: bool
+    :returns: the todo item
+    :rtype: :class:`TodoItem`
+    """
+    cache = getattr(conf, "parse_cache", None)
+    if cache is None:
+        return TodoItem(line, lazy)
+    return cache.create_item(line, lazy)
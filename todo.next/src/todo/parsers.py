@@ -12,6 +12,19 @@ import re
 
 conf = ConfigBorg()
 
+# shared instances of property names, projects and contexts
+interned_strings = {}
+
+def intern_string(string):
+    """returns a shared instance of an equal string, works for unicode strings as well
+    
+    :param string: the string
+    :type string: str
+    :returns: the shared string instance
+    :rtype: str
+    """
+    return interned_strings.setdefault(string, string)
+
 re_prio = re.compile(r"^\(([A-Z])\)", re.UNICODE)
 re_marker = re.compile(r"\(([^A-Z0-9])\)", re.UNICODE)
 re_context = re.compile(r"(?:^|\s)(@.+?)(?=$|\s)", re.UNICODE)
@@ -21,6 +34,17 @@ re_urls = re.compile(r"(?:^|\s)((?:(?:ht|f)tp[s]?):.+?)(?=$|\s)")
 # key:value pairs with exception of URLs
 re_properties = re.compile(r"(\w+?):((?!\s|//).+?)(?=$|\s)", re.UNICODE)
 
+# whitespace (and line breaks) on which :meth:`unicode.split` and the regular expressions above 
+# disagree - items containing such characters are parsed with the regular expressions
+re_irregular_space = re.compile(r"[^\S \t\x0b\x0c\r]", re.UNICODE)
+# trailing word characters, i.e. the key of a key:value pair in front of the colon
+re_prop_key = re.compile(r"\w+$", re.UNICODE)
+
+# URL schemes recognized by :data:`re_urls`
+URL_PREFIXES = (u"http:", u"https:", u"ftp:", u"ftps:")
+# tokens that make the regular expressions match beyond the token boundary
+AMBIGUOUS_TOKENS = frozenset((u"@", u"+") + URL_PREFIXES)
+
 def parse_prio(item):
     match = re_prio.match(item.text)
     if match:
@@ -28,32 +52,35 @@ def parse_prio(item):
     return item
 
 def parse_markers(item):
-    item.markers = re_marker.findall(item.text)
+    item.markers = tuple(re_marker.findall(item.text))
     return item
 
 def parse_urls(item):
-    item.urls.extend(re_urls.findall(item.text))
+    item.urls += tuple(re_urls.findall(item.text))
     return item
 
 def parse_delegates(item):
     field = re_delegates.findall(item.text)
     if len(field) > 0:
+        delegated_to, delegated_from = [], []
         for mode, deleg in field:
             if mode == ">>":
-                item.delegated_to.append(deleg)
+                delegated_to.append(deleg)
             elif mode == "<<":
-                item.delegated_from.append(deleg)
+                delegated_from.append(deleg)
             else:
                 # some error
                 raise Exception("Parsing failed.")
+        item.delegated_to += tuple(delegated_to)
+        item.delegated_from += tuple(delegated_from)
     return item
 
 def parse_project(item):
-    item.projects.extend(re_project.findall(item.text))
+    item.projects += tuple(intern_string(project) for project in re_project.findall(item.text))
     return item
     
 def parse_context(item):
-    item.contexts.extend(re_context.findall(item.text))
+    item.contexts += tuple(intern_string(context) for context in re_context.findall(item.text))
     return item
     
 def parse_done(item):
@@ -62,7 +89,7 @@ def parse_done(item):
 
 def parse_properties(item):
     for match in re_properties.findall(item.text):
-        prop_name = match[0].lower()
+        prop_name = intern_string(match[0].lower())
         if prop_name in conf.MULTI_PROPS:
             # some properties may have multiple occurrences
             if not prop_name in item.properties:
@@ -74,4 +101,175 @@ def parse_properties(item):
 
 def parse_report(item):
     item.is_report = item.text.startswith(conf.REPORT_PREFIX) 
-    return item
\ No newline at end of file
+    return item
+
+# ordered registry of the single field parsers
+PARSERS = (parse_prio, parse_markers, parse_urls, parse_delegates, parse_project, 
+           parse_context, parse_done, parse_properties, parse_report)
+
+
+def parse_with_registry(item):
+    """parses an item by running each parser of :data:`PARSERS` over its text
+    
+    :param item: the todo item to be parsed
+    :type item: :class:`TodoItem`
+    :returns: the parsed todo item
+    :rtype: :class:`TodoItem`
+    """
+    for parser in PARSERS:
+        parser(item)
+    return item
+
+
+def find_markers(text):
+    """returns all markers like ``(!)`` in the text, equivalent to :data:`re_marker`
+    
+    :param text: the item text
+    :type text: str
+    :returns: list of marker characters
+    :rtype: list(str)
+    """
+    markers = []
+    pos = text.find(u"(")
+    while pos >= 0:
+        if text[pos+2:pos+3] == u")" and not (u"A" <= text[pos+1] <= u"Z" or u"0" <= text[pos+1] <= u"9"):
+            markers.append(text[pos+1])
+            pos = text.find(u"(", pos + 3)
+        else:
+            pos = text.find(u"(", pos + 1)
+    return markers
+
+
+def find_prio(text):
+    """returns the priority at the beginning of the text, equivalent to :data:`re_prio`
+    
+    :param text: the item text
+    :type text: str
+    :returns: the priority letter or ``None``
+    :rtype: str
+    """
+    if text[:1] == u"(" and text[2:3] == u")" and u"A" <= text[1] <= u"Z":
+        return text[1]
+    return None
+
+
+def token_property(token):
+    """returns the key:value pair contained in a single token, equivalent to :data:`re_properties`
+    
+    The key are the word characters in front of the first colon that is followed by a value.
+    
+    :param token: a whitespace-free part of the item text
+    :type token: str
+    :returns: tuple ``(prop_name, prop_value)`` with normalized name, or ``None``
+    :rtype: tuple(str, str)
+    """
+    colon = token.find(u":")
+    while colon >= 0:
+        value = token[colon+1:]
+        if value and not value.startswith(u"//"):
+            match = re_prop_key.search(token, 0, colon)
+            if match:
+                return intern_string(match.group().lower()), value
+        colon = token.find(u":", colon + 1)
+    return None
+
+
+def find_property_spans(text):
+    """returns the positions of all key:value pairs in the text, equivalent to :data:`re_properties`
+    
+    :param text: the item text
+    :type text: str
+    :returns: list of ``[prop_name, start, end]`` with normalized names, in order of occurrence
+    :rtype: list(list)
+    """
+    return [[intern_string(match.group(1).lower()), match.start(), match.end()] 
+            for match in re_properties.finditer(text)]
+
+
+# cache for the regular expressions finding tokens that may contain a certain property
+prop_token_regex_cache = {}
+
+def find_property(text, prop_name):
+    """returns all values of a single property without parsing the whole text
+    
+    :param text: the item text
+    :type text: str
+    :param prop_name: the normalized property name (e.g. "id")
+    :type prop_name: str
+    :returns: the property values in order of occurrence, or ``None`` if the text 
+        can only be parsed with the regular expressions
+    :rtype: list(str)
+    """
+    if re_irregular_space.search(text):
+        return None
+    if prop_name not in prop_token_regex_cache:
+        prop_token_regex_cache[prop_name] = re.compile(
+            r"\S*{prop_key}:\S*".format(prop_key = re.escape(prop_name)), re.IGNORECASE | re.UNICODE)
+    values = []
+    for match in prop_token_regex_cache[prop_name].finditer(text):
+        prop = token_property(match.group())
+        if prop and prop[0] == prop_name:
+            values.append(prop[1])
+    return values
+
+
+def parse(item):
+    """parses priority, markers, URLs, delegates, projects, contexts, properties and 
+    the done / report flags of an item in a single pass over its tokens
+    
+    The results are identical to those of :func:`parse_with_registry`, which is used 
+    as a fallback for the rare texts the token scan cannot handle exactly.
+    
+    :param item: the todo item to be parsed
+    :type item: :class:`TodoItem`
+    :returns: the parsed todo item
+    :rtype: :class:`TodoItem`
+    """
+    text = item.text
+    if re_irregular_space.search(text):
+        return parse_with_registry(item)
+    
+    urls, projects, contexts = [], [], []
+    delegated_to, delegated_from = [], []
+    properties = {}
+    for token in text.split():
+        if token in AMBIGUOUS_TOKENS:
+            return parse_with_registry(item)
+        first = token[0]
+        if first == u"@":
+            contexts.append(intern_string(token))
+        elif first == u"+":
+            projects.append(intern_string(token))
+        elif token.startswith(URL_PREFIXES):
+            urls.append(token)
+        # delegates may start anywhere in the token, but need at least one character
+        if u">>" in token or u"<<" in token:
+            for pos in xrange(len(token) - 2):
+                mode = token[pos:pos+2]
+                if mode == u">>":
+                    delegated_to.append(token[pos+2:])
+                    break
+                elif mode == u"<<":
+                    delegated_from.append(token[pos+2:])
+                    break
+        if u":" in token:
+            prop = token_property(token)
+            if prop:
+                if prop[0] in conf.MULTI_PROPS:
+                    properties.setdefault(prop[0], []).append(prop[1])
+                else:
+                    properties[prop[0]] = prop[1]
+    
+    prio = find_prio(text)
+    if prio:
+        item.priority = prio
+    item.markers = tuple(find_markers(text))
+    item.urls += tuple(urls)
+    item.delegated_to += tuple(delegated_to)
+    item.delegated_from += tuple(delegated_from)
+    item.projects += tuple(projects)
+    item.contexts += tuple(contexts)
+    item.properties.update(properties)
+    item.done = text.startswith(conf.DONE_PREFIX)
+    item.is_report = text.startswith(conf.REPORT_PREFIX)
+    return item
@@ -0,0 +1,263 @@
+"""
+:mod:`rollups`
+~~~~~~~~~~~~~~
+
+Provides daily rollups of the done and report items of the archive files, which are stored
+next to the todo file.
+
+For every day, a rollup counts the done and report items done on that day, sums up their
+``duration`` properties (in minutes) and counts their projects and contexts. The rollups
+are kept per archive file, together with the size and modification time of the file, so
+that statistics over years of archived items do not read the archive files at all.
+
+The rollups are built on first use and kept up to date by :func:`cmd_archive`. Archive
+files that have been changed otherwise are detected by their stamp and read again. Items
+without done date are not rolled up. The items of the todo list are rolled up on the fly,
+as the todo list is loaded anyway.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from config import ConfigBorg
+from linereader import open_reader
+from todoitem import TodoItem
+from files import write_atomically, get_file_stamp
+
+import datetime, json, logging, os
+
+conf = ConfigBorg()
+logger = logging.getLogger("todonext.rollups")
+
+# needs to be increased whenever the format of the rollups changes
+ROLLUP_VERSION = 1
+# file name of the rollups, located next to the todo file
+ROLLUP_FILENAME = ".todonext.rollups"
+
+
+def get_day(date):
+    """returns the key of the rollup of a day
+
+    :param date: the date
+    :type date: :class:`datetime.datetime`
+    :returns: the day as ``YYYY-MM-DD`` (:func:`strftime` fails before 1900)
+    :rtype: str
+    """
+    return "{year:04d}-{month:02d}-{day:02d}".format(year = date.year, month = date.month, day = date.day)
+
+
+def new_rollup():
+    """returns an empty rollup
+
+    :rtype: dict
+    """
+    return {"done": 0, "report": 0, "duration": 0, "projects": {}, "contexts": {}}
+
+
+def add_item(days, item):
+    """adds a done or report item to the rollup of the day it has been done
+
+    :param days: the rollups by day
+    :type days: dict
+    :param item: the todo item, other items and items without done date are ignored
+    :type item: :class:`TodoItem`
+    """
+    if not (item.done or item.is_report) or not isinstance(item.done_date, datetime.datetime):
+        return
+    rollup = days.setdefault(get_day(item.done_date), new_rollup())
+    if item.done:
+        rollup["done"] += 1
+    if item.is_report:
+        rollup["report"] += 1
+    try:
+        rollup["duration"] += int(item.properties.get(conf.DURATION, 0))
+    except (TypeError, ValueError):
+        pass
+    for key, names in (("projects", item.projects), ("contexts", item.contexts)):
+        counts = rollup[key]
+        for name in set(names):
+            counts[name] = counts.get(name, 0) + 1
+
+
+def merge_rollups(target, source):
+    """adds a rollup to another
+
+    :param target: the rollup that is changed
+    :type target: dict
+    :param source: the rollup that is added
+    :type source: dict
+    """
+    for key in ("done", "report", "duration"):
+        target[key] += source[key]
+    for key in ("projects", "contexts"):
+        counts = target[key]
+        for name, count in source[key].iteritems():
+            counts[name] = counts.get(name, 0) + count
+
+
+class Rollups(object):
+    """daily rollups of the archive files of a todo file
+    """
+
+    def __init__(self, filename, root_dir):
+        """constructor, reads the rollup file, if existing and valid
+
+        :param filename: the name of the rollup file
+        :type filename: str
+        :param root_dir: the directory of the todo file, which the archive file names are
+            relative to
+        :type root_dir: str
+        """
+        self.filename = filename
+        self.root_dir = root_dir
+        # stamps and rollups by day of the archive files, by relative file name
+        self.files = {}
+        self.changed = False
+        self.load()
+
+
+    def exists(self):
+        """returns whether the rollups have been built
+
+        :rtype: bool
+        """
+        return os.path.exists(self.filename)
+
+
+    def load(self):
+        """reads the rollup file, if it exists
+        """
+        if not self.exists():
+            return
+        try:
+            with open(self.filename, "rb") as fp:
+                data = json.load(fp)
+        except (IOError, ValueError), ex:
+            logger.warning(u"Could not read rollups {fn}: {ex}".format(fn = self.filename, ex = ex))
+            return
+        if data.get("version") == ROLLUP_VERSION:
+            self.files = data["files"]
+
+
+    def save(self):
+        """writes the rollup file, if the rollups have been changed
+        """
+        if not self.changed:
+            return
+        data = {"version": ROLLUP_VERSION, "files": self.files}
+        try:
+            write_atomically(self.filename, json.dumps(data, separators = (",", ":")), sync = False)
+            self.changed = False
+        except (IOError, OSError), ex:
+            logger.warning(u"Could not write rollups {fn}: {ex}".format(fn = self.filename, ex = ex))
+
+
+    def clear(self):
+        """removes all rollups, they are rebuilt by the next :meth:`refresh`
+        """
+        self.files = {}
+        self.changed = True
+
+
+    def _scan(self, name):
+        """reads an archive file and rolls up its items
+
+        :param name: the relative name of the archive file
+        :type name: str
+        """
+        path = os.path.join(self.root_dir, name)
+        days = {}
+        stamp = get_file_stamp(path)
+        with open_reader(path) as reader:
+            for _, text in reader.iter_lines():
+                add_item(days, TodoItem(text))
+        self.files[name] = {"stamp": stamp, "days": days}
+        self.changed = True
+
+
+    def refresh(self, filenames):
+        """brings the rollups up to date with the archive files
+
+        :param filenames: the names of all archive files
+        :type filenames: list(str)
+        """
+        names = [os.path.relpath(fn, self.root_dir) for fn in filenames]
+        for name in set(self.files).difference(names):
+            del self.files[name]
+            self.changed = True
+        for name in names:
+            entry = self.files.get(name, None)
+            if entry is None or get_file_stamp(os.path.join(self.root_dir, name)) != entry["stamp"]:
+                logger.info(u"Rolling up archive file {fn}".format(fn = name))
+                self._scan(name)
+
+
+    def add_items(self, filename, items):
+        """rolls up items that have been appended to an archive file
+
+        The rollups have to be refreshed before the items are appended.
+
+        :param filename: the name of the archive file
+        :type filename: str
+        :param items: the appended items
+        :type items: list(:class:`TodoItem`)
+        """
+        name = os.path.relpath(filename, self.root_dir)
+        entry = self.files.get(name, None)
+        if entry is None:
+            self._scan(name)
+            return
+        for item in items:
+            add_item(entry["days"], item)
+        entry["stamp"] = get_file_stamp(filename)
+        self.changed = True
+
+
+    def move_file(self, filename, compressed_filename):
+        """merges the rollups of an archive file into those of its compressed file, after it
+        has been compressed by :meth:`ArchiveIndex.rotate`
+
+        :param filename: the name of the removed archive file
+        :type filename: str
+        :param compressed_filename: the name of the compressed file
+        :type compressed_filename: str
+        """
+        entry = self.files.pop(os.path.relpath(filename, self.root_dir), None)
+        name = os.path.relpath(compressed_filename, self.root_dir)
+        if entry is None:
+            self._scan(name)
+            return
+        compressed = self.files.get(name, None)
+        if compressed is not None:
+            days = entry["days"]
+            for day, rollup in compressed["days"].iteritems():
+                merge_rollups(days.setdefault(day, new_rollup()), rollup)
+        entry["stamp"] = get_file_stamp(compressed_filename)
+        self.files[name] = entry
+        self.changed = True
+
+
+    def get_days(self, from_date, to_date, items = ()):
+        """returns the rollups of the days from ``from_date`` to ``to_date``
+
+        :param from_date: the first day
+        :type from_date: :class:`datetime.datetime`
+        :param to_date: the last day
+        :type to_date: :class:`datetime.datetime`
+        :param items: further items to roll up, e.g. the items of the todo list
+        :type items: iterable(:class:`TodoItem`)
+        :returns: the rollups by day (see :func:`get_day`), only days with items
+        :rtype: dict
+        """
+        first, last = get_day(from_date), get_day(to_date)
+        days = {}
+        for entry in self.files.itervalues():
+            for day, rollup in entry["days"].iteritems():
+                if first <= day <= last:
+                    merge_rollups(days.setdefault(day, new_rollup()), rollup)
+        live_days = {}
+        for item in items:
+            add_item(live_days, item)
+        for day, rollup in live_days.iteritems():
+            if first <= day <= last:
+                merge_rollups(days.setdefault(day, new_rollup()), rollup)
+        return days
@@ -0,0 +1,359 @@
+"""
+:mod:`search_index`
+~~~~~~~~~~~~~~~~~~~
+
+Provides a trigram index of the lines of the archive files for full-text search.
+
+The index maps every trigram (three consecutive bytes of the UTF-8 encoded, lower case
+text) to the lines containing it. A search looks up the trigrams of the literal parts of
+the search string and only the lines containing all of them are read and matched against
+the search string. Search strings without literal parts of three bytes cannot be looked
+up, all lines are searched then.
+
+The index consists of a binary main index, which is memory mapped and read only where a
+trigram is looked up, and a delta next to it. Lines appended by :func:`cmd_archive` and
+archive files that have been created or changed otherwise are indexed into the delta.
+Once the delta gets too large, the main index is rebuilt from the archive files and the
+delta is removed, like the journal is compacted into the todo file.
+
+The main index consists of a header, a JSON table of the indexed files (name, size and
+modification time, number of the first line), the offsets of the lines, the sorted
+trigrams, the start of the postings of each trigram and the postings (line numbers), the
+numbers are stored in native byte order.
+The delta is a :mod:`marshal` file with the stamps and trigrams of the lines of each file.
+
+The lines of the todo file are not indexed, the todo list is loaded for every command
+anyway.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from linereader import open_reader
+from files import write_atomically, get_file_stamp
+
+import array, bisect, collections, json, logging, marshal, mmap, os, sre_constants, sre_parse, struct
+
+logger = logging.getLogger("todonext.search_index")
+
+# needs to be increased whenever the layout of the index changes
+INDEX_VERSION = 1
+# file name of the index, located next to the todo file, the delta is stored next to it
+SEARCH_INDEX_FILENAME = ".todonext.search"
+DELTA_SUFFIX = ".delta"
+# magic, version, length of the file table, number of lines, number of trigrams
+HEADER = struct.Struct("<4sHIII")
+MAGIC = "TNTG"
+# the main index is rebuilt once the delta contains more lines than this fraction of the
+# indexed lines, but not before it contains MIN_DELTA_LINES lines
+DELTA_FRACTION = 0.2
+MIN_DELTA_LINES = 5000
+
+
+def get_trigrams(text):
+    """returns the trigrams of a text
+
+    :param text: the text
+    :type text: str
+    :returns: the trigrams, byte strings of length 3
+    :rtype: set(str)
+    """
+    data = text.lower().encode("utf-8")
+    return set(data[pos:pos + 3] for pos in xrange(len(data) - 2))
+
+
+def _collect_literals(sequence, literals):
+    run = []
+    for op, arg in sequence:
+        if op == sre_constants.LITERAL:
+            run.append(unichr(arg))
+            continue
+        if run:
+            literals.append(u"".join(run))
+            run = []
+        if op == sre_constants.SUBPATTERN:
+            _collect_literals(arg[1], literals)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and arg[0] > 0:
+            _collect_literals(arg[2], literals)
+        # alternatives, character classes etc. do not require a certain literal
+    if run:
+        literals.append(u"".join(run))
+
+
+def get_literals(pattern, flags = 0):
+    """returns the literal strings contained in every match of a regular expression
+
+    :param pattern: the regular expression
+    :type pattern: str
+    :param flags: the flags of the regular expression
+    :type flags: int
+    :returns: the literal strings
+    :rtype: list(str)
+    """
+    try:
+        sequence = sre_parse.parse(pattern, flags)
+    except (sre_constants.error, OverflowError):
+        return []
+    literals = []
+    _collect_literals(sequence, literals)
+    return literals
+
+
+class SearchIndex(object):
+    """trigram index of the lines of the archive files
+    """
+
+    def __init__(self, filename):
+        """constructor, the index is read on first use
+
+        :param filename: the name of the main index file
+        :type filename: str
+        """
+        self.filename = filename
+        self.delta_filename = filename + DELTA_SUFFIX
+        self.loaded = False
+        self.mm = None
+        # main index: stamps and numbers of the first lines, by file name
+        self.files = {}
+        self.first_lines, self.first_names = [], []
+        self.nr_lines = self.nr_trigrams = 0
+        # delta: stamp, whether the whole file is indexed and trigrams of the lines, by file name
+        self.delta = {}
+        self.delta_changed = False
+
+
+    def exists(self):
+        """returns whether the index has been built
+
+        :rtype: bool
+        """
+        return os.path.exists(self.filename)
+
+
+    def _load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            with open(self.filename, "rb") as fp:
+                mm = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+            magic, version, table_len, self.nr_lines, self.nr_trigrams = HEADER.unpack_from(mm)
+            if magic != MAGIC or version != INDEX_VERSION:
+                raise ValueError("unknown format")
+            pos = HEADER.size
+            table = json.loads(mm[pos:pos + table_len])
+        except (IOError, ValueError, struct.error, mmap.error), ex:
+            if self.exists():
+                logger.warning(u"Could not read search index {fn}: {ex}".format(fn = self.filename, ex = ex))
+            self.nr_lines = self.nr_trigrams = 0
+            return
+        self.mm = mm
+        self.files = dict((name, (stamp, first_line)) for name, stamp, first_line in table)
+        # the table is sorted by file name and line number
+        self.first_lines = [first_line for name, stamp, first_line in table]
+        self.first_names = [name for name, stamp, first_line in table]
+        self.offsets_pos = pos + table_len
+        self.keys_pos = self.offsets_pos + 4 * self.nr_lines
+        self.starts_pos = self.keys_pos + 3 * self.nr_trigrams
+        self.postings_pos = self.starts_pos + 4 * (self.nr_trigrams + 1)
+        try:
+            with open(self.delta_filename, "rb") as fp:
+                self.delta = marshal.load(fp)
+        except IOError:
+            pass
+        except (EOFError, ValueError, TypeError), ex:
+            logger.warning(u"Could not read search index {fn}: {ex}".format(fn = self.delta_filename, ex = ex))
+
+
+    def _get_stamp(self, name):
+        if name in self.delta:
+            return self.delta[name]["stamp"]
+        if name in self.files:
+            return self.files[name][0]
+        return None
+
+
+    def _index_lines(self, name, start = 0):
+        """indexes the lines of an archive file into the delta
+
+        :param name: the name of the archive file
+        :type name: str
+        :param start: the offset of the first line to index, 0 for the whole file
+        :type start: int
+        """
+        entry = self.delta.get(name, None)
+        if entry is None or start == 0:
+            entry = self.delta[name] = {"full": start == 0, "lines": 0, "trigrams": {}}
+        trigrams = entry["trigrams"]
+        entry["stamp"] = get_file_stamp(name)
+        with open_reader(name) as reader:
+            for offset, text in reader.iter_lines(start):
+                for key in get_trigrams(text):
+                    trigrams.setdefault(key, []).append(offset)
+                entry["lines"] += 1
+        self.delta_changed = True
+
+
+    def update(self, filenames):
+        """brings the index up to date with the archive files, the index is built if it
+        does not exist
+
+        :param filenames: the names of all archive files
+        :type filenames: list(str)
+        """
+        self._load()
+        if self.mm is None:
+            self.rebuild(filenames)
+            return
+        filenames = set(os.path.normpath(fn) for fn in filenames)
+        for name in set(self.delta).difference(filenames):
+            del self.delta[name]
+            self.delta_changed = True
+        for name in filenames:
+            if get_file_stamp(name) != self._get_stamp(name):
+                logger.info(u"Indexing archive file {fn}".format(fn = name))
+                self._index_lines(name)
+        delta_lines = sum(entry["lines"] for entry in self.delta.itervalues())
+        if delta_lines > max(MIN_DELTA_LINES, DELTA_FRACTION * self.nr_lines):
+            self.rebuild(filenames)
+        else:
+            self.save()
+
+
+    def extend(self, filename, old_stamp):
+        """indexes the lines appended to an archive file, if the index exists
+
+        :param filename: the name of the archive file
+        :type filename: str
+        :param old_stamp: the stamp of the file before the lines have been appended
+        :type old_stamp: list
+        """
+        if not self.exists():
+            return
+        self._load()
+        name = os.path.normpath(filename)
+        if old_stamp is not None and old_stamp == self._get_stamp(name):
+            self._index_lines(name, old_stamp[0])
+        else:
+            self._index_lines(name)
+
+
+    def save(self):
+        """writes the delta, if it has been changed
+        """
+        if not self.delta_changed:
+            return
+        if self.delta:
+            write_atomically(self.delta_filename, marshal.dumps(self.delta), sync = False)
+        elif os.path.exists(self.delta_filename):
+            os.remove(self.delta_filename)
+        self.delta_changed = False
+
+
+    def rebuild(self, filenames):
+        """builds the main index from the archive files and removes the delta
+
+        :param filenames: the names of all archive files
+        :type filenames: list(str)
+        """
+        offsets = array.array("I")
+        postings = collections.defaultdict(list)
+        table = []
+        for name in sorted(set(os.path.normpath(fn) for fn in filenames)):
+            table.append([name, get_file_stamp(name), len(offsets)])
+            with open_reader(name) as reader:
+                for offset, text in reader.iter_lines():
+                    line_nr = len(offsets)
+                    offsets.append(offset)
+                    for key in get_trigrams(text):
+                        postings[key].append(line_nr)
+        keys = sorted(postings)
+        starts = array.array("I", [0])
+        lines = array.array("I")
+        for key in keys:
+            lines.extend(postings[key])
+            starts.append(len(lines))
+        table = json.dumps(table, separators = (",", ":"))
+        header = HEADER.pack(MAGIC, INDEX_VERSION, len(table), len(offsets), len(keys))
+        self.close()
+        write_atomically(self.filename, "".join([header, table, offsets.tostring(), "".join(keys),
+                                                 starts.tostring(), lines.tostring()]), sync = False)
+        self.loaded = False
+        self.delta = {}
+        self.delta_changed = True
+        self.save()
+        self._load()
+
+
+    def close(self):
+        """unmaps the main index
+        """
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+    def _get_postings(self, key):
+        """returns the numbers of the lines of the main index containing a trigram
+
+        :param key: the trigram
+        :type key: str
+        :rtype: :class:`array.array`
+        """
+        mm, pos = self.mm, self.keys_pos
+        lo, hi = 0, self.nr_trigrams
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[pos + 3 * mid:pos + 3 * mid + 3] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        postings = array.array("I")
+        if lo < self.nr_trigrams and mm[pos + 3 * lo:pos + 3 * lo + 3] == key:
+            start, end = struct.unpack_from("=II", mm, self.starts_pos + 4 * lo)
+            postings.fromstring(mm[self.postings_pos + 4 * start:self.postings_pos + 4 * end])
+        return postings
+
+
+    def find(self, filenames, literals):
+        """returns the lines of the archive files that contain the trigrams of all literals
+
+        :param filenames: the names of all archive files
+        :type filenames: list(str)
+        :param literals: the strings every matching line contains
+        :type literals: list(str)
+        :returns: the sorted offsets of the candidate lines by file name, ``None`` if the
+            literals are too short for looking them up
+        :rtype: dict
+        """
+        keys = set()
+        for literal in literals:
+            keys.update(get_trigrams(literal))
+        if not keys:
+            return None
+        self.update(filenames)
+        names = dict((os.path.normpath(fn), fn) for fn in filenames)
+        candidates = collections.defaultdict(list)
+        # lines of the main index, except for files that have been indexed again
+        if self.nr_lines:
+            postings = sorted((self._get_postings(key) for key in keys), key = len)
+            line_nrs = set(postings[0])
+            for other in postings[1:]:
+                if not line_nrs:
+                    break
+                line_nrs.intersection_update(other)
+            for line_nr in sorted(line_nrs):
+                name = self.first_names[bisect.bisect_right(self.first_lines, line_nr) - 1]
+                if name in names and not self.delta.get(name, {}).get("full", False):
+                    candidates[names[name]].append(struct.unpack_from("=I", self.mm, self.offsets_pos + 4 * line_nr)[0])
+        # lines of the delta
+        for name, entry in self.delta.iteritems():
+            if name not in names:
+                continue
+            offsets = None
+            for key in keys:
+                found = entry["trigrams"].get(key, ())
+                offsets = set(found) if offsets is None else offsets.intersection(found)
+                if not offsets:
+                    break
+            candidates[names[name]].extend(offsets)
+        return dict((fn, sorted(offsets)) for fn, offsets in candidates.iteritems() if offsets)
@@ -0,0 +1,205 @@
+"""
+:mod:`snapshot`
+~~~~~~~~~~~~~~~
+
+Provides a binary snapshot of a loaded todo list.
+
+Loading a todo list parses every line, converts the dates, indexes the tids and
+dependencies and sorts the items. The snapshot stores the result: the texts, tids,
+priorities, flags, ``blockedby`` tids and sort keys of all items, in the default order.
+When the todo file has not changed since the snapshot has been written, the items are
+created from the snapshot as lazy items, which are only parsed on first access.
+
+The snapshot consists of a header followed by sections of strings and packed integers,
+no Python objects are serialized. It is stamped with size, modification time and content
+hash of the todo file and with the parser configuration (see :func:`get_stamp`).
+
+Lines that are rewritten while parsing (e.g. ``due:tomorrow``) depend on the current
+date, they are stored as read and parsed on every load.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from todoitem import TodoItem
+from parse_cache import create_item, get_stamp
+from files import write_atomically, get_file_stamp
+from config import ConfigBorg
+
+import logging, struct
+from itertools import izip
+
+conf = ConfigBorg()
+logger = logging.getLogger("todonext.snapshot")
+
+# needs to be increased whenever the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+# file name of the snapshot, located next to the todo file
+SNAPSHOT_FILENAME = ".todonext.snapshot"
+# magic, version, parser stamp, size and mtime of the todo file, content hash, number of items
+HEADER = struct.Struct("<4sH16sQd16sI")
+MAGIC = "TNSN"
+# length of a section
+SECTION = struct.Struct("<I")
+
+# item flags
+FLAG_DONE = 1
+FLAG_REPORT = 2
+# the text has been rewritten while parsing, the item is parsed on every load
+FLAG_VOLATILE = 4
+
+
+def pack_strings(strings):
+    """joins strings to a section, the strings must not contain line breaks
+
+    :param strings: the strings
+    :type strings: list(str)
+    :returns: the UTF-8 encoded section
+    :rtype: str
+    """
+    return u"\n".join(strings).encode("utf-8")
+
+
+def unpack_strings(data, count):
+    """splits a section created by :func:`pack_strings`
+
+    :param data: the section
+    :type data: str
+    :param count: the expected number of strings
+    :type count: int
+    :returns: the strings
+    :rtype: list(str)
+    :raises ValueError: if the section does not contain ``count`` strings
+    """
+    strings = data.decode("utf-8").split(u"\n") if count else []
+    if len(strings) != count:
+        raise ValueError("expected {count} strings, found {nr}".format(count = count, nr = len(strings)))
+    return strings
+
+
+def pack_ints(values):
+    return struct.pack("<{nr}q".format(nr = len(values)), *values)
+
+
+def unpack_ints(data, count):
+    return struct.unpack("<{nr}q".format(nr = count), data)
+
+
+class Snapshot(object):
+    """binary snapshot of the items of a todo file
+    """
+
+    def __init__(self, filename, todofile):
+        """constructor
+
+        :param filename: the name of the snapshot file
+        :type filename: str
+        :param todofile: the name of the todo file the snapshot is taken of, other
+            todo lists (e.g. archive files) are not stored
+        :type todofile: str
+        """
+        self.filename = filename
+        self.todofile = todofile
+
+
+    def _get_header(self, content_hash, count):
+        size, mtime = get_file_stamp(self.todofile)
+        return HEADER.pack(MAGIC, SNAPSHOT_VERSION, get_stamp().decode("hex"), size, mtime,
+                           content_hash.decode("hex"), count)
+
+
+    def load(self, content_hash):
+        """reads the items, if the snapshot belongs to the current todo file
+
+        :param content_hash: the MD5 hash of the todo file content
+        :type content_hash: str
+        :returns: the items in the default order and the ``blockedby`` tids of each
+            item, or ``None``
+        :rtype: tuple(list(:class:`TodoItem`), list(list(str)))
+        """
+        try:
+            with open(self.filename, "rb") as fp:
+                data = fp.read()
+        except IOError:
+            return None
+        if len(data) < HEADER.size or data[:HEADER.size - 4] != self._get_header(content_hash, 0)[:-4]:
+            logger.info(u"Snapshot {fn} is outdated".format(fn = self.filename))
+            return None
+        count = HEADER.unpack_from(data)[-1]
+        try:
+            sections, pos = [], HEADER.size
+            for _ in xrange(8):
+                length, = SECTION.unpack_from(data, pos)
+                pos += SECTION.size
+                sections.append(data[pos:pos + length])
+                pos += length
+            texts = unpack_strings(sections[0], count)
+            tids = unpack_strings(sections[1], count)
+            priorities = unpack_strings(sections[2], count)
+            blockers = unpack_strings(sections[3], count)
+            flags = bytearray(sections[4])
+            line_nrs, done_keys, due_keys = [unpack_ints(section, count) for section in sections[5:]]
+        except (struct.error, ValueError, UnicodeDecodeError), ex:
+            logger.warning(u"Could not read snapshot {fn}: {ex}".format(fn = self.filename, ex = ex))
+            return None
+        items = []
+        append = items.append
+        for text, tid, priority, flag, line_nr, done_key, due_key in izip(
+                texts, tids, priorities, flags, line_nrs, done_keys, due_keys):
+            if flag & FLAG_VOLATILE:
+                item = create_item(text)
+            else:
+                done, is_report = flag & FLAG_DONE != 0, flag & FLAG_REPORT != 0
+                sort_key = (done or is_report, priority or "ZZ", done_key, due_key, text.lower())
+                item = TodoItem(text, fields = (tid or None, priority or None, done, is_report, sort_key))
+            item.line_nr = line_nr
+            append(item)
+        return items, [value.split() for value in blockers]
+
+
+    def save(self, items, content_hash, line_nrs = None, volatile = None):
+        """writes the snapshot
+
+        :param items: the items in the default order, all of them parsed
+        :type items: iterable(:class:`TodoItem`)
+        :param content_hash: the MD5 hash of the todo file content
+        :type content_hash: str
+        :param line_nrs: the line numbers of the items in the todo file, by item id, if
+            different from :attr:`TodoItem.line_nr`
+        :type line_nrs: dict
+        :param volatile: the lines of items that have been rewritten while parsing, by
+            line number
+        :type volatile: dict
+        """
+        volatile = volatile or {}
+        texts, tids, priorities, blockers = [], [], [], []
+        flags = bytearray()
+        item_line_nrs, done_keys, due_keys = [], [], []
+        for item in items:
+            line_nr = line_nrs[id(item)] if line_nrs is not None else item.line_nr
+            flag = (FLAG_DONE if item.done else 0) | (FLAG_REPORT if item.is_report else 0)
+            if line_nr in volatile:
+                texts.append(volatile[line_nr])
+                flag |= FLAG_VOLATILE
+            else:
+                texts.append(item.text)
+            tids.append(item.tid or u"")
+            priorities.append(item.priority or u"")
+            blockers.append(u" ".join(item.properties.get(conf.BLOCKEDBY, ())))
+            flags.append(flag)
+            item_line_nrs.append(line_nr)
+            _, _, done_key, due_key, _ = item.get_sort_key()
+            done_keys.append(done_key)
+            due_keys.append(due_key)
+        if any(u"\n" in text for text in texts):
+            logger.info(u"Snapshot {fn} not written, items contain line breaks".format(fn = self.filename))
+            return
+        sections = [pack_strings(texts), pack_strings(tids), pack_strings(priorities), pack_strings(blockers),
+                    str(flags), pack_ints(item_line_nrs), pack_ints(done_keys), pack_ints(due_keys)]
+        parts = [self._get_header(content_hash, len(texts))]
+        for section in sections:
+            parts.append(SECTION.pack(len(section)))
+            parts.append(section)
+        try:
+            write_atomically(self.filename, "".join(parts), sync = False)
+        except (IOError, OSError), ex:
+            logger.warning(u"Could not write snapshot {fn}: {ex}".format(fn = self.filename, ex = ex))
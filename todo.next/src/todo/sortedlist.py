@@ -0,0 +1,187 @@
+"""
+:mod:`sortedlist`
+~~~~~~~~~~~~~~~~~
+
+Provides a list that keeps its items ordered by a key while items are added, removed
+or changed.
+
+The items are stored in blocks of limited size, so that inserting or removing an item
+only shifts the items of one block. The key of every item is stored next to it, so that
+an item whose key has changed can still be found and moved to its new position.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+# number of items per block, blocks are split when they reach twice this size
+BLOCK_SIZE = 512
+
+
+class SortedItemList(object):
+    """list of items ordered by a key function, supporting positional access
+
+    Items with equal keys keep the order in which they have been added.
+    """
+
+    def __init__(self, items = (), key = None):
+        """constructor, sorts the given items
+
+        :param items: the initial items
+        :type items: iterable
+        :param key: the key function, the items themselves are compared if not given.
+            Keys must not be ``None``.
+        :type key: callable
+        """
+        self.key = key or (lambda item: item)
+        pairs = sorted(((self.key(item), item) for item in items), key = lambda pair: pair[0])
+        self._keys = [[k for k, _ in pairs[start:start + BLOCK_SIZE]] for start in xrange(0, len(pairs), BLOCK_SIZE)]
+        self._items = [[item for _, item in pairs[start:start + BLOCK_SIZE]] for start in xrange(0, len(pairs), BLOCK_SIZE)]
+        # the last key of each block
+        self._maxes = [keys[-1] for keys in self._keys]
+        # the key under which an item has been stored, by id
+        self._stored_keys = dict((id(item), k) for k, item in pairs)
+        # number of items before each block, rebuilt on demand
+        self._offsets = None
+        self._len = len(pairs)
+
+
+    def __len__(self):
+        return self._len
+
+
+    def __iter__(self):
+        # iterate over a snapshot, so that items may be changed while iterating
+        return iter(list(chain.from_iterable(self._items)))
+
+
+    def __contains__(self, item):
+        return id(item) in self._stored_keys
+
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("list index out of range")
+        offsets = self._get_offsets()
+        block = bisect_right(offsets, index) - 1
+        return self._items[block][index - offsets[block]]
+
+
+    def _get_offsets(self):
+        if self._offsets is None:
+            offsets, total = [], 0
+            for items in self._items:
+                offsets.append(total)
+                total += len(items)
+            self._offsets = offsets
+        return self._offsets
+
+
+    def _locate(self, item):
+        """returns the block and the position in the block of an item
+
+        :raises ValueError: if the item is not in the list
+        """
+        stored_key = self._stored_keys.get(id(item), None)
+        if stored_key is None:
+            raise ValueError("item is not in list")
+        block = bisect_left(self._maxes, stored_key)
+        # items with equal keys may span several blocks
+        while block < len(self._keys):
+            keys, items = self._keys[block], self._items[block]
+            pos = bisect_left(keys, stored_key)
+            while pos < len(keys) and keys[pos] == stored_key:
+                if items[pos] is item:
+                    return block, pos
+                pos += 1
+            block += 1
+        raise ValueError("item is not in list")
+
+
+    def add(self, item):
+        """inserts an item at the position given by its key
+
+        :param item: the item
+        :type item: any
+        """
+        k = self.key(item)
+        self._stored_keys[id(item)] = k
+        self._len += 1
+        self._offsets = None
+        if not self._maxes:
+            self._keys.append([k])
+            self._items.append([item])
+            self._maxes.append(k)
+            return
+        block = bisect_right(self._maxes, k)
+        if block == len(self._maxes):
+            # new largest key, append to the last block
+            block -= 1
+            self._keys[block].append(k)
+            self._items[block].append(item)
+            self._maxes[block] = k
+        else:
+            pos = bisect_right(self._keys[block], k)
+            self._keys[block].insert(pos, k)
+            self._items[block].insert(pos, item)
+        if len(self._keys[block]) >= 2 * BLOCK_SIZE:
+            # split the block in halves
+            keys, items = self._keys[block], self._items[block]
+            self._keys[block:block + 1] = [keys[:BLOCK_SIZE], keys[BLOCK_SIZE:]]
+            self._items[block:block + 1] = [items[:BLOCK_SIZE], items[BLOCK_SIZE:]]
+            self._maxes[block:block + 1] = [keys[BLOCK_SIZE - 1], keys[-1]]
+
+
+    def remove(self, item):
+        """removes an item
+
+        :param item: the item
+        :type item: any
+        :raises ValueError: if the item is not in the list
+        """
+        block, pos = self._locate(item)
+        del self._stored_keys[id(item)]
+        keys, items = self._keys[block], self._items[block]
+        del keys[pos]
+        del items[pos]
+        self._len -= 1
+        self._offsets = None
+        if not keys:
+            del self._keys[block]
+            del self._items[block]
+            del self._maxes[block]
+        else:
+            self._maxes[block] = keys[-1]
+
+
+    def update(self, item):
+        """moves an item whose key has changed to its new position
+
+        :param item: the item
+        :type item: any
+        :raises ValueError: if the item is not in the list
+        """
+        stored_key = self._stored_keys.get(id(item), None)
+        if stored_key is None:
+            raise ValueError("item is not in list")
+        if stored_key == self.key(item):
+            # the position has not changed
+            return
+        self.remove(item)
+        self.add(item)
+
+
+    def index(self, item):
+        """returns the position of an item
+
+        :param item: the item
+        :type item: any
+        :returns: the position
+        :rtype: int
+        :raises ValueError: if the item is not in the list
+        """
+        block, pos = self._locate(item)
+        return self._get_offsets()[block] + pos
@@ -0,0 +1,300 @@
+"""
+:mod:`tid_allocator`
+~~~~~~~~~~~~~~~~~~~~
+
+Provides the allocation of new tids.
+
+Tids are written in base 26 with the letters ``a`` to ``z``. For every tid length, a
+bitmap records which of the numbers are in use, so a free tid is found with a few
+random probes. If more than a configurable fraction of the tids of the current length
+is in use, new tids get one letter more.
+
+Tids of archived items are kept in a manifest next to the todo file, so that they are
+not handed out again.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+import base64, codecs, os, random, re, string, zlib
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+BASE = len(ALPHABET)
+# length of new tids
+DEFAULT_LEN = 3
+# longest generated tids, a bitmap of this length has 26^5 bits (1.5 MB)
+MAX_LEN = 5
+# fraction of used tids of the current length above which new tids get longer
+DEFAULT_OCCUPANCY = 0.5
+# number of random probes before the bitmap is scanned
+MAX_PROBES = 32
+# file name of the archived tids, located next to the todo file
+MANIFEST_FILENAME = ".todonext.tids"
+
+# translation of the tid letters to the digits of :func:`int` for base 26
+TID_DIGITS = "0123456789abcdefghijklmnop"
+str_digit_table = string.maketrans(ALPHABET, TID_DIGITS)
+unicode_digit_table = dict((ord(char), ord(digit)) for char, digit in zip(ALPHABET, TID_DIGITS))
+
+re_generated_tid = re.compile("^[{alphabet}]{{1,{max_len}}}$".format(alphabet = ALPHABET, max_len = MAX_LEN))
+
+
+def tid_to_nr(tid):
+    """returns the number of a tid
+
+    :param tid: the tid
+    :type tid: str
+    :returns: the number
+    :rtype: int
+    """
+    if isinstance(tid, str):
+        return int(tid.translate(str_digit_table), BASE)
+    return int(tid.translate(unicode_digit_table), BASE)
+
+
+def nr_to_tid(nr, length):
+    """returns the tid of a number
+
+    :param nr: the number
+    :type nr: int
+    :param length: the number of letters
+    :type length: int
+    :returns: the tid
+    :rtype: str
+    """
+    chars = []
+    for _ in xrange(length):
+        nr, digit = divmod(nr, BASE)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def read_manifest(filename):
+    """returns the tids stored in a manifest
+
+    :param filename: the name of the manifest
+    :type filename: str
+    :returns: the tids
+    :rtype: list(str)
+    """
+    if not os.path.exists(filename):
+        return []
+    with codecs.open(filename, "r", "utf-8") as fp:
+        return [line.strip() for line in fp if line.strip()]
+
+
+def extend_manifest(filename, tids):
+    """appends tids to a manifest
+
+    :param filename: the name of the manifest
+    :type filename: str
+    :param tids: the tids
+    :type tids: iterable(str)
+    """
+    with codecs.open(filename, "a", "utf-8") as fp:
+        for tid in tids:
+            fp.write(tid + u"\n")
+
+
+class TidSet(object):
+    """set of tids, stored as bitmaps per tid length
+
+    Tids that cannot be generated (e.g. with digits or upper case letters) are kept in
+    an ordinary set.
+    """
+
+    def __init__(self, tids = ()):
+        """constructor
+
+        :param tids: the initial tids
+        :type tids: iterable(str)
+        """
+        # bitmap and number of tids per length, created on demand
+        self.bitmaps = {}
+        self.counts = {}
+        self.others = set()
+        self.update(tids)
+
+
+    def _get_bitmap(self, length):
+        bitmap = self.bitmaps.get(length, None)
+        if bitmap is None:
+            bitmap = self.bitmaps[length] = bytearray((BASE ** length + 7) // 8)
+            self.counts[length] = 0
+        return bitmap
+
+
+    def __contains__(self, tid):
+        if not re_generated_tid.match(tid):
+            return tid in self.others
+        bitmap = self.bitmaps.get(len(tid), None)
+        if bitmap is None:
+            return False
+        nr = tid_to_nr(tid)
+        return bool(bitmap[nr >> 3] & (1 << (nr & 7)))
+
+
+    def add(self, tid):
+        """adds a tid
+
+        :param tid: the tid
+        :type tid: str
+        """
+        if not re_generated_tid.match(tid):
+            self.others.add(tid)
+            return
+        bitmap = self._get_bitmap(len(tid))
+        nr = tid_to_nr(tid)
+        if not bitmap[nr >> 3] & (1 << (nr & 7)):
+            bitmap[nr >> 3] |= 1 << (nr & 7)
+            self.counts[len(tid)] += 1
+
+
+    def update(self, tids):
+        """adds several tids
+
+        :param tids: the tids
+        :type tids: iterable(str)
+        """
+        match, bitmaps, counts = re_generated_tid.match, self.bitmaps, self.counts
+        for tid in tids:
+            if not match(tid):
+                self.others.add(tid)
+                continue
+            bitmap = bitmaps.get(len(tid), None) or self._get_bitmap(len(tid))
+            nr = tid_to_nr(tid)
+            if not bitmap[nr >> 3] & (1 << (nr & 7)):
+                bitmap[nr >> 3] |= 1 << (nr & 7)
+                counts[len(tid)] += 1
+
+
+    def discard(self, tid):
+        """removes a tid, if contained
+
+        :param tid: the tid
+        :type tid: str
+        """
+        if tid not in self:
+            return
+        if not re_generated_tid.match(tid):
+            self.others.discard(tid)
+            return
+        nr = tid_to_nr(tid)
+        self.bitmaps[len(tid)][nr >> 3] &= ~(1 << (nr & 7)) & 0xff
+        self.counts[len(tid)] -= 1
+
+
+    def get_state(self):
+        """returns the content of the set in a JSON compatible form
+
+        :returns: the compressed bitmaps, the counts and the other tids
+        :rtype: dict
+        """
+        return {"bitmaps": dict((str(length), base64.b64encode(zlib.compress(str(bitmap), 1)))
+                                for length, bitmap in self.bitmaps.iteritems()),
+                "counts": dict((str(length), count) for length, count in self.counts.iteritems()),
+                "others": sorted(self.others)}
+
+
+    def set_state(self, state):
+        """replaces the content of the set with a state returned by :meth:`get_state`
+
+        :param state: the content
+        :type state: dict
+        """
+        self.bitmaps = dict((int(length), bytearray(zlib.decompress(base64.b64decode(bitmap))))
+                            for length, bitmap in state["bitmaps"].iteritems())
+        self.counts = dict((int(length), count) for length, count in state["counts"].iteritems())
+        self.others = set(state["others"])
+
+
+class TidAllocator(TidSet):
+    """allocator of unused tids
+    """
+
+    def __init__(self, used_tids = (), occupancy = DEFAULT_OCCUPANCY):
+        """constructor
+
+        :param used_tids: the tids that are already in use
+        :type used_tids: iterable(str)
+        :param occupancy: the fraction of used tids of the current length above which
+            new tids get longer
+        :type occupancy: float
+        """
+        self.occupancy = occupancy
+        self.length = DEFAULT_LEN
+        TidSet.__init__(self, used_tids)
+
+    # the tids of the set are the used ones
+    is_used = TidSet.__contains__
+    mark_used = TidSet.add
+    release = TidSet.discard
+
+
+    def get_state(self):
+        state = TidSet.get_state(self)
+        state["length"] = self.length
+        return state
+
+
+    def set_state(self, state):
+        TidSet.set_state(self, state)
+        self.length = state["length"]
+
+
+    def _grow(self, nr_of_tids):
+        """increases the tid length until ``nr_of_tids`` new tids fit below the occupancy
+        """
+        self._get_bitmap(self.length)
+        while (self.length < MAX_LEN and
+               self.counts[self.length] + nr_of_tids > self.occupancy * BASE ** self.length):
+            self.length += 1
+            self._get_bitmap(self.length)
+
+
+    def _find_free(self):
+        """returns a free number of the current length
+        """
+        bitmap, size = self.bitmaps[self.length], BASE ** self.length
+        # below the occupancy, a free number is found after a few probes
+        for _ in xrange(MAX_PROBES):
+            nr = random.randrange(size)
+            if not bitmap[nr >> 3] & (1 << (nr & 7)):
+                return nr
+        # the longest tids are crowded, scan from a random position
+        start = random.randrange(len(bitmap))
+        for offset in xrange(len(bitmap)):
+            pos = (start + offset) % len(bitmap)
+            if bitmap[pos] != 0xff:
+                for bit in xrange(8):
+                    nr = pos * 8 + bit
+                    if nr < size and not bitmap[pos] & (1 << bit):
+                        return nr
+        raise ValueError("no free tid available")
+
+
+    def allocate(self):
+        """returns a new tid and records it as used
+
+        :returns: the tid
+        :rtype: str
+        """
+        return self.allocate_many(1)[0]
+
+
+    def allocate_many(self, nr_of_tids):
+        """returns several new tids and records them as used
+
+        The tid length is chosen once for all tids.
+
+        :param nr_of_tids: the number of tids
+        :type nr_of_tids: int
+        :returns: the tids
+        :rtype: list(str)
+        """
+        self._grow(nr_of_tids)
+        tids = []
+        for _ in xrange(nr_of_tids):
+            tid = nr_to_tid(self._find_free(), self.length)
+            self.mark_used(tid)
+            tids.append(tid)
+        return tids
@@ -0,0 +1,133 @@
+"""
+:mod:`tid_index`
+~~~~~~~~~~~~~~~~
+
+Provides an index of the tids in a todo file, which is stored next to the todo file.
+
+The index allows adding items without reading the todo file: new tids are allocated 
+from the used tids (including the archived ones), and the ``blockedby`` properties of 
+new items are checked against the open items. The tids are stored as bitmaps, so the 
+size of the index depends on the tid length, not on the number of items.
+
+The index is only valid as long as the todo file has not been changed otherwise, which
+is detected by the size and modification time of the todo file and the size of its
+journal (see :mod:`journal`).
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from tid_allocator import TidAllocator, TidSet, DEFAULT_OCCUPANCY
+from files import write_atomically, get_file_stamp
+from config import ConfigBorg
+
+import json, logging, os
+
+conf = ConfigBorg()
+logger = logging.getLogger("todonext.tid_index")
+
+# needs to be increased whenever the format of the index changes
+INDEX_VERSION = 1
+# file name of the index, located next to the todo file
+INDEX_FILENAME = ".todonext.tidindex"
+
+
+def get_stamp(todofile):
+    """returns the stamp of a todo file and its journal, which changes whenever items are
+    changed
+
+    :param todofile: the name of the todo file
+    :type todofile: str
+    :returns: the stamp, ``None`` if the todo file does not exist
+    :rtype: list
+    """
+    stamp = get_file_stamp(todofile)
+    journal = getattr(conf, "journal", None)
+    if stamp is not None and journal is not None and journal.todofile == todofile:
+        stamp.append(journal.get_size())
+    return stamp
+
+
+class TidIndex(object):
+    """index of the used and the open tids of a todo file
+    """
+
+    def __init__(self, filename, occupancy = DEFAULT_OCCUPANCY):
+        """constructor, reads the index file, if existing and valid
+
+        :param filename: the name of the index file
+        :type filename: str
+        :param occupancy: the occupancy for allocating new tids, see :class:`TidAllocator`
+        :type occupancy: float
+        """
+        self.filename = filename
+        # stamp of the todo file the index belongs to
+        self.stamp = None
+        # tids of the todo file and the archives
+        self.used = TidAllocator(occupancy = occupancy)
+        # tids of the open items in the todo file
+        self.open = TidSet()
+        self.load()
+
+
+    def load(self):
+        """reads the index file, if it exists and has the current format
+        """
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "rb") as fp:
+                data = json.load(fp)
+        except (IOError, ValueError), ex:
+            logger.warning(u"Could not read tid index {fn}: {ex}".format(fn = self.filename, ex = ex))
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.used.set_state(data["used"])
+        self.open.set_state(data["open"])
+        self.stamp = data["stamp"]
+
+
+    def is_current(self, todofile):
+        """returns whether the index belongs to the current content of the todo file
+
+        :param todofile: the name of the todo file
+        :type todofile: str
+        :rtype: bool
+        """
+        return self.stamp is not None and self.stamp == get_stamp(todofile)
+
+
+    def rebuild(self, todolist):
+        """fills the index with the tids of a todo list
+
+        :param todolist: the todo list
+        :type todolist: :class:`TodoList`
+        """
+        self.used = todolist.get_tid_allocator()
+        self.open = TidSet(tid for tid, item in todolist.tids.iteritems() if not (item.done or item.is_report))
+
+
+    def add(self, item):
+        """adds the tid of a new item
+
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        """
+        self.used.mark_used(item.tid)
+        if not (item.done or item.is_report):
+            self.open.add(item.tid)
+
+
+    def save(self, todofile):
+        """writes the index file for the current content of the todo file
+
+        :param todofile: the name of the todo file
+        :type todofile: str
+        """
+        self.stamp = get_stamp(todofile)
+        data = {"version": INDEX_VERSION, "stamp": self.stamp, "used": self.used.get_state(),
+                "open": self.open.get_state()}
+        try:
+            write_atomically(self.filename, json.dumps(data, separators = (",", ":")), sync = False)
+        except (IOError, OSError), ex:
+            logger.warning(u"Could not write tid index {fn}: {ex}".format(fn = self.filename, ex = ex))
@@ -0,0 +1,81 @@
+"""
+:mod:`timing`
+~~~~~~~~~~~~~
+
+Provides the timing instrumentation of todo.next.
+
+The durations of named phases (e.g. loading the todo list or waiting for the lock) and the
+number of bytes written are summed up in a :class:`Timings` object, which is stored in the configuration while
+timings are requested (``--timing``) and reported when the command has finished.
+
+.. created: 17.10.2026
+.. moduleauthor:: Philipp Scholl
+"""
+from config import ConfigBorg
+
+import collections, contextlib, time
+
+conf = ConfigBorg()
+
+
+class Timings(object):
+    """durations of named phases, in the order in which the phases have been entered first
+    """
+
+    def __init__(self):
+        self.durations = collections.OrderedDict()
+        self.counts = collections.defaultdict(int)
+        self.bytes_written = 0
+
+
+    def add(self, name, duration):
+        """adds the duration of a phase
+
+        :param name: the name of the phase
+        :type name: str
+        :param duration: the duration in seconds
+        :type duration: float
+        """
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        self.counts[name] += 1
+
+
+    def report(self):
+        """returns a line per phase with its total duration
+
+        :returns: the lines
+        :rtype: list(str)
+        """
+        lines = [u"{name:12}: {duration:8.3f} s ({count}x)".format(name = name, duration = duration,
+                     count = self.counts[name]) for name, duration in self.durations.iteritems()]
+        lines.append(u"{name:12}: {nr:8d} bytes".format(name = "written", nr = self.bytes_written))
+        return lines
+
+
+def count_written(nr_bytes):
+    """adds the number of bytes written to a file, if timings are requested
+
+    :param nr_bytes: the number of bytes
+    :type nr_bytes: int
+    """
+    timings = getattr(conf, "timings", None)
+    if timings is not None:
+        timings.bytes_written += nr_bytes
+
+
+@contextlib.contextmanager
+def measure(name):
+    """context manager measuring the duration of a phase, if timings are requested
+
+    :param name: the name of the phase
+    :type name: str
+    """
+    timings = getattr(conf, "timings", None)
+    if timings is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        timings.add(name, time.time() - start)
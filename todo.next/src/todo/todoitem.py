@@ -17,28 +17,194 @@ import datetime, re, os, sys, logging
 conf = ConfigBorg()
 logger = logging.getLogger("todonext.todoitem")
 
+def lazy_field(name):
+    """creates a property for a field that is only filled when the item is materialized
+    
+    :param name: the name of the field
+    :type name: str
+    :returns: the property object
+    :rtype: property
+    """
+    attr_name = "_" + name
+    def fget(self):
+        if not self._parsed:
+            self._materialize()
+        return getattr(self, attr_name)
+    def fset(self, value):
+        if not self._parsed:
+            self._materialize()
+        setattr(self, attr_name, value)
+    return property(fget = fget, fset = fset)
+
+
+# items without a valid date are ordered like items of that date
+NO_SORT_DATE = datetime.datetime(1970, 1, 1)
+
+def reversed_date_key(date):
+    """returns an integer that orders dates descending, i.e. the newest date first
+    
+    :param date: the date
+    :type date: :class:`datetime.datetime` or str
+    :returns: the negated number of microseconds since 0001-01-01, :data:`NO_SORT_DATE` for non-dates
+    :rtype: int
+    """
+    if not isinstance(date, datetime.datetime):
+        date = NO_SORT_DATE
+    return -((date.toordinal() * 86400 + date.hour * 3600 + date.minute * 60 + date.second) * 1000000 + date.microsecond)
+
+
 class TodoItem(object):
+    """a single todo item
     
-    def __init__(self, item_text):
+    The list fields (projects, contexts, URLs, ...) are tuples, so that items without
+    e.g. projects share the empty tuple.
+    """
+    __slots__ = ("_text", "_parsed", "_tid", "_properties", "_urls", "_markers", 
+                 "_delegated_to", "_delegated_from", "_projects", "_contexts",
+                 "priority", "done", "is_report", "nr", "dirty", "line_nr", "_sort_key", "_spans")
+    
+    def __init__(self, item_text, lazy = False, state = None, fields = None):
+        """constructor, parses the item text
         
-        self.text = item_text
-        self.properties = {}
-        self.urls = []
-        self.markers = []
+        :param item_text: the string representation of the todo item
+        :type item_text: str
+        :param lazy: if ``True``, only priority, done / report flags and tid are read, 
+            all other fields are parsed on first access
+        :type lazy: bool
+        :param state: the already parsed fields of the item text, as returned by :meth:`get_state`
+        :type state: tuple
+        :param fields: tid, priority, done and report flags and sort key of a lazy item, 
+            instead of reading them from the text
+        :type fields: tuple
+        """
+        self._text = item_text
+        self._parsed = False
         self.priority = None
-        self.delegated_to, self.delegated_from = [], []
-        self.projects, self.contexts = [], []
         self.done = None
         self.is_report = None
         self.nr = None
         self.dirty = False
         self.line_nr = sys.maxint
+        self._sort_key = None
+        self._spans = None
+        if state is not None:
+            self._restore(state)
+        elif fields is not None:
+            self._tid, self.priority, self.done, self.is_report, self._sort_key = fields
+        elif lazy:
+            self._tid = parsers.find_property(item_text, conf.ID)
+            if self._tid is None:
+                # too complicated for the quick look
+                self._materialize()
+            else:
+                self._tid = self._tid[-1] if self._tid else None
+                self.priority = parsers.find_prio(item_text)
+                self.done = item_text.startswith(conf.DONE_PREFIX)
+                self.is_report = item_text.startswith(conf.REPORT_PREFIX)
+        else:
+            self._materialize()
+    
+    
+    def _materialize(self):
+        """parses all fields of the item text
+        """
+        self._parsed = True
+        self._properties = {}
+        self._urls = self._markers = ()
+        self._delegated_to = self._delegated_from = ()
+        self._projects = self._contexts = ()
         # find all special syntax
         self._parse()
         # fix dates on properties
         self._fix_properties_on_load()
     
     
+    def get_state(self):
+        """returns the parsed fields of this item
+        
+        :returns: tuple of priority, done and report flags, markers, URLs, delegates, 
+            projects, contexts and properties
+        :rtype: tuple
+        """
+        return (self.priority, self.done, self.is_report, self.markers, self.urls, 
+                self.delegated_to, self.delegated_from, self.projects, self.contexts, self.properties)
+    
+    
+    def _restore(self, state):
+        """sets the parsed fields from a state returned by :meth:`get_state` instead of parsing
+        
+        :param state: the parsed fields
+        :type state: tuple
+        """
+        self._parsed = True
+        (self.priority, self.done, self.is_report, self._markers, self._urls, self._delegated_to, 
+            self._delegated_from, self._projects, self._contexts, self._properties) = state
+    
+    def get_text(self):
+        if not self._parsed:
+            self._materialize()
+        return self._text
+    
+    def get_raw_text(self):
+        """returns the item text without parsing a lazy item, which is unchanged until it is 
+        parsed, but may still contain e.g. relative dates
+        
+        :returns: the item text
+        :rtype: str
+        """
+        return self._text
+    
+    def set_text(self, text):
+        if not self._parsed:
+            self._materialize()
+        self._text = text
+        # all changes of an item change its text
+        self._sort_key = None
+        self._spans = None
+    
+    text = property(fget = get_text, fset = set_text)
+    
+    
+    def get_sort_key(self):
+        """returns the key of this item for the default order of todo lists: open items first, 
+        then by priority, by done date and due date (newest first) and alphabetically
+        
+        The key is computed on first access and reset when the text of the item changes.
+        
+        :returns: the sort key
+        :rtype: tuple
+        """
+        key = self._sort_key
+        if key is None:
+            key = self._sort_key = (bool(self.is_report or self.done), self.priority or "ZZ", 
+                reversed_date_key(self.done_date), reversed_date_key(self.due_date), self.text.lower())
+        return key
+    
+    # fields that are parsed on first access
+    properties = lazy_field("properties")
+    urls = lazy_field("urls")
+    markers = lazy_field("markers")
+    delegated_to = lazy_field("delegated_to")
+    delegated_from = lazy_field("delegated_from")
+    projects = lazy_field("projects")
+    contexts = lazy_field("contexts")
+    
+    
+    def has_property(self, property_name):
+        """checks whether the item has a property, without materializing a lazy item
+        
+        :param property_name: the normalized property name (e.g. "blockedby")
+        :type property_name: str
+        :returns: whether the property exists
+        :rtype: bool
+        """
+        if not self._parsed:
+            values = parsers.find_property(self._text, property_name)
+            if values is not None:
+                return len(values) > 0
+        return property_name in self.properties
+    
+    
     def set_date(self, prop_name, date_or_str):
         if not date_or_str: 
             self.replace_or_add_prop(prop_name, None)
@@ -59,6 +225,8 @@ class TodoItem(object):
         return self.properties.get(conf.CREATED, None)
     
     def get_id(self):
+        if not self._parsed:
+            return self._tid
         return self.properties.get(conf.ID, None)
     
     # short cuts for reading commonly used properties
@@ -128,36 +296,105 @@ class TodoItem(object):
     def reopen(self):
         """reopens an already "done" marked todo item 
         """
+        # remove "x " prefix, a lazy item is parsed before the flag is changed
+        is_done = self.text.startswith(conf.DONE_PREFIX)
         self.done = False
-        # remove "x " prefix
-        if self.text.startswith(conf.DONE_PREFIX):
-            self.text = self.text[2:]
+        self._sort_key = None
+        if is_done:
+            self._splice(0, len(conf.DONE_PREFIX), u"")
             # remove done property
             self.remove_prop(conf.DONE)
             self.dirty = True
     
     
+    def set_creation_date(self):
+        """adds a ``created:{datetime}`` property with the current time, or a ``done``
+        property for report items, as they are "done" by definition
+        """
+        now = datetime.datetime.now()
+        if self.is_report:
+            # in case of report item, we need to store the "done" date for later sorting
+            self.replace_or_add_prop(conf.DONE, from_date(now), now)
+        else:
+            self.replace_or_add_prop(conf.CREATED, from_date(now), now)
+    
+    
     def set_to_done(self):
         """sets this item to status "done"
         
         This automatically adds a ``done:{datetime}`` property and prepends
         the item with ``x ``.
         """
+        # add marker "x " at beginning, a lazy item is parsed before the flag is changed
+        if not self.text.startswith(conf.DONE_PREFIX):
+            self._splice(0, 0, conf.DONE_PREFIX)
         # set to done
         self.done = True
+        self._sort_key = None
         # if necessary, create properties
         now = datetime.datetime.now()
-        # add marker "x " at beginning
-        if not self.text.startswith(conf.DONE_PREFIX):
-            self.text = conf.DONE_PREFIX + self.text
         # replace ``done`` properties with current value (and add datetime object for properties)
         self.replace_or_add_prop(conf.DONE, from_date(now), now)
 
     
+    def _get_spans(self):
+        """returns the positions of the properties in the item text
+        
+        The positions are determined on the first change of a property and are then kept 
+        up to date by :meth:`_splice`, so that further changes do not search the text again.
+        
+        :returns: list of ``[prop_name, start, end]``
+        :rtype: list(list)
+        """
+        if self._spans is None:
+            self._spans = parsers.find_property_spans(self.text)
+        return self._spans
+    
+    
+    def _splice(self, start, end, replacement):
+        """replaces a part of the item text and moves the positions of the properties behind it
+        
+        :param start: the start of the replaced part
+        :type start: int
+        :param end: the end of the replaced part
+        :type end: int
+        :param replacement: the new text of the part
+        :type replacement: str
+        """
+        text = self.text
+        self._text = text[:start] + replacement + text[end:]
+        self._sort_key = None
+        delta = len(replacement) - (end - start)
+        if delta and self._spans:
+            for span in self._spans:
+                if span[1] >= end:
+                    span[1] += delta
+                    span[2] += delta
+    
+    
+    def _remove_span(self, index):
+        """removes a property from the item text, together with the whitespace in front of it
+        
+        :param index: the index of the property in :meth:`_get_spans`
+        :type index: int
+        """
+        _, start, end = self._spans.pop(index)
+        text = self.text
+        space_start = start
+        while space_start > 0 and text[space_start-1].isspace():
+            space_start -= 1
+        if space_start == 0:
+            # first part of the text, remove the whitespace behind it instead
+            while end < len(text) and text[end].isspace():
+                end += 1
+        self._splice(space_start, end, u"")
+    
+    
     def remove_prop(self, property_name, selector_value = None):
         # normalize property name
         property_name = property_name.lower()
-    
+        spans = self._get_spans()
+        
         if property_name in conf.MULTI_PROPS and selector_value:
             if property_name in self.properties:
                 # remove property that has a certain value
@@ -165,23 +402,20 @@ class TodoItem(object):
                 if not self.properties[property_name]:
                     # if the property is now empty
                     del self.properties[property_name]
-                # remove from text
-                self.text = self.text.replace(
-                    u"{prop_key}:{prop_val}".format(prop_key = property_name, prop_val = selector_value),
-                    "")
+                # remove the first occurrence from text
+                value_offset = len(property_name) + 1
+                for index, (prop_name, start, end) in enumerate(spans):
+                    if prop_name == property_name and self.text[start+value_offset:end] == selector_value:
+                        self._remove_span(index)
+                        break
         else:
-            # remove all instances of that property
-            # regular expression for finding property key:value pairs
-            re_replace_prop = re.compile(r"\b({prop_key}:.+?)(?:$|\s)".format(prop_key = property_name), re.UNICODE)
-            matches = re_replace_prop.findall(self.text)
             # remove the property
             if property_name in self.properties:
                 del self.properties[property_name]
-            # remove all properties with that identifier
-            for match in matches:
-                self.text = self.text.replace(match, "")
-        # replacing may leave multiple adjacent whitespaces - remove those
-        self.text = u" ".join(self.text.split())
+            # remove all properties with that identifier, last first
+            for index in reversed(xrange(len(spans))):
+                if spans[index][0] == property_name:
+                    self._remove_span(index)
         self.dirty = True
         return self
 
@@ -209,71 +443,53 @@ class TodoItem(object):
         """
         # normalize property name
         property_name = property_name.lower()
-        # regular expression for finding property key:value pairs
-        re_replace_prop = re.compile(r"\b({prop_key}:.+?)(?:$|\s)".format(prop_key = property_name), re.UNICODE)
-        matches = re_replace_prop.findall(self.text)
         
         if not new_property_value:
             logger.warning(u"Removing via add_or_replace_prop is deprecated!")
-            # TODO: case new_prop_val == None, prop is MULTI_PROP and real is set... remove only one part
-            if property_name in conf.MULTI_PROPS and real_property_value:
-                if property_name in self.properties:
-                    # remove property that has a certain value
-                    self.properties[property_name].remove(real_property_value)
-                    if not self.properties[property_name]:
-                        # if the property is now empty
-                        del self.properties[property_name]
-                    # remove from text
-                    self.text = self.text.replace(
-                        "{prop_key}:{prop_val}".format(prop_key = property_name, prop_val = real_property_value),
-                        "")
-            else:
-                # remove the property
-                if property_name in self.properties:
-                    del self.properties[property_name]
-                # remove all properties with that identifier
-                for match in matches:
-                    self.text = self.text.replace(match, "")
-            # replacing may leave multiple adjacent whitespaces - remove those
-            self.text = u" ".join(self.text.split())
+            return self.remove_prop(property_name, real_property_value)
+        
+        # if multi prop, initialize to empty list
+        if property_name in conf.MULTI_PROPS:
+            if property_name not in self.properties:
+                self.properties[property_name] = []
+        
+        target_value = new_property_value
+        if real_property_value:
+            target_value = real_property_value
+        
+        if property_name in conf.MULTI_PROPS:
+            self.properties[property_name].append(target_value)
         else:
-            # if multi prop, initialize to empty list
-            if property_name in conf.MULTI_PROPS:
-                if property_name not in self.properties:
-                    self.properties[property_name] = []
-            
-            target_value = new_property_value
-            if real_property_value:
-                target_value = real_property_value
-            
-            if property_name in conf.MULTI_PROPS:
-                self.properties[property_name].append(target_value)
-            else:
-                self.properties[property_name] = target_value
-            
-            # depending on whether it is a multi prop
-            if len(matches) > 0 and property_name not in conf.MULTI_PROPS:
-                # replacing a property: only replace the first occurrence
-                self.text = self.text.replace(matches[0], 
-                    "{prop_key}:{prop_val}".format(prop_key = property_name, prop_val = new_property_value), 1)
-                # and remove all further occurrences (as it is not a multi prop)
-                for match in matches[1:]:
-                    self.text = self.text.replace(match, "")
-            else:
-                # adding a new property
-                self.text = self.text.strip() + u" {prop_key}:{prop_val}".format(
-                    prop_key = property_name, prop_val = new_property_value)
+            self.properties[property_name] = target_value
+        
+        spans = self._get_spans()
+        new_prop = u"{prop_key}:{prop_val}".format(prop_key = property_name, prop_val = new_property_value)
+        # depending on whether it is a multi prop
+        indices = None
+        if property_name not in conf.MULTI_PROPS:
+            indices = [index for index, span in enumerate(spans) if span[0] == property_name]
+        if indices:
+            # remove all further occurrences (as it is not a multi prop)
+            for index in reversed(indices[1:]):
+                self._remove_span(index)
+            # replacing a property: only replace the first occurrence
+            span = spans[indices[0]]
+            self._splice(span[1], span[2], new_prop)
+            span[2] = span[1] + len(new_prop)
+        else:
+            # adding a new property
+            text = self.text
+            start = len(text.rstrip())
+            self._splice(start, len(text), u" " + new_prop)
+            spans.append([property_name, start + 1, start + 1 + len(new_prop)])
         self.dirty = True
         return self
     
     
     def _parse(self):
-        """executes the different parsers
+        """executes the single-pass parser
         """
-        parse_fns = dir(parsers)
-        for p in parse_fns:
-            if p.startswith("parse"):
-                getattr(parsers, p)(self)
+        parsers.parse(self)
     
     
     def _fix_properties_on_load(self):
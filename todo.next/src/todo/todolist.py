@@ -4,63 +4,183 @@
 """
 from __future__ import print_function
 
-from date_trans import from_date
 from todoitem import TodoItem
-from config import ConfigBorg
+from parse_cache import create_item
+from sortedlist import SortedItemList
+from files import write_atomically, get_file_stamp
+from timing import measure, count_written
+from journal import split_lines, join_lines, apply_ops, ADD, REMOVE
 
-import datetime, codecs, hashlib, random, math, sys, logging
-from itertools import groupby
+from tid_allocator import TidAllocator, read_manifest, DEFAULT_OCCUPANCY, MANIFEST_FILENAME
+from config import ConfigBorg
 
-ALPHABET = "abcdefghijklmnopqrstuvwxyz"
-BASE = len(ALPHABET)
-DEFAULT_LEN = 3
+import random, os, re, sys, logging, contextlib, hashlib, collections
+from itertools import groupby, izip
 
 conf = ConfigBorg()
 logger = logging.getLogger("todonext.todolist")
 
+# tids in item texts, without parsing the items
+re_tid = re.compile(u"(?:^|\\s){id}:(\\S+)".format(id = ConfigBorg.ID), re.UNICODE)
+
 class TodoList(object):
     """class representing a todo list that's stored in a ``todo.next`` file.
     """
     
-    def __init__(self, todofile):
+    def __init__(self, todofile, lazy = False):
         """constructor, reads file and fills todo list with :class:`TodoItem`s
         
+        Once sorted, :attr:`todolist` is a :class:`SortedItemList` that keeps the items
+        in the default order, changed items are moved by :meth:`reindex`.
+        
         :param todofile: the filename of the ``todo.next`` file
         :type todofile: str
+        :param lazy: if ``True``, the items are only parsed on first access and sorting 
+            is deferred until item positions are needed
+        :type lazy: bool
         """
         self.todofile = todofile
         self.todolist = []
         self.tids = {}
+        # tids of archived items, see :meth:`get_tid_allocator`
+        self.tid_manifest = os.path.join(os.path.dirname(todofile), MANIFEST_FILENAME)
+        self.tid_allocator = None
         self.dirty = False
+        # hash of the file content as last read or written, see :meth:`write`
+        self.content_hash = None
+        self.bytes_written = 0
+        # content of the file as last read or written and the journaled changes applied on 
+        # top of it, needed for journaling the changes and replaying them onto a concurrently 
+        # changed file, see :meth:`write`
+        self._base_content = None
+        self._base_ops = []
+        self._base_lines = None
+        # stamp of the file and size and number of changes of the journal as last read or 
+        # written, see :meth:`is_current`
+        self._file_stamp = None
+        self._journal_size = 0
+        self._journal_count = 0
+        # whether the changes have been replayed onto a concurrently changed file
+        self.merged = False
+        self._locked = False
+        # blockedby dependencies in both directions: the tids blocking an open item and
+        # the tids of the open items blocked by a tid
         self.dependencies = {}
+        self.blocking = {}
+        self.lazy = lazy
+        self.sorted = False
+        # state of batched changes, see :meth:`batch`
+        self._batch_depth = 0
+        self._batch_changed = {}
+        self._batch_done = []
+        self._batch_clean = False
+        self._batch_resort = False
         
         if conf.id_support:
             # initialize randomizer for tid generation
             random.seed()
-        # read todo file items
-        with codecs.open(self.todofile, "r", "utf-8") as fp:
-            for line_nr, line in enumerate(fp):
+        lock = self._get_lock()
+        if lock is not None and not lock.optimistic:
+            # the lock is held until the list has been written, see :meth:`__exit__`
+            lock.acquire()
+            self._locked = True
+        try:
+            with measure("load"):
+                self._load(lazy)
+        except:
+            self.release_lock()
+            raise
+    
+    
+    def _load(self, lazy):
+        """reads the todo file items
+        
+        :param lazy: whether the items are parsed on first access
+        :type lazy: bool
+        """
+        # the stamp is taken before reading, so that later changes are noticed
+        self._file_stamp = get_file_stamp(self.todofile)
+        with open(self.todofile, "rb") as fp:
+            content = fp.read()
+        self.content_hash = hashlib.md5(content).hexdigest()
+        journal = self._get_journal()
+        if self._get_lock() is not None or journal is not None:
+            self._base_content = content
+        snapshot = self._get_snapshot()
+        restored = snapshot.load(self.content_hash) if snapshot is not None else None
+        if restored is not None:
+            self._restore_snapshot(*restored)
+        else:
+            # lines that are rewritten while parsing, by line number
+            volatile = {}
+            # splitlines breaks the lines like reading the file with codecs.open
+            for line_nr, line in enumerate(content.decode("utf-8").splitlines()):
                 line = line.strip()
                 if not line:
                     continue
                 # append items to list
-                item = self._append(line)
-                if item.tid:
-                    if item.tid in self.tids:
-                        # duplicate ID - what to do now?
-                        # TODO: log that as a warning
-                        pass
-                    else:
-                        self.tids[item.tid] = item
+                item = self._append(line, lazy)
+                self._index_tid(item)
                 # build blockedby dependencies
-                if conf.id_support and conf.BLOCKEDBY in item.properties and item.tid and not (item.done or item.is_report):
-                    tids = item.properties[conf.BLOCKEDBY]
-                    self.dependencies[item.tid] = tids
+                self._index_dependencies(item)
                 # set line number in file
                 item.line_nr = line_nr
+                if not lazy and item.text != line:
+                    volatile[line_nr] = line
+            # sort list
+            if not lazy:
+                self.sort_list()
+                if snapshot is not None:
+                    snapshot.save(self.todolist, self.content_hash, volatile = volatile)
+        if journal is not None:
+            ops, self._journal_size = journal.read(self.content_hash)
+            self._journal_count = len(ops)
+            self._base_ops = ops
+            self._apply_journal(ops, lazy)
         self.clean_dependencies()
-        # sort list
-        self.sort_list()
+    
+    
+    def _apply_journal(self, ops, lazy):
+        """applies the journaled changes to the items read from the todo file
+        
+        :param ops: the changes, tuples of operation and line
+        :type ops: list(tuple)
+        :param lazy: whether the added items are parsed on first access
+        :type lazy: bool
+        """
+        for op, line in ops:
+            if op == ADD:
+                item = self._append(line, lazy)
+                self._index_tid(item)
+                self._index_dependencies(item)
+                continue
+            item = self._find_line(line)
+            if item is None:
+                logger.warning(u"Journaled item {item_str} is not in todo file {fn}".format(item_str = repr(line), 
+                                                                                           fn = self.todofile))
+                continue
+            self.todolist.remove(item)
+            self._unindex_dependencies(item)
+            self._unindex_tid(item)
+    
+    
+    def _find_line(self, line):
+        """returns the item of a line, by its tid or, without tid, by its text
+        
+        :param line: the line
+        :type line: str
+        :returns: the item or ``None``
+        :rtype: :class:`TodoItem`
+        """
+        tids = re_tid.findall(line)
+        if tids and tids[-1] in self.tids:
+            return self.tids[tids[-1]]
+        # relative dates have been replaced while parsing
+        texts = set([line, TodoItem(line).text])
+        for item in self.todolist:
+            if item.text in texts:
+                return item
+        return None
     
     
     def __enter__(self):
@@ -84,150 +204,562 @@ class TodoList(object):
         :returns: whether the exception was handled in here
         :rtype: bool
         """
-        # if we have changed something, we need to write these changes to file again
-        if self.dirty:
-            if exc_type:
-                # we encountered an exception, check whether we accidentally removed anything
-                print("ERROR: An error occurred, thus the changes have not been saved (you don't want to lose your data)!")
-            else:
-                #print("would write")
-                self.write()
+        try:
+            # if we have changed something, we need to write these changes to file again
+            if self.dirty:
+                if exc_type:
+                    # we encountered an exception, check whether we accidentally removed anything
+                    print("ERROR: An error occurred, thus the changes have not been saved (you don't want to lose your data)!")
+                else:
+                    #print("would write")
+                    self.write()
+        finally:
+            self.release_lock()
         # we don't swallow the exceptions
         return False
 
     
     def write(self):
         """writes the todo items back to the file
+        
+        The items are written to a temporary file, which then replaces the todo file, so
+        that the todo file is never left half-written. If the content is the same as read 
+        or last written, nothing is written.
+        
+        With a journal, only the changed lines are appended to the journal, until the 
+        journal exceeds its threshold and is compacted into the todo file.
+        
+        With locking enabled, the file is written while holding the lock. If the file has 
+        been changed by another process since it has been read, the changes of this list 
+        are replayed onto the current file (see :meth:`_replay`) and :attr:`merged` is set.
+        
+        :returns: the number of bytes written
+        :rtype: int
+        :raises IOError: if the changes conflict with the changes of the other process
         """
-        with codecs.open(self.todofile, "w", "utf-8") as fp:
-            if conf.sort and not self.sorted:
-                # sort list according to own rules
-                self.sort_list()
-            elif not conf.sort:
-                # sort list according to original order (line number in todo.txt file)
-                self.todolist.sort(key=lambda x: x.line_nr if x.line_nr != None else sys.maxint)
-            for item in self.todolist:
-                try:
-                    fp.write(u"{item_str}\n".format(item_str = item.text))
-                except Exception:
-                    logger.error(u"Error while writing {item_str} to todo file".format(item_str = repr(item.text)))
-                    #raise
+        with measure("write"):
+            nr_bytes = self._write()
+        count_written(nr_bytes)
+        return nr_bytes
+    
+    
+    def compact(self):
+        """writes the todo items to the file and removes the journal, if there is one, 
+        e.g. before the todo file is copied
+        
+        :returns: the number of bytes written
+        :rtype: int
+        :raises IOError: if the changes conflict with the changes of another process
+        """
+        journal = self._get_journal()
+        if journal is None or not journal.get_size():
+            return 0
+        with measure("write"):
+            nr_bytes = self._write(compact = True)
+        count_written(nr_bytes)
+        return nr_bytes
+    
+    
+    def _write(self, compact = False):
+        journal = self._get_journal()
+        if journal is not None and not compact:
+            # items that have not been parsed are unchanged, they are not parsed for comparing
+            texts = [item.get_raw_text() for item in self.todolist]
+            ops = self._get_changes(texts)
+            if not ops:
+                self.dirty = False
+                logger.info(u"Todo file {fn} is unchanged".format(fn = self.todofile))
+                self.bytes_written = 0
+                return 0
+            if self._journal_count + len(ops) <= journal.threshold:
+                self.dirty = False
+                return self._write_journal(journal, ops, texts)
+        items = self.todolist
+        if conf.sort and not self.sorted:
+            # sort list according to own rules
+            self.sort_list()
+            items = self.todolist
+        elif not conf.sort:
+            # sort list according to original order (line number in todo.txt file)
+            items = sorted(self.todolist, key=lambda x: x.line_nr if x.line_nr != None else sys.maxint)
+        lines = []
+        # line numbers of the items in the written file, by item id
+        line_nrs = {}
+        for item in items:
+            try:
+                line_nrs[id(item)] = len(lines)
+                lines.append(u"{item_str}\n".format(item_str = item.text).encode("utf-8"))
+            except Exception:
+                del line_nrs[id(item)]
+                logger.error(u"Error while writing {item_str} to todo file".format(item_str = repr(item.text)))
+                #raise
+        content = "".join(lines)
+        content_hash = hashlib.md5(content).hexdigest()
+        self.dirty = False
+        if content_hash == self.content_hash and not self._journal_size:
+            logger.info(u"Todo file {fn} is unchanged".format(fn = self.todofile))
+            self.bytes_written = 0
+            return 0
+        if journal is None and self._get_lock() is None:
+            write_atomically(self.todofile, content)
+        else:
+            with self._holding_lock():
+                written = content
+                if not self.is_current():
+                    logger.info(u"Todo file {fn} has been changed concurrently".format(fn = self.todofile))
+                    ops = self._get_changes([item.text for item in items])
+                    written = join_lines(self._replay(self._read_current(), ops))
+                    self.merged = True
+                if journal is not None:
+                    # the journal is not applied to the compacted file again
+                    journal.mark_compacted(written)
+                write_atomically(self.todofile, written)
+                if journal is not None:
+                    journal.clear()
+            # the file differs from this list after replaying, so that later changes are 
+            # replayed, too
+            self._base_content, self._base_ops, self._base_lines = content, [], None
+            self._journal_size = self._journal_count = 0
+            content = written
+        if not self.merged:
+            self._file_stamp = get_file_stamp(self.todofile)
+        self.content_hash = content_hash
+        self.bytes_written = len(content)
+        logger.info(u"Wrote {nr} bytes to {fn}".format(nr = len(content), fn = self.todofile))
+        snapshot = self._get_snapshot()
+        # after replaying, the items do not match the file anymore
+        if snapshot is not None and not self.merged and len(line_nrs) == len(items):
+            snapshot.save(self.todolist if self.sorted else sorted(self.todolist, key = self.default_sort_key), 
+                          content_hash, line_nrs)
+        return len(content)
+    
+    
+    def _write_journal(self, journal, ops, texts):
+        """appends the changes to the journal
+        
+        :param journal: the journal
+        :type journal: :class:`Journal`
+        :param ops: the changes, tuples of operation and line
+        :type ops: list(tuple)
+        :param texts: the current item texts
+        :type texts: list(str)
+        :returns: the number of bytes written
+        :rtype: int
+        :raises IOError: if the changes conflict with the changes of another process
+        """
+        with self._holding_lock():
+            if not self.is_current():
+                logger.info(u"Todo file {fn} has been changed concurrently".format(fn = self.todofile))
+                # only checks for conflicts, the changes are applied on top of the journal
+                self._replay(self._read_current(), ops)
+                self.merged = True
+            self.bytes_written = journal.append(ops)
+            if not self.merged:
+                self._journal_size = journal.get_size()
+        self._base_lines = texts
+        self._journal_count += len(ops)
+        logger.info(u"Journaled {nr} changes of todo file {fn}".format(nr = len(ops), fn = self.todofile))
+        return self.bytes_written
+    
+    
+    def is_current(self):
+        """returns whether the todo file and its journal are as last read or written by this list
+        
+        :rtype: bool
+        """
+        journal = self._get_journal()
+        if journal is not None and journal.get_size() != self._journal_size:
+            return False
+        if self._file_stamp is not None and get_file_stamp(self.todofile) == self._file_stamp:
+            return True
+        with open(self.todofile, "rb") as fp:
+            return hashlib.md5(fp.read()).hexdigest() == self.content_hash
+    
+    
+    def _read_current(self):
+        """returns the current lines of the todo file, with the journal applied
+        
+        :returns: the lines
+        :rtype: list(str)
+        """
+        with open(self.todofile, "rb") as fp:
+            content = fp.read()
+        lines = split_lines(content)
+        journal = self._get_journal()
+        if journal is not None:
+            lines = apply_ops(lines, journal.read(hashlib.md5(content).hexdigest())[0])
+        return lines
+    
+    
+    def _get_base_lines(self):
+        """returns the lines of the list as read or last written
+        
+        :returns: the lines
+        :rtype: list(str)
+        """
+        if self._base_lines is None:
+            self._base_lines = apply_ops(split_lines(self._base_content), self._base_ops)
+        return self._base_lines
+    
+    
+    def _get_changes(self, texts):
+        """returns the lines removed from and added to the list since it has been read or 
+        last written
+        
+        :param texts: the current item texts
+        :type texts: list(str)
+        :returns: the changes, tuples of operation and line, removals first
+        :rtype: list(tuple)
+        """
+        base_lines = self._get_base_lines()
+        base_set, new_set = set(base_lines), set(texts)
+        if len(base_set) == len(base_lines) and len(new_set) == len(texts):
+            # without duplicate lines, sets are sufficient
+            ops = [(REMOVE, line) for line in base_lines if line not in new_set]
+            ops.extend((ADD, text) for text in texts if text not in base_set)
+            return ops
+        base_counts, new_counts = collections.Counter(base_lines), collections.Counter(texts)
+        removed, added = base_counts - new_counts, new_counts - base_counts
+        ops = []
+        for line in base_lines:
+            if removed[line]:
+                removed[line] -= 1
+                ops.append((REMOVE, line))
+        for text in texts:
+            if added[text]:
+                added[text] -= 1
+                ops.append((ADD, text))
+        return ops
+
+
+    def _replay(self, current_lines, ops):
+        """applies the changes of this list onto the current lines of the todo file
+        
+        Removed (or changed) lines have to be present in the current lines, added items must
+        not use tids that have been taken by the other process. The added lines are appended, 
+        they are sorted in when the file is written next.
+        
+        :param current_lines: the current lines of the todo file
+        :type current_lines: list(str)
+        :param ops: the changes of this list, see :meth:`_get_changes`
+        :type ops: list(tuple)
+        :returns: the merged lines
+        :rtype: list(str)
+        :raises IOError: if the changes cannot be applied
+        """
+        removals = [(op, line) for op, line in ops if op == REMOVE]
+        if collections.Counter(line for _, line in removals) - collections.Counter(current_lines):
+            raise IOError(u"Todo file {fn} has been changed concurrently, items changed by both "
+                          u"commands cannot be merged".format(fn = self.todofile))
+        merged = apply_ops(current_lines, removals)
+        taken_tids = set(re_tid.findall(u"\n".join(merged)))
+        for op, line in ops:
+            if op == ADD:
+                if taken_tids.intersection(re_tid.findall(line)):
+                    raise IOError(u"Todo file {fn} has been changed concurrently, the tids of new "
+                                  u"items have been taken".format(fn = self.todofile))
+                merged.append(line)
+        return merged
+    
+    
+    @contextlib.contextmanager
+    def _holding_lock(self):
+        """context manager holding the lock of this todo file, if locking is enabled
+        """
+        lock = self._get_lock()
+        if lock is None:
+            yield
+        else:
+            with lock:
+                yield
+    
+    
+    def _get_lock(self):
+        """returns the lock of this todo file, if locking is enabled
+        
+        :returns: the lock or ``None``
+        :rtype: :class:`FileLock`
+        """
+        lock = getattr(conf, "file_lock", None)
+        if lock is None or lock.todofile != self.todofile:
+            return None
+        return lock
+    
+    
+    def release_lock(self):
+        """releases the lock that has been taken for reading the list, which is done when
+        leaving the ``with`` block
+        """
+        if self._locked:
+            self._locked = False
+            self._get_lock().release()
+    
+    
+    def _get_snapshot(self):
+        """returns the snapshot of this todo file, if snapshots are enabled
+        
+        :returns: the snapshot or ``None``
+        :rtype: :class:`Snapshot`
+        """
+        snapshot = getattr(conf, "snapshot", None)
+        if snapshot is None or snapshot.todofile != self.todofile:
+            return None
+        return snapshot
+    
+    
+    def _get_journal(self):
+        """returns the journal of this todo file, if journaling is enabled
+        
+        :returns: the journal or ``None``
+        :rtype: :class:`Journal`
+        """
+        journal = getattr(conf, "journal", None)
+        if journal is None or journal.todofile != self.todofile:
+            return None
+        return journal
+    
+    
+    def _restore_snapshot(self, items, blockers):
+        """fills the todo list with the items read from a snapshot
+        
+        :param items: the items in the default order
+        :type items: list(:class:`TodoItem`)
+        :param blockers: the ``blockedby`` tids of each item
+        :type blockers: list(list(str))
+        """
+        for item, blocker_tids in izip(items, blockers):
+            self._index_tid(item)
+            if blocker_tids:
+                self._index_dependencies(item, blocker_tids)
+        self.todolist = SortedItemList(items, self.default_sort_key)
+        self.sorted = True
 
     
-    def _append(self, item_str):
+    def _append(self, item_str, lazy = False):
         """appends a todo item to the todo list
         
         :param item_str: the string representation of a :class:`TodoItem`
         :type item_str: str
+        :param lazy: whether the item is parsed on first access
+        :type lazy: bool
         :returns: the parsed todo item
         :rtype: :class:`TodoItem` 
         """
         item_str = item_str.strip()
         if not item_str:
             return
-        item = TodoItem(item_str)
-        self.todolist.append(item)
-        self.sorted = False
+        item = create_item(item_str, lazy)
+        if self.sorted:
+            self.todolist.add(item)
+        else:
+            self.todolist.append(item)
         return item
 
 
-    def clean_dependencies(self, done = None):
-        # an item has been marked as done or removed, remove as blockedby in dependency
-        if done and done.tid:
-            for item_id, deps in self.dependencies.items():
-                # if it has been found as a block for other items
-                if done.tid in deps:
-                    # update the dependencies
-                    self.dependencies[item_id].remove(done.tid)
-        # check dependencies for non-existing blocks
-        for item_id, deps in self.dependencies.items():
-            for tid in deps:
-                # get item
-                item = self.get_item_by_index(tid)
-                if tid not in self.tids or item.done:
-                    # blocked item is not existing anymore
-                    # print("ID '{item_id}' blocks '{block_id}' but is not existing anymore".format(item_id = tid, block_id = item_id))
-                    item = self.tids[item_id]
-                    self.replace_or_add_prop(item, conf.BLOCKEDBY, None, tid)
-                    self.dirty = True
+    @contextlib.contextmanager
+    def batch(self):
+        """context manager for changing many items at once, e.g. ``with tl.batch(): ...``
+        
+        Moving the changed items to their new positions and cleaning the dependencies 
+        is deferred until the end of the ``with`` block and then done once for all changes. 
+        Batches may be nested, the changes are applied when the outermost batch ends.
+        
+        :returns: this todo list
+        :rtype: :class:`TodoList`
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._commit_batch()
+    
+    
+    def _commit_batch(self):
+        """applies the deferred dependency cleanup and reordering of a batch
+        """
+        changed, done = self._batch_changed.values(), self._batch_done
+        clean, resort = self._batch_clean, self._batch_resort
+        self._batch_changed, self._batch_done = {}, []
+        self._batch_clean = self._batch_resort = False
+        if clean:
+            self.clean_dependencies()
+        elif done:
+            self.clean_dependencies(*done)
+        if resort or len(changed) > len(self.todolist) / 8:
+            # many changes, sorting everything is faster than moving items one by one
+            if self.sorted:
+                self.sort_list()
+        if changed:
+            # without items, reindex would sort everything again
+            self.reindex(*changed)
+    
+    
+    def clean_dependencies(self, *done_items):
+        """removes references to done, removed and non-existing items from the
+        ``blockedby`` properties
+        
+        Only the items directly blocked by the given items are changed. Without items,
+        all blocking tids are checked.
+        
+        :param done_items: the items that have been set to done or have been removed
+        :type done_items: list(:class:`TodoItem`)
+        """
+        if self._batch_depth:
+            self._batch_done.extend(done_items)
+            self._batch_clean = self._batch_clean or not done_items
+            return
+        if done_items:
+            tids = [item.tid for item in done_items if item.tid]
+        else:
+            tids = list(self.blocking)
+        for tid in tids:
+            blocker = self.tids.get(tid, None)
+            if blocker is None or blocker.done:
+                # blocking item is not existing anymore or done
+                self._release_blocked(tid)
+    
+    
+    def _release_blocked(self, tid):
+        """removes a tid from the ``blockedby`` properties of all items blocked by it
+        
+        :param tid: the tid of a done or removed item
+        :type tid: str
+        """
+        for blocked_tid in list(self.blocking.get(tid, ())):
+            blocked = self.tids[blocked_tid]
+            if tid in blocked.properties.get(conf.BLOCKEDBY, ()):
+                # updates the dependencies, too
+                self.remove_prop(blocked, conf.BLOCKEDBY, tid)
+                self.dirty = True
+        self.blocking.pop(tid, None)
+    
+    
+    def _index_dependencies(self, item, blockers = None):
+        """adds the ``blockedby`` dependencies of an open item to :attr:`dependencies`
+        and :attr:`blocking`
+        
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        :param blockers: the ``blockedby`` tids of the item, read from the item if not given
+        :type blockers: list(str)
+        """
+        if blockers is not None and not blockers:
+            return
+        if not (conf.id_support and item.tid and self.tids.get(item.tid, None) is item):
+            return
+        if item.done or item.is_report:
+            return
+        if blockers is None:
+            if not item.has_property(conf.BLOCKEDBY):
+                return
+            blockers = item.properties[conf.BLOCKEDBY]
+        blockers = set(blockers)
+        self.dependencies[item.tid] = blockers
+        for tid in blockers:
+            self.blocking.setdefault(tid, set()).add(item.tid)
+    
+    
+    def _unindex_dependencies(self, item):
+        """removes the ``blockedby`` dependencies of an item from :attr:`dependencies`
+        and :attr:`blocking`
+        
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        """
+        if not (item.tid and self.tids.get(item.tid, None) is item):
+            return
+        for tid in self.dependencies.pop(item.tid, ()):
+            blocked_tids = self.blocking.get(tid, None)
+            if blocked_tids is not None:
+                blocked_tids.discard(item.tid)
+                if not blocked_tids:
+                    del self.blocking[tid]
 
     
-    def create_tid(self, item, maxlen = DEFAULT_LEN):
-        """creates a random :var:`DEFAULT_LEN`-letter tid
+    def get_tid_allocator(self):
+        """returns the allocator for new tids, which is created on first use
         
-        :param item: a todo item
+        The allocator knows the tids of the todo list and of the archived items, 
+        as stored in the manifest :attr:`tid_manifest`.
+        
+        :returns: the tid allocator
+        :rtype: :class:`TidAllocator`
+        """
+        if self.tid_allocator is None:
+            used_tids = list(self.tids)
+            used_tids.extend(read_manifest(self.tid_manifest))
+            self.tid_allocator = TidAllocator(used_tids, getattr(conf, "tid_occupancy", DEFAULT_OCCUPANCY))
+        return self.tid_allocator
+    
+    
+    def create_tid(self, item = None): #@UnusedVariable
+        """creates a random tid that is neither used in the todo list nor in the archives
+        
+        :param item: a todo item (not used anymore)
         :type item: :class:`TodoItem`
-        :return: a :var:`DEFAULT_LEN`-letter tid
+        :return: a tid with at least :var:`DEFAULT_LEN` letters
         :rtype: str 
         """
-        # set first value
-        text = item.text
-        counter = 0
-        # try at most 60 times
-        while counter < 60:
-            # for generating different tids for same text
-            salt = random.choice(ALPHABET)
-            text = salt + text
-            # get hash from UTF-8 string
-            md5 = hashlib.new("md5", text.encode("utf-8"))
-            # maximal number that needs to be reachable for maxlen characters
-            max_nr = len(ALPHABET) ** maxlen
-            # maximal size of the the hex string to be able to represent this number
-            len_hex_str = int(math.ceil(math.log(max_nr, 16)))
-            # get base-26 DEFAULT_LEN-digit nr
-            nr = int(md5.hexdigest()[:len_hex_str], 16) % max_nr
-            
-            # get base-26 representation of nr
-            char_list = []
-            t = maxlen - 1
-            # transform nr in base of alphabet
-            while t >= 0:
-                bcp = int(pow(BASE, t))
-                a = int(nr / bcp) % BASE
-                char_list.append(ALPHABET[a:a+1])
-                nr = nr - (a * bcp)
-                t -= 1
-            
-            tid = "".join(char_list)
-            if tid not in self.tids:
-                return tid
-            counter += 1
-        # we tried often enough and failed :(
-        return "xxx"
+        return self.get_tid_allocator().allocate()
+    
+    
+    def create_tids(self, nr_of_tids):
+        """creates several random tids at once
+        
+        :param nr_of_tids: the number of tids
+        :type nr_of_tids: int
+        :return: the tids
+        :rtype: list(str)
+        """
+        return self.get_tid_allocator().allocate_many(nr_of_tids)
 
 
-    def add_item(self, item_str):
+    def add_item(self, item_str, tid = None):
         """exposed add item method, adds a new todo item to the todo file and reindexes
         
         :param item_str: the string representation of a :class:`TodoItem`
         :type item_str: str
+        :param tid: the tid for the item if it has none, a new one is created if not given
+        :type tid: str
         :returns: the parsed todo item
         :rtype: :class:`TodoItem` 
         """
         # append the item to the todo list
         item = self._append(item_str)
         # add done and created properties
-        now = datetime.datetime.now()
-        now_str = from_date(now)
-        if item.is_report:
-            # in case of report item, we need to store the "done" date for later sorting
-            item.replace_or_add_prop(conf.DONE, now_str, now)
-        else:
-            item.replace_or_add_prop(conf.CREATED, now_str, now)
+        item.set_creation_date()
         # if item doesn't have an tid assigned, do it here automatically
         if conf.id_support and not item.tid:
-            item_id = self.create_tid(item)
-            item.replace_or_add_prop(conf.ID, item_id)
-            self.tids[item_id] = item
+            item.replace_or_add_prop(conf.ID, tid or self.create_tid(item))
+        self._index_tid(item)
         # add to dependencies
-        if conf.id_support and item.tid and conf.BLOCKEDBY in item.properties:
-            self.dependencies[item.tid] = item.properties[conf.BLOCKEDBY]
+        self._index_dependencies(item)
         # the new item is sorted into the list
-        self.reindex()
+        self.reindex(item)
         # something has changed
         self.dirty = True
         return item
     
+    
+    def add_items(self, item_strs):
+        """adds several new todo items, the tids for them are created at once
+        
+        :param item_strs: the string representations of the :class:`TodoItem`s
+        :type item_strs: list(str)
+        :returns: the parsed todo items
+        :rtype: list(:class:`TodoItem`)
+        """
+        tids = self.create_tids(len(item_strs)) if conf.id_support else [None] * len(item_strs)
+        with self.batch():
+            items = [self.add_item(item_str, tid) for item_str, tid in zip(item_strs, tids)]
+        # items that already had a tid did not need a new one
+        for tid in tids:
+            if tid and tid not in self.tids:
+                self.tid_allocator.release(tid)
+        return items
+    
 
     def check_items(self):
         """checks all items for potential syntax problems, e.g. non-existing files 
@@ -252,9 +784,32 @@ class TodoList(object):
                         yield (item, ["Item has duplicate ID '{item_id}'".format(item_id = item_id),])                    
 
 
+    @contextlib.contextmanager
+    def _changing_ids(self, item, property_name):
+        """context manager keeping :attr:`tids` and the dependencies up to date while 
+        the ``id`` or ``blockedby`` property of an item is changed
+        
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        :param property_name: the name of the changed property
+        :type property_name: str
+        """
+        if property_name.lower() not in (conf.ID, conf.BLOCKEDBY):
+            yield
+            return
+        self._unindex_dependencies(item)
+        self._unindex_tid(item)
+        try:
+            yield
+        finally:
+            self._index_tid(item)
+            self._index_dependencies(item)
+    
+    
     def remove_prop(self, item, property_name, selector_value = None):
-        item.remove_prop(property_name, selector_value)
-        self.reindex()
+        with self._changing_ids(item, property_name):
+            item.remove_prop(property_name, selector_value)
+        self.reindex(item)
         self.dirty = True
         return item
         
@@ -281,8 +836,9 @@ class TodoList(object):
         :returns: the altered todo item
         :rtype: :class:`TodoItem` 
         """
-        item.replace_or_add_prop(prop_name, new_prop_val, real_prop_val)
-        self.reindex()
+        with self._changing_ids(item, prop_name):
+            item.replace_or_add_prop(prop_name, new_prop_val, real_prop_val)
+        self.reindex(item)
         self.dirty = True
         return item
 
@@ -301,10 +857,11 @@ class TodoList(object):
         if item.is_report:
             return item
         item.set_to_done()
-        # clean blockedby dependencies
-        self.clean_dependencies(done=item)
+        # done items are not blocked anymore and do not block others
+        self._unindex_dependencies(item)
+        self.clean_dependencies(item)
         # reindex the list, as the order may have changed
-        self.reindex()
+        self.reindex(item)
         self.dirty = True
         return item
 
@@ -324,37 +881,76 @@ class TodoList(object):
         if item.is_report:
             return item
         item.reopen()
+        self._index_dependencies(item)
         self.dirty = True
-        self.reindex()
+        self.reindex(item)
         return item
     
     
     def get_item_by_index(self, item_nr):
         """returns the ``n-th`` todo item from the todo list
         
-        :param item_nr: the index of the requested item
+        Tids are looked up in :attr:`tids`, index numbers and the positions of items 
+        are taken from the sorted item list in logarithmic time.
+        
+        :param item_nr: the index or tid of the requested item
         :type item_nr: str
         :returns: the requested todo item (if existing)
         :rtype: :class:`TodoItem` 
         """
+        if conf.id_support and item_nr in self.tids:
+            item = self.tids[item_nr]
+            # the position is only known in a sorted list
+            if self.sorted:
+                item.nr = self.todolist.index(item)
+            return item
+        try:
+            item_nr = int(item_nr)
+        except (TypeError, ValueError):
+            # neither a tid nor an index number, no need to sort
+            return None
         # if list is unsorted, do that first
         if not self.sorted:
             self.sort_list()
         try:
-            if conf.id_support and item_nr in self.tids:
-                item = self.tids[item_nr]
-                item.nr = self.todolist.index(item)
-            else:
-                item_nr = int(item_nr)
-                # simply look up the index
-                item = self.todolist[item_nr]
-                # assign the index temporarily
-                item.nr = item_nr
-        except:
+            # simply look up the index
+            item = self.todolist[item_nr]
+        except IndexError:
             return None
+        # assign the index temporarily
+        item.nr = item_nr % len(self.todolist)
         return item
     
     
+    def _index_tid(self, item):
+        """adds an item to the tid index :attr:`tids`
+        
+        If another item has the same tid, the first one stays in the index.
+        
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        """
+        tid = item.tid
+        if not tid:
+            return
+        if self.tids.get(tid, item) is not item:
+            logger.warning(u"Duplicate ID '{item_id}'".format(item_id = tid))
+            return
+        self.tids[tid] = item
+        if self.tid_allocator is not None:
+            self.tid_allocator.mark_used(tid)
+    
+    
+    def _unindex_tid(self, item):
+        """removes an item from the tid index :attr:`tids`
+        
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        """
+        if item.tid and self.tids.get(item.tid, None) is item:
+            del self.tids[item.tid]
+    
+    
     def get_items_by_index_list(self, item_nrs):
         """returns a list of todo items from the todo list by indices
         
@@ -381,8 +977,9 @@ class TodoList(object):
         """
         self.todolist.remove(item)
         item.nr = None
+        self._unindex_dependencies(item)
+        self._unindex_tid(item)
         self.clean_dependencies(item)
-        self.reindex()
         self.dirty = True
         return item
     
@@ -397,14 +994,20 @@ class TodoList(object):
         :return: the new item
         :rtype: :class:`TodoItem`
         """
-        # set to index and copy index number
-        index = self.todolist.index(item)
-        new_item.nr = index
-        self.todolist[index] = new_item
+        if self.sorted:
+            self.todolist.remove(item)
+            self.todolist.add(new_item)
+            new_item.nr = self.todolist.index(new_item)
+        else:
+            self.todolist[self.todolist.index(item)] = new_item
         # line number
         new_item.line_nr = item.line_nr
-        self.clean_dependencies()
-        self.reindex()
+        self._unindex_dependencies(item)
+        self._unindex_tid(item)
+        self._index_tid(new_item)
+        self._index_dependencies(new_item)
+        # the tid of the old item may have been changed or the new item may be done
+        self.clean_dependencies(item, new_item)
         self.dirty = True
         return new_item
         
@@ -430,67 +1033,56 @@ class TodoList(object):
                 # remove "(x) " at beginning
                 item.text = item.text[4:]
         item.priority = new_prio
-        self.reindex()
+        self.reindex(item)
         self.dirty = True
     
-    def default_sort(self, item1, item2):
-        # sort whether report item (they are right at the bottom)
-        i1, i2 = (item1.is_report or item1.done), (item2.is_report or item2.done)
-        if i1 and not i2:
-            return 1
-        if not i1 and i2:
-            return -1
-#        if item1.is_report and not item2.is_report:
-#            return 1
-#        if not item1.is_report and item2.is_report:
-#            return -1
-#        # sort by done
-#        if item1.done and not item2.done:
-#            return 1
-#        elif not item1.done and item2.done:
-#            return -1
-        # sort by priority
-        i1, i2 = (item1.priority or "ZZ"), (item2.priority or "ZZ")
-        if i1 > i2:
-            return 1
-        elif i1 < i2:
-            return -1
-        # sort by reversed done date
-        (i1, i2) = (item1.done_date if isinstance(item1.done_date, datetime.datetime) else datetime.datetime(1970, 1, 1), 
-                    item2.done_date if isinstance(item2.done_date, datetime.datetime) else datetime.datetime(1970, 1, 1))
-        if i1 < i2:
-            return 1
-        if i1 > i2:
-            return -1
-        # sort by reversed due date
-        (i1, i2) = (item1.due_date if isinstance(item1.due_date, datetime.datetime) else datetime.datetime(1970, 1, 1), 
-                    item2.due_date if isinstance(item2.due_date, datetime.datetime) else datetime.datetime(1970, 1, 1))
-        if i1 < i2:
-            return 1
-        if i1 > i2:
-            return -1
-
-        # sort alphabetically
-        i1, i2 = item1.text.lower(), item2.text.lower()
-        if i1 > i2:
-            return 1
-        elif i1 < i2:
-            return -1
-        # they are practically equal
-        return 0
-    
-    
-    def sort_list(self, sorting_fn = None):
-        if sorting_fn == None:
-            sorting_fn = self.default_sort
-        self.todolist.sort(cmp=sorting_fn)
+    @staticmethod
+    def default_sort_key(item):
+        """returns the key of an item for the default order (see :meth:`TodoItem.get_sort_key`)
+        
+        :param item: the todo item
+        :type item: :class:`TodoItem`
+        :returns: the sort key
+        :rtype: tuple
+        """
+        return item.get_sort_key()
+    
+    
+    @staticmethod
+    def default_sort(item1, item2):
+        # compare function for the default order, use :meth:`default_sort_key` for sorting
+        return cmp(item1.get_sort_key(), item2.get_sort_key())
+    
+    
+    def sort_list(self):
+        """sorts all items into the default order (see :meth:`default_sort_key`)
+        """
+        self.todolist = SortedItemList(self.todolist, self.default_sort_key)
         self.sorted = True
     
     
-    def reindex(self):
-        self.sort_list()
-        for nr, item in enumerate(self.todolist):
-            item.nr = nr 
+    def reindex(self, *items):
+        """moves changed items to their position in the default order
+        
+        :param items: the changed items, if not given, all items are sorted again
+        :type items: list(:class:`TodoItem`)
+        """
+        if self._batch_depth:
+            # deferred until the batch ends
+            for item in items:
+                self._batch_changed[id(item)] = item
+            self._batch_resort = self._batch_resort or not items
+            return
+        if not self.sorted:
+            # no positions have been handed out yet, sorting is deferred until needed
+            return
+        if not items:
+            self.sort_list()
+            return
+        for item in items:
+            if item in self.todolist:
+                self.todolist.update(item)
+                item.nr = self.todolist.index(item)
     
 
     def list_items(self, criterion_fn = None):